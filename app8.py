@@ -1,49 +1,506 @@
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, render_template_string, jsonify, request, g, has_request_context, Response
 import pandas as pd
-import numpy as np
-from datetime import datetime
 import os
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from mlxtend.frequent_patterns import apriori, association_rules
-from mlxtend.preprocessing import TransactionEncoder
+import sys
+import threading
+import baskets
+import data_plane
+import churn_scores
+import co_occurrence
+import dataset_schema
+import dataset_store
+import entity_index
+import feature_drift
+import feature_store
+import ingest
+import item_similarity
+import jobs
+import license_facts
+import metrics_cube
+import model_registry
+import model_training
+import response_cache
+import running_totals
+import segmentation
+import snapshot_cache
 import warnings
 warnings.filterwarnings('ignore')
 
 app = Flask(__name__)
 
-# Global variables to store data
-data = {}
+DATA_DIR = 'software_monetization_dataset'
+
+# Tables loaded at startup, in load order
+TABLES = ['vendors', 'customers', 'products', 'licenses', 'usage_history', 'renewal_history']
+
+# Entity keys of the licenses table; rows are physically sorted by the first one
+LICENSE_KEYS = ['Customer_ID', 'Product_ID', 'Vendor_ID']
+
+# Seconds between checks of the CSV folder for new drops
+DATASET_POLL_SECONDS = float(os.environ.get('DATASET_POLL_SECONDS', 5))
+
+# Bounds of the per-dataset-version API response cache
+RESPONSE_CACHE_ENTRIES = int(os.environ.get('RESPONSE_CACHE_ENTRIES', 512))
+RESPONSE_CACHE_MB = int(os.environ.get('RESPONSE_CACHE_MB', 64))
+
+# API routes that must never be served from the cache
+UNCACHED_ROUTES = ['/api/ingest/', '/api/cache-stats', '/api/jobs', '/api/drift']
+
+# Root of the shared data plane; unset, every process loads the CSVs itself
+DATA_PLANE_DIR = os.environ.get('DATA_PLANE_DIR')
+
+# Seconds between data plane workers' checks for a new exported generation
+DATA_PLANE_POLL_SECONDS = float(os.environ.get('DATA_PLANE_POLL_SECONDS', 1))
+
+# Trained model artifacts, one per model and dataset fingerprint
+MODEL_DIR = os.environ.get('MODEL_DIR', os.path.join(DATA_DIR, '.models'))
+
+# License columns the churn model is trained on
+CHURN_FEATURES = [
+    'Number_of_quantities_purchased',
+    'Number_of_quantities_activated',
+    'Percentage_of_quantities_deployed',
+    'Days_since_last_quantity_purchased',
+    'Days_since_last_quantity_activated',
+    'Frequency_of_Product_Purchase',
+    'Satisfaction_Score',
+    'Support_Tickets',
+    'Feature_Utilization'
+]
+
+CHURN_MODEL_PARAMS = {'n_estimators': 100, 'test_size': 0.3, 'random_state': 42, 'features': CHURN_FEATURES}
+
+# Successive-halving search over the churn forest's hyperparameters (POST /api/jobs/churn-tuning);
+# the finalists are refitted for the latency/accuracy report with `latency_repeats` single-row predictions
+CHURN_TUNING_PARAMS = dict(CHURN_MODEL_PARAMS, space={
+    'n_estimators': [25, 50, 100, 200, 400],
+    'max_depth': [None, 6, 12, 24],
+    'min_samples_leaf': [1, 2, 5, 10],
+    'max_features': ['sqrt', 'log2', 0.5, None],
+    'class_weight': [None, 'balanced']
+}, candidates=96, factor=3, min_samples=100, cv=3, report=6, latency_repeats=25)
+
+# Processes the churn hyperparameter search cross-validates on
+CHURN_TUNING_JOBS = int(os.environ.get('CHURN_TUNING_JOBS', os.cpu_count() or 1))
+
+# License columns whose renewal coefficients the driver analysis reports
+DRIVER_FEATURES = [
+    'Number_of_quantities_activated',
+    'Percentage_of_quantities_deployed',
+    'Satisfaction_Score',
+    'Support_Tickets',
+    'Feature_Utilization',
+    'Days_since_last_quantity_purchased',
+    'Frequency_of_Product_Purchase'
+]
+
+DRIVER_MODEL_PARAMS = {'max_iter': 1000, 'test_size': 0.3, 'random_state': 42, 'features': DRIVER_FEATURES,
+                       'bootstrap': 200, 'confidence': 0.95}
+
+# Processes sharing the driver model's bootstrap refits
+DRIVER_BOOTSTRAP_JOBS = int(os.environ.get('DRIVER_BOOTSTRAP_JOBS', os.cpu_count() or 1))
+
+# Customer-level aggregates the segmentation clusters on
+SEGMENT_AGGREGATES = {
+    'Contract_Value': 'sum',
+    'Number_of_quantities_purchased': 'sum',
+    'Number_of_quantities_activated': 'sum',
+    'Satisfaction_Score': 'mean',
+    'Support_Tickets': 'sum',
+    'Frequency_of_Product_Purchase': 'mean'
+}
+
+# Candidate numbers of segments, scored by silhouette on a sample of customers (from 3, so
+# there is always an At-Risk segment); segments are named from their centroids by value
+# (Premium first) and risk (lowest satisfaction is At-Risk)
+SEGMENT_MODEL_PARAMS = {'k_range': list(range(3, 8)), 'silhouette_sample': 2000, 'n_init': 10, 'random_state': 42,
+                        'value': 'Contract_Value', 'risk': 'Satisfaction_Score', 'features': list(SEGMENT_AGGREGATES)}
+
+# Processes fitting the candidate numbers of segments
+SEGMENT_SEARCH_JOBS = int(os.environ.get('SEGMENT_SEARCH_JOBS', os.cpu_count() or 1))
+
+# Relative increase of the customers' distance to their segment centroid (since the last
+# full fit) past which incremental assignment gives way to a full segmentation refit
+SEGMENT_DRIFT_THRESHOLD = float(os.environ.get('SEGMENT_DRIFT_THRESHOLD', 0.25))
+
+# License columns kept in the feature store: every column a model or customer aggregate uses
+FEATURE_COLUMNS = list(dict.fromkeys(CHURN_FEATURES + DRIVER_FEATURES + list(SEGMENT_AGGREGATES)))
+
+# Models retrained only when their features drift, and the license features watched for each
+DRIFT_FEATURES = {'churn': CHURN_FEATURES, 'drivers': DRIVER_FEATURES}
+
+# Population stability index (current licenses against the model's training data) that a
+# watched feature has to pass before its model is retrained; below it the model trained on
+# older data keeps serving (0.1-0.25 is the usual band for a moderate shift)
+DRIFT_THRESHOLD = float(os.environ.get('DRIFT_THRESHOLD', 0.2))
+
+# Quantile bins of the feature histograms drift is measured on
+DRIFT_BINS = 10
+
+# Default support: the highest of `supports` giving more than `min_itemsets` itemsets. The
+# itemset lattice is mined once per dataset version down to it or to `query_support` if lower,
+# the lowest support ?min_support= can ask for without mining again
+ASSOCIATION_RULE_PARAMS = {'supports': [0.02, 0.01, 0.005, 0.003, 0.001, 0.0005], 'query_support': 0.005,
+                           'max_len': 4, 'min_itemsets': 10, 'min_confidence': 0.01, 'top': 20, 'top_pairs': 15}
+
+# Most similar products kept per product for customer recommendations
+SIMILAR_PRODUCTS = int(os.environ.get('SIMILAR_PRODUCTS', 20))
+
+# Processes fitting models for training jobs (0 fits on a thread of the server process)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+
+def build_dataset(paths):
+    """Load every table through the columnar snapshot cache and index licenses.
+
+    Columns are typed by dataset_schema: IDs and enums become categoricals and
+    counters are downcast, which keeps the per-worker footprint small.
+    """
+    tables = {}
+    for name, path in paths.items():
+        try:
+            tables[name] = snapshot_cache.load_table(path, dataset_schema.get_schema(name))
+        except FileNotFoundError:
+            print(f"File not found: {path}")
+        except Exception as e:
+            print(f"Error loading {name}: {e}")
+    
+    return index_licenses(tables)
+
+def index_licenses(tables):
+    """Sort licenses by customer and build the entity indexes over them"""
+    indexes = {}
+    if 'licenses' in tables:
+        tables['licenses'] = entity_index.sort_by(tables['licenses'], LICENSE_KEYS[0])
+        indexes = entity_index.build_indexes(tables['licenses'], LICENSE_KEYS)
+    return tables, indexes
+
+store = dataset_store.DatasetStore(DATA_DIR, TABLES, build_dataset)
+
+def current_snapshot():
+    """The snapshot pinned to the current request (the live one outside requests).
+
+    A request pins the snapshot on first use, so it keeps reading the same
+    version even if a reload swaps a new one in while it is running.
+    """
+    if has_request_context():
+        if 'snapshot' not in g:
+            g.snapshot = store.current()
+        return g.snapshot
+    return store.current()
+
+# Read-only view of the pinned snapshot's tables
+data = dataset_store.TablesView(current_snapshot)
+
+def build_license_facts(snapshot):
+    tables = snapshot.tables
+    return license_facts.build_facts(tables['licenses'], tables.get('products'), tables.get('customers'))
+
+def license_fact_table():
+    """Licenses joined with product and customer attributes, built once per dataset version"""
+    return current_snapshot().derived('license_facts', build_license_facts)
+
+def entity_facts(column, entity_id):
+    """License fact rows of one customer/product/vendor (same row order as licenses)"""
+    return current_snapshot().indexes[column].rows(license_fact_table(), entity_id)
+
+def facts_for_customer(customer_id):
+    """License fact rows of one customer, or the whole fact table for 'all'"""
+    if customer_id == 'all':
+        return license_fact_table()
+    return entity_facts('Customer_ID', customer_id)
+
+def build_metrics_cube(snapshot):
+    return metrics_cube.MetricsCube(snapshot.derived('license_facts', build_license_facts))
+
+def license_cube():
+    """Customer x product x category x month license aggregates of the pinned snapshot"""
+    return current_snapshot().derived('metrics_cube', build_metrics_cube)
+
+def catalogue_names():
+    """{Product_ID: Product_Name} of the products in the catalogue"""
+    return current_snapshot().derived(
+        'product_names', lambda snapshot: dict(zip(snapshot.tables['products']['Product_ID'],
+                                                   snapshot.tables['products']['Product_Name'])))
+
+def build_license_totals(snapshot):
+    return running_totals.LicenseTotals.from_facts(snapshot.derived('license_facts', build_license_facts))
+
+def license_totals():
+    """Running license totals of the pinned snapshot"""
+    return current_snapshot().derived('license_totals', build_license_totals)
+
+def build_feature_store(snapshot):
+    return feature_store.FeatureStore.from_rows(snapshot.tables['licenses'], FEATURE_COLUMNS)
+
+def model_features():
+    """License- and customer-level model features of the pinned snapshot"""
+    return current_snapshot().derived('feature_store', build_feature_store)
+
+def carry_license_state(snapshot, table, rows):
+    """Fold appended license rows into the previous snapshot's totals and model features
+    instead of recomputing them"""
+    if table != 'licenses':
+        return {}
+    totals = snapshot.derived('license_totals', build_license_totals).copy()
+    facts = license_facts.build_facts(rows, snapshot.tables.get('products'), snapshot.tables.get('customers'))
+    features = snapshot.derived('feature_store', build_feature_store).copy()
+    carried = {'license_totals': totals.add(facts), 'feature_store': features.add(rows)}
+    for kind, columns in DRIFT_FEATURES.items():
+        trained, _ = training_jobs.registry(kind).latest(snapshot)
+        if trained is not None and 'feature_histograms' in trained.info:
+            histograms = drift_histograms(snapshot, trained).copy()
+            carried[f'feature_histograms:{trained.id}'] = histograms.add(feature_store.license_rows(rows, columns))
+    return carried
+
+def churn_training_set(snapshot):
+    """Churn features and label (1 if Churn_Risk is High, 0 otherwise) of every license,
+    with the hyperparameters of the newest promoted tuning run"""
+    features = snapshot.derived('feature_store', build_feature_store)
+    y = (snapshot.tables['licenses']['Churn_Risk'] == 'High').astype(int)
+    params = CHURN_MODEL_PARAMS
+    tuned, _ = churn_tuning.latest(snapshot)
+    if tuned is not None and tuned.info['promote']:
+        params = dict(CHURN_MODEL_PARAMS, hyperparameters=tuned.info['hyperparameters'])
+    return features.license_frame(CHURN_FEATURES), y, params
+
+def churn_tuning_set(snapshot):
+    X, y, _ = churn_training_set(snapshot)
+    return X, y, CHURN_TUNING_PARAMS, CHURN_TUNING_JOBS
+
+def promote_tuned_churn_model(snapshot, tuned):
+    """Serve a tuned churn forest for the dataset it was tuned on, if it beat the default one"""
+    if not tuned.info['promote']:
+        print(f"Tuned churn model ({tuned.info['accuracy']:.4f}) does not beat the default "
+              f"({tuned.info['default_accuracy']:.4f}); keeping the default")
+        return
+    info = {key: tuned.info[key] for key in ['accuracy', 'precision', 'recall', 'f1_score', 'features',
+                                             'importances', 'rows', 'hyperparameters']}
+    info.update(tuned=True, **reference_histograms(snapshot, CHURN_FEATURES))
+    churn_models.store(snapshot, tuned.model, info, tuned.info['train_seconds'])
+    # Responses built from the replaced model are out of date
+    responses.clear()
+    print(f"Promoted tuned churn model for dataset version {snapshot.version}: "
+          f"accuracy {tuned.info['default_accuracy']:.4f} -> {tuned.info['accuracy']:.4f}")
+
+def driver_training_set(snapshot):
+    """Driver features and renewal label of every license"""
+    licenses = snapshot.tables['licenses']
+    
+    # Use Renewal_Status field if available, otherwise use the inverse of high churn risk
+    if 'Renewal_Status' in licenses.columns:
+        y = (licenses['Renewal_Status'] == 'Active').astype(int)
+    else:
+        y = (licenses['Churn_Risk'] != 'High').astype(int)
+    features = snapshot.derived('feature_store', build_feature_store)
+    return features.license_frame(DRIVER_FEATURES), y, DRIVER_MODEL_PARAMS, DRIVER_BOOTSTRAP_JOBS
+
+def segment_matrix(snapshot):
+    """Segmentation features of the snapshot's customers, indexed by customer"""
+    return snapshot.derived('feature_store', build_feature_store).customer_frame(SEGMENT_AGGREGATES)
+
+def segment_training_set(snapshot):
+    return segment_matrix(snapshot), SEGMENT_MODEL_PARAMS, SEGMENT_SEARCH_JOBS
+
+def reference_histograms(snapshot, features):
+    """Histograms of `features` over the snapshot's licenses, binned at their quantiles:
+    stored with a model as the data its drift is measured against"""
+    matrix = snapshot.derived('feature_store', build_feature_store).license_matrix(features)
+    return {'feature_histograms': feature_drift.FeatureHistograms.from_matrix(matrix, features, DRIFT_BINS).to_dict()}
+
+def drift_histograms(snapshot, trained):
+    """Histograms of the snapshot's licenses under the bins of `trained`'s reference histograms"""
+    reference = feature_drift.FeatureHistograms.from_dict(trained.info['feature_histograms'])
+    return snapshot.derived(f'feature_histograms:{trained.id}', lambda snapshot: reference.with_edges(
+        snapshot.derived('feature_store', build_feature_store).license_matrix(reference.columns)))
+
+def model_drift(snapshot, trained):
+    """{feature: PSI} of the snapshot's licenses against the data `trained` was trained on,
+    or None for a model stored without reference histograms"""
+    if 'feature_histograms' not in trained.info:
+        return None
+    return snapshot.derived(f'drift:{trained.id}', lambda snapshot: drift_histograms(snapshot, trained).psi(
+        feature_drift.FeatureHistograms.from_dict(trained.info['feature_histograms'])))
+
+def drifted(kind, trained, snapshot):
+    """Whether a `kind` model trained on other data needs retraining for the snapshot"""
+    if kind not in DRIFT_FEATURES:
+        return True
+    scores = model_drift(snapshot, trained)
+    return scores is None or max(scores.values()) > DRIFT_THRESHOLD
+
+def build_baskets(snapshot):
+    licenses = snapshot.tables['licenses']
+    return baskets.Baskets.from_pairs(licenses['Customer_ID'], licenses['Product_ID'])
+
+def build_co_occurrence(snapshot):
+    return co_occurrence.CoOccurrence.from_baskets(snapshot.derived('baskets', build_baskets))
+
+def build_item_neighbours(snapshot):
+    # Every buyer counts towards a product's similarity, not only multi-product baskets
+    licenses = snapshot.tables['licenses']
+    purchases = baskets.Baskets.from_pairs(licenses['Customer_ID'], licenses['Product_ID'], min_items=1)
+    return item_similarity.ItemNeighbours.from_co_occurrence(co_occurrence.CoOccurrence.from_baskets(purchases),
+                                                             SIMILAR_PRODUCTS)
+
+def item_neighbours():
+    """Top similar products of every product in the pinned snapshot"""
+    return current_snapshot().derived('item_neighbours', build_item_neighbours)
+
+def association_training_set(snapshot):
+    """Purchase baskets, their co-occurrence counts and product names to mine rules from"""
+    products = snapshot.tables['products']
+    product_names = dict(zip(products['Product_ID'], products['Product_Name']))
+    return (snapshot.derived('baskets', build_baskets), snapshot.derived('co_occurrence', build_co_occurrence),
+            product_names, ASSOCIATION_RULE_PARAMS)
+
+# Models are trained by background jobs once per dataset version and kept on disk;
+# endpoints serve the newest completed one
+training_jobs = jobs.JobQueue(JOB_WORKERS)
+churn_models = model_registry.ModelRegistry(MODEL_DIR, 'churn', CHURN_MODEL_PARAMS)
+training_jobs.register('churn', churn_models, churn_training_set, model_training.fit_churn_model,
+                       on_trained=lambda snapshot, trained: responses.clear(),
+                       reference=lambda snapshot: reference_histograms(snapshot, CHURN_FEATURES))
+# Tuning runs only on request; a winning model replaces the churn model of its dataset version
+churn_tuning = model_registry.ModelRegistry(MODEL_DIR, 'churn-tuning', CHURN_TUNING_PARAMS)
+training_jobs.register('churn-tuning', churn_tuning, churn_tuning_set, model_training.tune_churn_model,
+                       eager=False, on_trained=promote_tuned_churn_model)
+training_jobs.register('drivers', model_registry.ModelRegistry(MODEL_DIR, 'drivers', DRIVER_MODEL_PARAMS),
+                       driver_training_set, model_training.fit_driver_model,
+                       on_trained=lambda snapshot, trained: responses.clear(),
+                       reference=lambda snapshot: reference_histograms(snapshot, DRIVER_FEATURES))
+# Segments are refitted only when incremental assignment drifts too far (see customer_segmentation)
+segment_models = model_registry.ModelRegistry(MODEL_DIR, 'segments', SEGMENT_MODEL_PARAMS)
+training_jobs.register('segments', segment_models, segment_training_set, model_training.fit_segments, eager=False)
+training_jobs.register('association-rules',
+                       model_registry.ModelRegistry(MODEL_DIR, 'association-rules', ASSOCIATION_RULE_PARAMS),
+                       association_training_set, model_training.mine_association_rules)
+
+def schedule_training(snapshot):
+    """Train the eager kinds on a snapshot swapped in, except drift-watched models whose
+    features have not moved past DRIFT_THRESHOLD since they were trained"""
+    if not snapshot.tables:
+        return
+    for kind in training_jobs.eager:
+        trained, stale = training_jobs.registry(kind).latest(snapshot)
+        if trained is None or (stale and drifted(kind, trained, snapshot)):
+            training_jobs.submit(kind, snapshot)
+
+store.on_swap(lambda old, new: schedule_training(new))
+
+def completed_model(kind):
+    """The newest completed `kind` model for the pinned snapshot, without waiting for training.
+
+    Returns (trained, stale, job): trained is None until a first model exists,
+    and job is the training job for this snapshot when its model is missing.
+    A drift-watched model trained on older data is not stale while its
+    features stay within DRIFT_THRESHOLD. Responses built from a stale model
+    are kept out of the response cache.
+    """
+    snapshot = current_snapshot()
+    trained, stale = training_jobs.registry(kind).latest(snapshot)
+    if stale and not drifted(kind, trained, snapshot):
+        stale = False
+    job = None
+    if trained is None or stale:
+        job = training_jobs.submit(kind, snapshot)
+    if stale:
+        g.skip_response_cache = True
+    return trained, stale, job
+
+def training_pending(job, **empty):
+    """Response for a model-backed endpoint whose first model is not trained yet"""
+    if job.status in ('failed', 'cancelled'):
+        return jsonify(dict(empty, error=job.error or 'Training was cancelled', job=job.describe()))
+    return jsonify(dict(empty, pending=True, job=job.describe())), 202
+
+def model_status(trained, stale):
+    return {
+        'version': trained.info['version'],
+        'fingerprint': trained.info['fingerprint'],
+        'trained_at': trained.info['trained_at'],
+        'stale': stale
+    }
+
+segment_tracker = segmentation.SegmentationTracker()
+
+def customer_segmentation():
+    """Segment assignments of the pinned snapshot: (segmentation, trained model, stale, job).
+
+    Assignments start from the newest full fit and are carried to each new
+    dataset version incrementally; a full refit job is only started when
+    there is no model yet or the drift passes SEGMENT_DRIFT_THRESHOLD.
+    Segmentation and model are None until a first model is trained.
+    """
+    snapshot = current_snapshot()
+    trained, stale = segment_models.latest(snapshot)
+    if trained is None:
+        return None, None, stale, training_jobs.submit('segments', snapshot)
+    segments = snapshot.derived(f'segmentation:{trained.fingerprint}', lambda snapshot: segment_tracker.segment(
+        trained.model, trained.fingerprint, segment_matrix(snapshot), snapshot.version))
+    job = None
+    if segments.drift > SEGMENT_DRIFT_THRESHOLD:
+        job = training_jobs.submit('segments', snapshot)
+        # The refit will change the answer for this dataset version
+        g.skip_response_cache = True
+    return segments, trained, stale, job
+
+def churn_score_table():
+    """Customer churn scores of the pinned snapshot under the newest churn model.
+
+    Returns (table, trained model, stale, job); table and model are None while
+    no model has been trained.
+    """
+    snapshot = current_snapshot()
+    trained, stale, job = completed_model('churn')
+    if trained is None:
+        return None, None, stale, job
+    table = snapshot.derived(f'churn_scores:{trained.id}', lambda snapshot: churn_scores.ScoreTable(
+        snapshot.derived('license_facts', build_license_facts), trained.model,
+        snapshot.derived('feature_store', build_feature_store).license_frame(CHURN_FEATURES)))
+    return table, trained, stale, job
+
+# Appends to licenses/renewal_history (watcher or POST /api/ingest) skip the full reload
+ingestor = ingest.Ingestor(store, index_licenses, carry_license_state)
+store.set_appender(ingestor.poll)
+
+responses = response_cache.ResponseCache(RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MB * 1024 * 1024)
+store.on_swap(lambda old, new: responses.drop_older(new.version))
+
+def index_attached(tables):
+    """Entity indexes over data plane tables (the loader exported licenses already sorted)"""
+    if 'licenses' not in tables:
+        return {}
+    return entity_index.build_indexes(tables['licenses'], LICENSE_KEYS)
+
+# Data plane roles: the loader exports every snapshot, workers map them read-only
+plane_exporter = None
+plane_follower = data_plane.Follower(store, DATA_PLANE_DIR, index_attached) if DATA_PLANE_DIR else None
 
 def load_data():
-    """Load all CSV files into memory"""
-    global data
-    try:
-        data['vendors'] = pd.read_csv('software_monetization_dataset/vendors.csv')
-        data['customers'] = pd.read_csv('software_monetization_dataset/customers.csv')
-        data['products'] = pd.read_csv('software_monetization_dataset/products.csv')
-        data['licenses'] = pd.read_csv('software_monetization_dataset/licenses.csv')
-        data['usage_history'] = pd.read_csv('software_monetization_dataset/usage_history.csv')
-        data['renewal_history'] = pd.read_csv('software_monetization_dataset/renewal_history.csv')
-        
-        # Convert date columns
-        date_cols = {
-            'licenses': ['License_Start_Date', 'License_End_Date', 'Last_Login'],
-            'usage_history': ['Usage_Date'],
-            'renewal_history': ['Renewal_Date']
-        }
-        
-        for df_name, cols in date_cols.items():
-            for col in cols:
-                if col in data[df_name].columns:
-                    data[df_name][col] = pd.to_datetime(data[df_name][col], errors='coerce')
-        
-        print("Data loaded successfully!")
-    except Exception as e:
-        print(f"Error loading data: {e}")
+    """Load all CSV files into memory as the first dataset version"""
+    store.reload(force=True)
+    print("Data loaded successfully!")
+    dataset_schema.print_memory_report(data)
+
+def start_loader():
+    """Load the CSVs and export this and every later snapshot to the data plane"""
+    global plane_exporter, plane_follower
+    # String IDs of the growing fact tables are shared as Arrow strings too
+    plane_exporter = data_plane.Exporter(DATA_PLANE_DIR, ingest.APPEND_TABLES)
+    plane_follower = None
+    store.on_swap(plane_exporter)
+    load_data()
+
+def entity_licenses(column, entity_id):
+    """Licenses of one customer/product/vendor, sliced in O(k) through the entity index"""
+    snapshot = current_snapshot()
+    return snapshot.indexes[column].rows(snapshot.tables['licenses'], entity_id)
+
+def licenses_for_customer(customer_id):
+    """Licenses of one customer, or the whole table for 'all'"""
+    if customer_id == 'all':
+        return data['licenses']
+    return entity_licenses('Customer_ID', customer_id)
 
 # HTML Template
 HTML_TEMPLATE = '''
@@ -542,88 +999,78 @@ HTML_TEMPLATE = '''
         }
 
         function loadOverviewData(customerId) {
-                    // Load basic stats
-                    fetch('/api/overview')
-                        .then(response => response.json())
-                        .then(data => {
-                            // Load customer-specific metrics
-                            return fetch('/api/customer-metrics/' + customerId);
-                        })
-                        .then(response => response.json())
-                        .then(metrics => {
-                            document.getElementById('stats-grid').innerHTML = `
-                                <div class="stat-card">
-                                    <div class="stat-number">${metrics.total_licenses}</div>
-                                    <div class="stat-label">Total Purchase</div>
-                                </div>
-                                <div class="stat-card">
-                                    <div class="stat-number">$${(metrics.total_value / 1000000).toFixed(2)}M</div>
-                                    <div class="stat-label">Annual recurring revenue</div>
-                                </div>
-                                <div class="stat-card">
-                                    <div class="stat-number">${metrics.satisfaction_score}/10</div>
-                                    <div class="stat-label">Satisfaction Score</div>
-                                </div>
-                            `;
-                            
-                            // Load charts with customer filter
-                            loadRevenueChart(customerId);
-                            loadActivationChart(customerId);
-                            loadMetricsCharts(metrics);
-                            loadUsageTrends(customerId);
-                            loadRenewalTrends(customerId);
-                            loadPurchaseActivationTrends(customerId);
-                        });
-                }
-
-        function loadRevenueChart(customerId) {
-            fetch('/api/revenue-by-category/' + customerId)
+            // One round-trip for every overview panel of the selected customer
+            fetch('/api/dashboard/' + customerId)
                 .then(response => response.json())
                 .then(data => {
-                    const ctx = document.getElementById('revenue-chart').getContext('2d');
-                    if (charts.revenueChart) charts.revenueChart.destroy();
+                    const metrics = data.metrics;
+                    document.getElementById('stats-grid').innerHTML = `
+                        <div class="stat-card">
+                            <div class="stat-number">${metrics.total_licenses}</div>
+                            <div class="stat-label">Total Purchase</div>
+                        </div>
+                        <div class="stat-card">
+                            <div class="stat-number">$${(metrics.total_value / 1000000).toFixed(2)}M</div>
+                            <div class="stat-label">Annual recurring revenue</div>
+                        </div>
+                        <div class="stat-card">
+                            <div class="stat-number">${metrics.satisfaction_score}/10</div>
+                            <div class="stat-label">Satisfaction Score</div>
+                        </div>
+                    `;
                     
-                    charts.revenueChart = new Chart(ctx, {
-                        type: 'bar',
-                        data: {
-                            labels: data.categories,
-                            datasets: [{
-                                label: 'Revenue',
-                                data: data.revenues,
-                                backgroundColor: '#667eea'
-                            }]
-                        },
-                        options: {
-                            responsive: true,
-                            scales: { y: { beginAtZero: true } }
-                        }
-                    });
+                    renderRevenueChart(data.revenue_by_category);
+                    renderActivationChart(data.activation_by_product);
+                    loadMetricsCharts(metrics);
+                    renderUsageTrends(data.usage_trends);
+                    renderRenewalTrends(data.renewal_trends);
+                    renderPurchaseActivationTrends(data.purchase_activation_trends);
+                })
+                .catch(error => {
+                    console.error('Error loading dashboard:', error);
                 });
         }
 
-        function loadActivationChart(customerId) {
-            fetch('/api/activation-by-product/' + customerId)
-                .then(response => response.json())
-                .then(data => {
-                    const ctx = document.getElementById('activation-chart').getContext('2d');
-                    if (charts.activationChart) charts.activationChart.destroy();
-                    
-                    charts.activationChart = new Chart(ctx, {
-                        type: 'bar',
-                        data: {
-                            labels: data.products,
-                            datasets: [{
-                                label: 'Activation Rate (%)',
-                                data: data.rates,
-                                backgroundColor: '#764ba2'
-                            }]
-                        },
-                        options: {
-                            responsive: true,
-                            scales: { y: { beginAtZero: true, max: 100 } }
-                        }
-                    });
-                });
+        function renderRevenueChart(data) {
+            const ctx = document.getElementById('revenue-chart').getContext('2d');
+            if (charts.revenueChart) charts.revenueChart.destroy();
+            
+            charts.revenueChart = new Chart(ctx, {
+                type: 'bar',
+                data: {
+                    labels: data.categories,
+                    datasets: [{
+                        label: 'Revenue',
+                        data: data.revenues,
+                        backgroundColor: '#667eea'
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    scales: { y: { beginAtZero: true } }
+                }
+            });
+        }
+
+        function renderActivationChart(data) {
+            const ctx = document.getElementById('activation-chart').getContext('2d');
+            if (charts.activationChart) charts.activationChart.destroy();
+            
+            charts.activationChart = new Chart(ctx, {
+                type: 'bar',
+                data: {
+                    labels: data.products,
+                    datasets: [{
+                        label: 'Activation Rate (%)',
+                        data: data.rates,
+                        backgroundColor: '#764ba2'
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    scales: { y: { beginAtZero: true, max: 100 } }
+                }
+            });
         }
 
         function loadMetricsCharts(metrics) {
@@ -720,155 +1167,143 @@ HTML_TEMPLATE = '''
             });
         }
 
-        function loadUsageTrends(customerId) {
-            fetch('/api/usage-trends/' + customerId)
-                .then(response => response.json())
-                .then(data => {
-                    const ctx = document.getElementById('usage-trends-chart').getContext('2d');
-                    if (charts.usageTrendsChart) charts.usageTrendsChart.destroy();
-                    
-                    charts.usageTrendsChart = new Chart(ctx, {
-                        type: 'line',
-                        data: {
-                            labels: data.months,
-                            datasets: [{
-                                label: 'Avg Usage (Minutes)',
-                                data: data.usage,
-                                borderColor: '#667eea',
-                                backgroundColor: 'rgba(102, 126, 234, 0.1)',
-                                fill: true,
-                                tension: 0.4
-                            }]
-                        },
-                        options: {
-                            responsive: true,
-                            scales: { y: { beginAtZero: true } }
-                        }
-                    });
-                });
+        function renderUsageTrends(data) {
+            const ctx = document.getElementById('usage-trends-chart').getContext('2d');
+            if (charts.usageTrendsChart) charts.usageTrendsChart.destroy();
+            
+            charts.usageTrendsChart = new Chart(ctx, {
+                type: 'line',
+                data: {
+                    labels: data.months,
+                    datasets: [{
+                        label: 'Avg Usage (Minutes)',
+                        data: data.usage,
+                        borderColor: '#667eea',
+                        backgroundColor: 'rgba(102, 126, 234, 0.1)',
+                        fill: true,
+                        tension: 0.4
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    scales: { y: { beginAtZero: true } }
+                }
+            });
         }
 
-        function loadRenewalTrends(customerId) {
-            fetch('/api/renewal-trends/' + customerId)
-                .then(response => response.json())
-                .then(data => {
-                    const ctx = document.getElementById('renewal-trends-chart').getContext('2d');
-                    if (charts.renewalTrendsChart) charts.renewalTrendsChart.destroy();
-                    
-                    charts.renewalTrendsChart = new Chart(ctx, {
-                        type: 'bar',
-                        data: {
-                            labels: data.months,
-                            datasets: [{
-                                label: 'Number of Renewals',
-                                data: data.renewals,
-                                backgroundColor: '#27ae60',
-                                yAxisID: 'y'
-                            }, {
-                                label: 'Renewal Revenue',
-                                data: data.revenue,
-                                backgroundColor: '#764ba2',
-                                yAxisID: 'y1'
-                            }]
+        function renderRenewalTrends(data) {
+            const ctx = document.getElementById('renewal-trends-chart').getContext('2d');
+            if (charts.renewalTrendsChart) charts.renewalTrendsChart.destroy();
+            
+            charts.renewalTrendsChart = new Chart(ctx, {
+                type: 'bar',
+                data: {
+                    labels: data.months,
+                    datasets: [{
+                        label: 'Number of Renewals',
+                        data: data.renewals,
+                        backgroundColor: '#27ae60',
+                        yAxisID: 'y'
+                    }, {
+                        label: 'Renewal Revenue',
+                        data: data.revenue,
+                        backgroundColor: '#764ba2',
+                        yAxisID: 'y1'
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    scales: {
+                        y: {
+                            type: 'linear',
+                            display: true,
+                            position: 'left',
+                            beginAtZero: true,
+                            title: {
+                                display: true,
+                                text: 'Number of Renewals'
+                            }
                         },
-                        options: {
-                            responsive: true,
-                            scales: {
-                                y: {
-                                    type: 'linear',
-                                    display: true,
-                                    position: 'left',
-                                    beginAtZero: true,
-                                    title: {
-                                        display: true,
-                                        text: 'Number of Renewals'
-                                    }
-                                },
-                                y1: {
-                                    type: 'linear',
-                                    display: true,
-                                    position: 'right',
-                                    beginAtZero: true,
-                                    title: {
-                                        display: true,
-                                        text: 'Revenue ($)'
-                                    },
-                                    grid: {
-                                        drawOnChartArea: false
-                                    }
-                                }
+                        y1: {
+                            type: 'linear',
+                            display: true,
+                            position: 'right',
+                            beginAtZero: true,
+                            title: {
+                                display: true,
+                                text: 'Revenue ($)'
+                            },
+                            grid: {
+                                drawOnChartArea: false
                             }
                         }
-                    });
-                });
+                    }
+                }
+            });
         }
 
-        function loadPurchaseActivationTrends(customerId) {
-            fetch('/api/purchase-activation-trends/' + customerId)
-                .then(response => response.json())
-                .then(data => {
-                    const ctx = document.getElementById('purchase-activation-trends-chart').getContext('2d');
-                    if (charts.purchaseActivationTrendsChart) charts.purchaseActivationTrendsChart.destroy();
-                    
-                    charts.purchaseActivationTrendsChart = new Chart(ctx, {
-                        type: 'line',
-                        data: {
-                            labels: data.months,
-                            datasets: [
-                                {
-                                    label: 'Purchases (#)',
-                                    data: data.purchases,
-                                    borderColor: '#764ba2',
-                                    backgroundColor: 'rgba(118, 75, 162, 0.1)',
-                                    fill: true,
-                                    tension: 0.4,
-                                    yAxisID: 'y'
-                                },
-                                {
-                                    label: 'Activation Rate (%)',
-                                    data: data.activation_rate,
-                                    borderColor: '#667eea',
-                                    backgroundColor: 'rgba(102, 126, 234, 0.1)',
-                                    fill: false,
-                                    yAxisID: 'y1'
-                                }
-                            ]
+        function renderPurchaseActivationTrends(data) {
+            const ctx = document.getElementById('purchase-activation-trends-chart').getContext('2d');
+            if (charts.purchaseActivationTrendsChart) charts.purchaseActivationTrendsChart.destroy();
+            
+            charts.purchaseActivationTrendsChart = new Chart(ctx, {
+                type: 'line',
+                data: {
+                    labels: data.months,
+                    datasets: [
+                        {
+                            label: 'Purchases (#)',
+                            data: data.purchases,
+                            borderColor: '#764ba2',
+                            backgroundColor: 'rgba(118, 75, 162, 0.1)',
+                            fill: true,
+                            tension: 0.4,
+                            yAxisID: 'y'
                         },
-                        options: {
-                            responsive: true,
-                            interaction: {
-                                mode: 'index',
-                                intersect: false,
+                        {
+                            label: 'Activation Rate (%)',
+                            data: data.activation_rate,
+                            borderColor: '#667eea',
+                            backgroundColor: 'rgba(102, 126, 234, 0.1)',
+                            fill: false,
+                            yAxisID: 'y1'
+                        }
+                    ]
+                },
+                options: {
+                    responsive: true,
+                    interaction: {
+                        mode: 'index',
+                        intersect: false,
+                    },
+                    stacked: false,
+                    scales: {
+                        y: {
+                            type: 'linear',
+                            display: true,
+                            position: 'left',
+                            title: {
+                                display: true,
+                                text: 'Total Purchases'
                             },
-                            stacked: false,
-                            scales: {
-                                y: {
-                                    type: 'linear',
-                                    display: true,
-                                    position: 'left',
-                                    title: {
-                                        display: true,
-                                        text: 'Total Purchases'
-                                    },
-                                    beginAtZero: true
-                                },
-                                y1: {
-                                    type: 'linear',
-                                    display: true,
-                                    position: 'right',
-                                    title: {
-                                        display: true,
-                                        text: 'Activation Rate (%)'
-                                    },
-                                    grid: {
-                                        drawOnChartArea: false
-                                    },
-                                    max: 100
-                                }
-                            }
+                            beginAtZero: true
+                        },
+                        y1: {
+                            type: 'linear',
+                            display: true,
+                            position: 'right',
+                            title: {
+                                display: true,
+                                text: 'Activation Rate (%)'
+                            },
+                            grid: {
+                                drawOnChartArea: false
+                            },
+                            max: 100
                         }
-                    });
-                });
+                    }
+                }
+            });
         }
 
         function loadRecommendationsTab() {
@@ -922,11 +1357,20 @@ HTML_TEMPLATE = '''
                 });
         }
 
+        // Model-backed endpoints answer 202 while their training job runs: poll until the result is ready
+        function fetchResult(url) {
+            return fetch(url).then(response => {
+                if (response.status === 202) {
+                    return new Promise(resolve => setTimeout(resolve, 2000)).then(() => fetchResult(url));
+                }
+                return response.json();
+            });
+        }
+
         function loadAssociationRules() {
             document.getElementById('association-rules').innerHTML = '<p class="loading">Loading association rules...</p>';
             
-            fetch('/api/association-rules')
-                .then(response => response.json())
+            fetchResult('/api/association-rules')
                 .then(data => {
                     if (data.rules && data.rules.length > 0) {
                         let html = '<div style="overflow-x: auto;"><table>';
@@ -960,8 +1404,7 @@ HTML_TEMPLATE = '''
         }
 
         function loadChurnAnalysis() {
-            fetch('/api/churn-model')
-                .then(response => response.json())
+            fetchResult('/api/churn-model')
                 .then(data => {
 
                     
@@ -1130,8 +1573,7 @@ HTML_TEMPLATE = '''
         }
 
         function loadHighRiskCustomers() {
-            fetch('/api/high-risk-customers')
-                .then(response => response.json())
+            fetchResult('/api/high-risk-customers')
                 .then(data => {
                     let html = '<table><thead><tr><th>Customer</th><th>Churn Probability</th><th>Contract Value</th></tr></thead><tbody>';
                     data.customers.forEach(customer => {
@@ -1168,8 +1610,7 @@ HTML_TEMPLATE = '''
         }
 
         function loadSegmentation() {
-            fetch('/api/customer-segments')
-                .then(response => response.json())
+            fetchResult('/api/customer-segments')
                 .then(data => {
                     const ctx1 = document.getElementById('segment-distribution').getContext('2d');
                     if (charts.segmentDistChart) charts.segmentDistChart.destroy();
@@ -1180,7 +1621,7 @@ HTML_TEMPLATE = '''
                             labels: data.segments,
                             datasets: [{
                                 data: data.counts,
-                                backgroundColor: ['#667eea', '#764ba2', '#f093fb', '#4facfe']
+                                backgroundColor: ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#43e97b', '#fa709a', '#fee140']
                             }]
                         },
                         options: { responsive: true }
@@ -1251,8 +1692,7 @@ HTML_TEMPLATE = '''
         }
 
         function loadDriverAnalysis() {
-            fetch('/api/driver-analysis')
-                .then(response => response.json())
+            fetchResult('/api/driver-analysis')
                 .then(data => {
                     if (data.drivers && data.drivers.length > 0) {
                         const ctx = document.getElementById('drivers-chart').getContext('2d');
@@ -1271,6 +1711,16 @@ HTML_TEMPLATE = '''
                             options: {
                                 indexAxis: 'y',
                                 responsive: true,
+                                plugins: {
+                                    tooltip: {
+                                        callbacks: {
+                                            afterLabel: context => data.ci_lower ?
+                                                Math.round(data.confidence * 100) + '% interval: [' +
+                                                data.ci_lower[context.dataIndex].toFixed(3) + ', ' +
+                                                data.ci_upper[context.dataIndex].toFixed(3) + ']' : ''
+                                        }
+                                    }
+                                },
                                 scales: { 
                                     x: { 
                                         beginAtZero: true,
@@ -1368,8 +1818,14 @@ HTML_TEMPLATE = '''
                 html += '<summary style="cursor: pointer; font-weight: 500;">📊 Technical Details (for data analysts)</summary>';
                 html += '<div style="margin-top: 8px; padding-left: 15px; border-left: 2px solid #e0e0e0;">';
                 html += '<div>Coefficient: ' + coef.toFixed(4) + '</div>';
+                if (data.ci_lower) {
+                    const level = Math.round(data.confidence * 100);
+                    const crossesZero = data.ci_lower[idx] <= 0 && data.ci_upper[idx] >= 0;
+                    html += '<div>' + level + '% Interval: [' + data.ci_lower[idx].toFixed(4) + ', ' + data.ci_upper[idx].toFixed(4) + ']' +
+                        (crossesZero ? ' (includes zero: direction not certain)' : '') + '</div>';
+                }
                 html += '<div>Odds Ratio: ' + odds.toFixed(4) + '</div>';
-                html += '<div>Mathematical interpretation: A one-unit increase in ' + driver + ' ' + impact + ' the log-odds of renewal by ' + Math.abs(coef).toFixed(3) + '</div>';
+                html += '<div>Mathematical interpretation: A one-standard-deviation increase in ' + driver + ' ' + impact + ' the log-odds of renewal by ' + Math.abs(coef).toFixed(3) + '</div>';
                 html += '</div></details></div>';
             });
             
@@ -1466,33 +1922,151 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+def cacheable_request():
+    return (request.method == 'GET' and request.path.startswith('/api/')
+            and not any(request.path.startswith(route) for route in UNCACHED_ROUTES))
+
+def response_etag(snapshot):
+    return f'v{snapshot.version}-{snapshot.fingerprint}-{responses.generation}'
+
+def tag_response(response, snapshot):
+    """ETag the response with the dataset version and make browsers revalidate it"""
+    response.set_etag(response_etag(snapshot))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.before_request
+def attach_data_plane():
+    """Data plane workers map the current generation on their first request"""
+    if plane_follower is not None and store.version == 0:
+        plane_follower.start(DATA_PLANE_POLL_SECONDS)
+
+@app.before_request
+def serve_cached_response():
+    """Answer repeat API requests for the same dataset version without recomputing"""
+    if not cacheable_request():
+        return None
+    snapshot = current_snapshot()
+    if response_etag(snapshot) in request.if_none_match:
+        responses.record_not_modified()
+        return tag_response(Response(status=304), snapshot)
+    g.cache_key = responses.key(request.path, request.args, snapshot.version)
+    cached = responses.get(g.cache_key)
+    if cached is None:
+        return None
+    g.cache_hit = True
+    return tag_response(Response(cached.body, status=cached.status, mimetype=cached.mimetype), snapshot)
+
+@app.after_request
+def cache_response(response):
+    """Store fresh API responses and tag them with the dataset version"""
+    if 'cache_key' not in g or g.get('cache_hit') or g.get('skip_response_cache') or response.status_code != 200:
+        return response
+    body = response.get_data()
+    payload = response.get_json(silent=True)
+    if isinstance(payload, dict) and 'error' in payload:
+        # Don't pin a failure for the lifetime of the dataset version
+        return response
+    responses.put(g.cache_key, response_cache.CachedResponse(body, response.status_code, response.mimetype))
+    return tag_response(response, current_snapshot())
+
 @app.route('/')
 def index():
     return render_template_string(HTML_TEMPLATE)
 
 # ==================== API ENDPOINTS ====================
 
+@app.route('/api/dataset')
+def dataset_info():
+    """Get the version of the dataset snapshot serving this request"""
+    try:
+        return jsonify(current_snapshot().describe())
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    """Get response cache counters (hits, misses, evictions, 304s) for sizing it"""
+    try:
+        return jsonify(dict(responses.stats(), version=store.version))
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/jobs/<kind>', methods=['POST'])
+def submit_job(kind):
+    """Start training a model kind on the current dataset (or get the job already doing it)"""
+    try:
+        if kind not in training_jobs.kinds:
+            return jsonify({'error': f'Unknown job kind: {kind}', 'kinds': training_jobs.kinds}), 404
+        job = training_jobs.submit(kind, current_snapshot(), retry=True)
+        return jsonify(job.describe()), 200 if job.finished else 202
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Get the status and progress of a training job"""
+    try:
+        job = training_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': f'Unknown job: {job_id}'}), 404
+        return jsonify(job.describe())
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Get recent training jobs, newest first; ?kind= narrows the list"""
+    try:
+        return jsonify({'jobs': [job.describe() for job in training_jobs.list(request.args.get('kind'))],
+                        'kinds': training_jobs.kinds})
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/drift')
+def drift_scores():
+    """Get the feature drift (PSI) of the current licenses against each drift-watched model's training data"""
+    try:
+        snapshot = current_snapshot()
+        models = {}
+        for kind, features in DRIFT_FEATURES.items():
+            trained, stale = training_jobs.registry(kind).latest(snapshot)
+            jobs_ = training_jobs.list(kind)
+            entry = {'features': features, 'model': None, 'job': jobs_[0].describe() if jobs_ else None}
+            if trained is not None:
+                retrain = stale and drifted(kind, trained, snapshot)
+                entry.update(model=model_status(trained, retrain), retrain=retrain)
+                scores = model_drift(snapshot, trained)
+                if scores is not None:
+                    reference = feature_drift.FeatureHistograms.from_dict(trained.info['feature_histograms'])
+                    entry.update({
+                        'psi': round(max(scores.values()), 4),
+                        'scores': [{'feature': feature, 'psi': round(score, 4)}
+                                   for feature, score in sorted(scores.items(), key=lambda item: -item[1])],
+                        'training_rows': reference.rows,
+                        'rows': drift_histograms(snapshot, trained).rows
+                    })
+            models[kind] = entry
+        return jsonify({'version': snapshot.version, 'threshold': DRIFT_THRESHOLD, 'models': models})
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
 @app.route('/api/overview')
 def overview():
     """Get overview statistics"""
     try:
-        licenses = data['licenses']
+        totals = license_totals()
         
         # Calculate activation rate
-        total_purchased = licenses['Number_of_quantities_purchased'].sum()
-        total_activated = licenses['Number_of_quantities_activated'].sum()
-        activation_rate = (total_activated / total_purchased * 100) if total_purchased > 0 else 0
-        
-        # Count high churn risk
-        high_churn = len(licenses[licenses['Churn_Risk'] == 'High'])
+        activation_rate = (totals.activated / totals.purchased * 100) if totals.purchased > 0 else 0
         
         stats = {
-            'total_licenses': len(licenses),
-            'total_customers': licenses['Customer_ID'].nunique(),
-            'total_products': licenses['Product_ID'].nunique(),
-            'total_revenue': float(licenses['Contract_Value'].sum()),
+            'total_licenses': totals.count,
+            'total_customers': len(totals.customers),
+            'total_products': len(totals.products),
+            'total_revenue': totals.revenue,
             'activation_rate': round(activation_rate, 1),
-            'churn_risk_high': high_churn
+            'churn_risk_high': totals.high_churn
         }
         return jsonify(stats)
     except Exception as e:
@@ -1502,11 +2076,9 @@ def overview():
 def revenue_by_category():
     """Get revenue by product category"""
     try:
-        # Merge licenses with products
-        merged = data['licenses'].merge(data['products'], on='Product_ID')
-        
-        # Group by category
-        category_revenue = merged.groupby('Product_Category')['Contract_Value'].sum().sort_values(ascending=False).head(10)
+        # Running per-category sums (licenses inner-joined with products)
+        category_revenue = license_totals().category_revenue_series().sort_index()
+        category_revenue = category_revenue.sort_values(ascending=False).head(10)
         
         return jsonify({
             'categories': category_revenue.index.tolist(),
@@ -1519,22 +2091,16 @@ def revenue_by_category():
 def activation_by_product():
     """Get activation rate by product"""
     try:
-        licenses = data['licenses']
-        products = data['products']
-        
-        # Calculate activation rate per product
-        product_stats = licenses.groupby('Product_ID').agg({
-            'Number_of_quantities_purchased': 'sum',
-            'Number_of_quantities_activated': 'sum'
-        }).reset_index()
+        # Running per-product sums
+        product_stats = license_totals().product_activation_frame()
         
         product_stats['activation_rate'] = (
             product_stats['Number_of_quantities_activated'] / 
             product_stats['Number_of_quantities_purchased'] * 100
         ).fillna(0)
         
-        # Merge with product names
-        product_stats = product_stats.merge(products[['Product_ID', 'Product_Name']], on='Product_ID')
+        # Only products in the catalogue have a name
+        product_stats = product_stats.dropna(subset=['Product_Name'])
         product_stats = product_stats.sort_values('activation_rate', ascending=False).head(10)
         
         # Truncate names
@@ -1547,6 +2113,29 @@ def activation_by_product():
     except Exception as e:
         return jsonify({'error': str(e)})
 
+@app.route('/api/ingest/<table>', methods=['POST'])
+def ingest_rows(table):
+    """Append license or renewal rows without a full dataset reload"""
+    try:
+        payload = request.get_json(silent=True)
+        rows = payload.get('rows') if isinstance(payload, dict) else payload
+        if plane_follower is not None:
+            # Workers only persist the rows; the loader tails them into the next generation
+            ingestor.append(table, rows, publish=False)
+            return jsonify({'table': table, 'appended': len(rows), 'queued': True,
+                            'version': store.version}), 202
+        snapshot = ingestor.append(table, rows)
+        return jsonify({
+            'table': table,
+            'appended': len(rows),
+            'version': snapshot.version,
+            'rows': len(snapshot.tables[table])
+        })
+    except ingest.ValidationError as e:
+        return jsonify({'error': str(e), 'details': e.errors}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
 @app.route('/api/entities/<entity_type>')
 def get_entities(entity_type):
     """Get list of customers or vendors (now only supports customers)"""
@@ -1570,45 +2159,35 @@ def get_entities(entity_type):
 def get_recommendations(entity_type, entity_id):
     """Get product recommendations using collaborative filtering"""
     try:
-        licenses = data['licenses']
         products = data['products']
         
         print(f"Getting recommendations for {entity_type}: {entity_id}")
         
         if entity_type == 'customer':
             # Get products this customer has purchased
-            customer_products = set(licenses[licenses['Customer_ID'] == entity_id]['Product_ID'].values)
+            customer_products = set(entity_licenses('Customer_ID', entity_id)['Product_ID'].values)
             
             print(f"Customer has {len(customer_products)} products")
             
             if len(customer_products) == 0:
                 return jsonify({'recommendations': []})
             
-            # Find similar customers
-            similar_customers = licenses[licenses['Product_ID'].isin(customer_products)]['Customer_ID'].unique()
-            similar_customers = [c for c in similar_customers if c != entity_id]
-            
-            print(f"Found {len(similar_customers)} similar customers")
-            
-            # Get products bought by similar customers
-            recommended_products = licenses[
-                (licenses['Customer_ID'].isin(similar_customers)) &
-                (~licenses['Product_ID'].isin(customer_products))
-            ].groupby('Product_ID').size().sort_values(ascending=False).head(5)
+            # Products most similar to the customer's, from their precomputed neighbour lists; the
+            # score sums a product's similarity to every owned product, confidence is the best one
+            names = catalogue_names()
+            recommended_products = item_neighbours().recommend(customer_products, 5, known=names)
             
             print(f"Found {len(recommended_products)} recommendations")
             
             # Build recommendations
             recommendations = []
-            for prod_id, count in recommended_products.items():
-                product_info = products[products['Product_ID'] == prod_id]
-                if len(product_info) > 0:
-                    product_info = product_info.iloc[0]
-                    recommendations.append({
-                        'product_name': product_info['Product_Name'],
-                        'confidence': min(count / len(similar_customers), 1.0),
-                        'reason': f'Popular among similar customers ({count} purchases)'
-                    })
+            for prod_id, score, owned_id, similarity, count in recommended_products:
+                recommendations.append({
+                    'product_name': names[prod_id],
+                    'confidence': similarity,
+                    'score': score,
+                    'reason': f'Bought with {names.get(owned_id, owned_id)} by {count} customers'
+                })
             
             return jsonify({'recommendations': recommendations})
             
@@ -1621,8 +2200,10 @@ def get_recommendations(entity_type, entity_id):
             if len(vendor_products) == 0:
                 return jsonify({'recommendations': []})
             
+            facts = license_fact_table()
+            
             # Get customers who bought from this vendor
-            vendor_customers = licenses[licenses['Product_ID'].isin(vendor_products)]['Customer_ID'].unique()
+            vendor_customers = facts[facts['Product_Vendor_ID'] == entity_id]['Customer_ID'].unique()
             
             print(f"Vendor has {len(vendor_customers)} customers")
             
@@ -1630,26 +2211,24 @@ def get_recommendations(entity_type, entity_id):
                 return jsonify({'recommendations': []})
             
             # Get products from OTHER vendors that these customers bought
-            other_products = licenses[
-                (licenses['Customer_ID'].isin(vendor_customers)) &
-                (~licenses['Product_ID'].isin(vendor_products))
+            other_products = facts[
+                (facts['Customer_ID'].isin(vendor_customers)) &
+                (~facts['Product_ID'].isin(vendor_products))
             ]
             
             print(f"Found {len(other_products)} purchases from other vendors")
             
-            # Merge to get product details
-            other_products = other_products.merge(
-                products[['Product_ID', 'Product_Name', 'Vendor_ID']], 
-                on='Product_ID'
-            )
+            # Product details are already on the fact rows
+            other_products = license_facts.catalogued(other_products)
             
             # Group by product and count
-            product_counts = other_products.groupby('Product_ID').agg({
-                'Customer_ID': 'nunique',
-                'Product_Name': 'first'
+            product_counts = other_products.groupby('Product_ID', observed=True).agg({
+                'Customer_ID': 'nunique'
             }).reset_index()
             
-            product_counts.columns = ['Product_ID', 'customer_count', 'Product_Name']
+            product_counts.columns = ['Product_ID', 'customer_count']
+            product_names = license_facts.first_values(other_products, 'Product_ID', 'Product_Name')
+            product_counts['Product_Name'] = product_counts['Product_ID'].astype(object).map(product_names)
             product_counts = product_counts.sort_values('customer_count', ascending=False).head(5)
             
             print(f"Top recommendations: {len(product_counts)}")
@@ -1675,184 +2254,80 @@ def get_recommendations(entity_type, entity_id):
 def purchase_trends(customer_id):
     """Get purchase trends over time (using License_Start_Date as purchase date)"""
     try:
-        licenses = data['licenses'].copy()
-        
-        if customer_id != 'all':
-            licenses = licenses[licenses['Customer_ID'] == customer_id]
-            
-        licenses['Purchase_Date'] = licenses['License_Start_Date'] # Use start date as proxy for purchase date
-        licenses = licenses.dropna(subset=['Purchase_Date'])
+        # Start month is the proxy for purchase date; licenses without one are left out
+        monthly_purchases = license_cube().rollup('Month', customer_id)
         
-        licenses['YearMonth'] = licenses['Purchase_Date'].dt.to_period('M').astype(str)
         # Aggregate by summing the quantities purchased, not just counting licenses
-        monthly_purchases = licenses.groupby('YearMonth')['Number_of_quantities_purchased'].sum().reset_index()
-        monthly_purchases = monthly_purchases.sort_values('YearMonth').tail(12)
-        
-        monthly_purchases['MonthLabel'] = pd.to_datetime(monthly_purchases['YearMonth']).dt.strftime('%b %Y')
+        monthly_purchases = monthly_purchases['Number_of_quantities_purchased_sum'].sort_index().tail(12)
+        month_labels = pd.to_datetime(monthly_purchases.index).strftime('%b %Y')
         
         return jsonify({
-            'months': monthly_purchases['MonthLabel'].tolist(),
-            'purchases': monthly_purchases['Number_of_quantities_purchased'].tolist()
+            'months': month_labels.tolist(),
+            'purchases': monthly_purchases.tolist()
         })
     except Exception as e:
-        # Fallback to empty data on error
+        print(f"Purchase trends error: {e}")
+        # Fallback to empty data on error, not cached so the next request tries again
+        g.skip_response_cache = True
         return jsonify({'months': [], 'purchases': []})
     
 @app.route('/api/activation-trends/<customer_id>')
 def activation_trends(customer_id):
     """Get activation trends over time (by license start month)"""
     try:
-        licenses = data['licenses'].copy()
+        monthly_activations = license_cube().rollup('Month', customer_id)
         
-        if customer_id != 'all':
-            licenses = licenses[licenses['Customer_ID'] == customer_id]
-            
-        licenses['Activation_Date'] = licenses['License_Start_Date'] 
-        licenses = licenses.dropna(subset=['Activation_Date'])
-
-        licenses['YearMonth'] = licenses['Activation_Date'].dt.to_period('M').astype(str)
         # Aggregate by summing the quantities activated
-        monthly_activations = licenses.groupby('YearMonth')['Number_of_quantities_activated'].sum().reset_index()
-        monthly_activations = monthly_activations.sort_values('YearMonth').tail(12)
-        
-        monthly_activations['MonthLabel'] = pd.to_datetime(monthly_activations['YearMonth']).dt.strftime('%b %Y')
+        monthly_activations = monthly_activations['Number_of_quantities_activated_sum'].sort_index().tail(12)
+        month_labels = pd.to_datetime(monthly_activations.index).strftime('%b %Y')
         
         return jsonify({
-            'months': monthly_activations['MonthLabel'].tolist(),
-            'activations': monthly_activations['Number_of_quantities_activated'].tolist()
+            'months': month_labels.tolist(),
+            'activations': monthly_activations.tolist()
         })
     except Exception as e:
-        # Fallback to empty data on error
+        print(f"Activation trends error: {e}")
+        # Fallback to empty data on error, not cached so the next request tries again
+        g.skip_response_cache = True
         return jsonify({'months': [], 'activations': []})
     
 
 
 @app.route('/api/association-rules')
 def association_rules_api():
-    """Generate association rules using Apriori algorithm"""
+    """Get the product association rules of the current dataset's itemset lattice (Eclat);
+    ?min_support=, ?min_confidence=, ?min_lift= and ?top= set the thresholds"""
     try:
-        licenses = data['licenses']
-        products = data['products']
-        
-        # 1. Standardize Product IDs to ensure all items are strings
-        #    This prevents the sorting error (float < str).
-        licenses['Product_ID'] = licenses['Product_ID'].astype(str) # <--- ADD THIS LINE
-        products['Product_ID'] = products['Product_ID'].astype(str) # <--- ADD THIS LINE
-        
-        # Create transaction data (customer-product purchases)
-        customer_products = licenses.groupby('Customer_ID')['Product_ID'].apply(list).reset_index()
-        transactions = customer_products['Product_ID'].values.tolist()
-        
-        # Filter out empty transactions and single-item transactions
-        transactions = [list(set(t)) for t in transactions if len(t) > 1]
-        
-        print(f"Total multi-product transactions: {len(transactions)}")
-        
-        if len(transactions) < 2:
-            return jsonify({'rules': [], 'message': 'Not enough customers buying multiple products'})
-        
-        # Get product names mapping (must use the standardized Product_ID)
-        product_names = dict(zip(products['Product_ID'], products['Product_Name'])) # Ensure this uses string IDs
-        
-        # Use TransactionEncoder
-        te = TransactionEncoder()
-        # The error occurred here because unique_items contained mixed types:
-        te_ary = te.fit(transactions).transform(transactions)
-        df_encoded = pd.DataFrame(te_ary, columns=te.columns_)
-        
-        print(f"Encoded shape: {df_encoded.shape}")
-        print(f"Products in transactions: {df_encoded.shape[1]}")
-        
-        # Calculate product frequencies
-        product_freq = df_encoded.sum().sort_values(ascending=False)
-        print(f"Top 10 most common products:\n{product_freq.head(10)}")
-        
-        # Try progressively lower support thresholds
-        frequent_itemsets = None
-        for min_sup in [0.02, 0.01, 0.005, 0.003, 0.001, 0.0005]:
-            try:
-                frequent_itemsets = apriori(df_encoded, min_support=min_sup, use_colnames=True, max_len=4)
-                print(f"Support {min_sup}: {len(frequent_itemsets)} itemsets")
-                
-                if len(frequent_itemsets) > 10:
-                    print(f"Using support threshold: {min_sup}")
-                    break
-            except Exception as e:
-                print(f"Error at support {min_sup}: {e}")
-                continue
-        
-        if frequent_itemsets is None or len(frequent_itemsets) <= 1:
-            # If apriori fails, create manual co-occurrence rules
-            print("Apriori failed, creating manual co-occurrence patterns")
-            
-            co_occurrence = {}
-            for transaction in transactions:
-                for i, prod1 in enumerate(transaction):
-                    for prod2 in transaction[i+1:]:
-                        key = tuple(sorted([prod1, prod2]))
-                        co_occurrence[key] = co_occurrence.get(key, 0) + 1
-            
-            # Sort by frequency
-            sorted_pairs = sorted(co_occurrence.items(), key=lambda x: x[1], reverse=True)[:15]
-            
-            rules_list = []
-            total_transactions = len(transactions)
-            
-            for (prod1, prod2), count in sorted_pairs:
-                prod1_count = sum(1 for t in transactions if prod1 in t)
-                confidence = count / prod1_count if prod1_count > 0 else 0
-                
-                # Calculate lift
-                prod2_count = sum(1 for t in transactions if prod2 in t)
-                expected = (prod1_count / total_transactions) * (prod2_count / total_transactions)
-                actual = count / total_transactions
-                lift = actual / expected if expected > 0 else 0
-                
-                rules_list.append({
-                    'antecedent': product_names.get(prod1, str(prod1))[:40],
-                    'consequent': product_names.get(prod2, str(prod2))[:40],
-                    'confidence': float(confidence),
-                    'lift': float(lift),
-                    'support': count
-                })
-            
-            return jsonify({'rules': rules_list})
-        
-        # Generate association rules with very low confidence
-        try:
-            rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=0.01)
-            print(f"Rules generated: {len(rules)}")
-        except Exception as e:
-            print(f"Could not generate rules: {e}")
-            return jsonify({'rules': []})
-        
-        if len(rules) == 0:
-            print("No rules found even with low threshold")
-            return jsonify({'rules': []})
-        
-        # Sort by lift (shows strongest associations regardless of frequency)
-        rules = rules.sort_values('lift', ascending=False).head(20)
-        
-        rules_list = []
-        for _, rule in rules.iterrows():
-            # Convert frozensets to lists
-            antecedent_list = list(rule['antecedents'])
-            consequent_list = list(rule['consequents'])
-            
-            # Get product names
-            antecedent = ', '.join([product_names.get(p, str(p))[:35] for p in antecedent_list])
-            consequent = ', '.join([product_names.get(p, str(p))[:35] for p in consequent_list])
-            
-            rules_list.append({
-                'antecedent': antecedent,
-                'consequent': consequent,
-                'confidence': float(rule['confidence']),
-                'lift': float(rule['lift']),
-                'support': float(rule['support'])
-            })
-        
-        print(f"Returning {len(rules_list)} rules")
-        return jsonify({'rules': rules_list})
+        trained, stale, job = completed_model('association-rules')
+        if trained is None:
+            return training_pending(job, rules=[])
+        
+        lattice = trained.model
+        result = {'rules': [], 'model': model_status(trained, stale)}
+        if lattice is None:
+            result['message'] = trained.info['message']
+        elif 'fallback_rules' in trained.info:
+            result['rules'] = trained.info['fallback_rules']
+        else:
+            min_support = request.args.get('min_support', trained.info['min_support'], type=float)
+            if min_support < lattice.min_support:
+                return jsonify({'error': f'min_support must be at least {lattice.min_support}, '
+                                         f'the support the itemsets were mined down to',
+                                'lattice_support': lattice.min_support, 'rules': []}), 400
+            rules = lattice.rules(min_support,
+                                  request.args.get('min_confidence', ASSOCIATION_RULE_PARAMS['min_confidence'],
+                                                   type=float),
+                                  request.args.get('min_lift', 0.0, type=float),
+                                  request.args.get('top', ASSOCIATION_RULE_PARAMS['top'], type=int))
+            result['rules'] = [{
+                'antecedent': lattice.label(rule.antecedents),
+                'consequent': lattice.label(rule.consequents),
+                'confidence': float(rule.confidence),
+                'lift': float(rule.lift),
+                'support': float(rule.support)
+            } for rule in rules.itertuples(index=False)]
+            result.update(min_support=min_support, lattice_support=lattice.min_support)
+        return jsonify(result)
         
     except Exception as e:
         print(f"Association rules error: {e}")
@@ -1862,94 +2337,115 @@ def association_rules_api():
 
 @app.route('/api/churn-model')
 def churn_model():
-    """Build and evaluate churn prediction model"""
+    """Get the churn model's held-out metrics and feature importances"""
     try:
-        licenses = data['licenses']
-        
-        # Create churn label (1 if Churn_Risk is High, 0 otherwise)
-        licenses['churn_label'] = (licenses['Churn_Risk'] == 'High').astype(int)
-        
-        # Select features for modeling
-        feature_cols = [
-            'Number_of_quantities_purchased',
-            'Number_of_quantities_activated',
-            'Percentage_of_quantities_deployed',
-            'Days_since_last_quantity_purchased',
-            'Days_since_last_quantity_activated',
-            'Frequency_of_Product_Purchase',
-            'Satisfaction_Score',
-            'Support_Tickets',
-            'Feature_Utilization'
-        ]
-        
-        # Prepare data
-        X = licenses[feature_cols].fillna(0)
-        y = licenses['churn_label']
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-        
-        # Train Random Forest model
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        
-        # Predictions
-        y_pred = model.predict(X_test)
-        
-        # Calculate metrics
-        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-        
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred, zero_division=0)
-        recall = recall_score(y_test, y_pred, zero_division=0)
-        f1 = f1_score(y_test, y_pred, zero_division=0)
+        trained, stale, job = completed_model('churn')
+        if trained is None:
+            return training_pending(job)
         
-        # Feature importance
-        importances = model.feature_importances_
-        feature_importance = sorted(zip(feature_cols, importances), key=lambda x: x[1], reverse=True)
+        info = trained.info
+        return jsonify({
+            'accuracy': info['accuracy'],
+            'precision': info['precision'],
+            'recall': info['recall'],
+            'f1_score': info['f1_score'],
+            'features': info['features'],
+            'importances': info['importances'],
+            'model': dict(model_status(trained, stale), train_seconds=info['train_seconds'],
+                          hyperparameters=info.get('hyperparameters'), tuned=info.get('tuned', False))
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/churn-model/tuning')
+def churn_model_tuning():
+    """Get the newest churn hyperparameter search: every trial, and fit/predict latency against accuracy"""
+    try:
+        trained, stale = churn_tuning.latest(current_snapshot())
+        if trained is None:
+            return jsonify({'error': 'No tuning run yet (POST /api/jobs/churn-tuning starts one)',
+                            'trials': [], 'report': []}), 404
         
+        info = trained.info
         return jsonify({
-            'accuracy': float(accuracy),
-            'precision': float(precision),
-            'recall': float(recall),
-            'f1_score': float(f1),
-            'features': [f[0] for f in feature_importance],
-            'importances': [float(f[1]) for f in feature_importance]
+            'hyperparameters': info['hyperparameters'],
+            'cv_accuracy': info['cv_accuracy'],
+            'accuracy': info['accuracy'],
+            'default_accuracy': info['default_accuracy'],
+            'promoted': info['promote'],
+            'rounds': info['rounds'],
+            'trials': info['trials'],
+            'report': info['report'],
+            'model': dict(model_status(trained, stale), train_seconds=info['train_seconds'])
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/churn-score/<customer_id>')
+def churn_score(customer_id):
+    """Get one customer's churn probability and the features contributing most to it"""
+    try:
+        trained, stale, job = completed_model('churn')
+        if trained is None:
+            return training_pending(job)
+        
+        vector = model_features().customer_vector(customer_id, CHURN_FEATURES)
+        if vector is None:
+            return jsonify({'error': 'Customer not found'}), 404
+        explainer = current_snapshot().derived(
+            f'churn_explainer:{trained.id}',
+            lambda snapshot: churn_scores.ForestExplainer(trained.model, CHURN_FEATURES))
+        probability, contributions = explainer.explain(vector)
+        
+        # Features pushing the probability furthest from the base rate, either way
+        top = sorted(range(len(CHURN_FEATURES)), key=lambda i: abs(contributions[i]), reverse=True)[:5]
+        return jsonify({
+            'customer_id': customer_id,
+            'churn_prob': round(probability, 4),
+            'base_rate': round(explainer.base_rate, 4),
+            'top_features': [
+                {
+                    'feature': CHURN_FEATURES[i],
+                    'value': round(float(vector[i]), 4),
+                    'contribution': round(contributions[i], 4)
+                }
+                for i in top
+            ],
+            'model': model_status(trained, stale)
         })
     except Exception as e:
         return jsonify({'error': str(e)})
 
 @app.route('/api/high-risk-customers')
 def high_risk_customers():
-    """Get list of high churn risk customers"""
+    """Get the customers most likely to churn; ?k=, ?segment=, ?vendor= and ?min_prob= narrow the list"""
     try:
-        licenses = data['licenses']
-        customers = data['customers']
+        scores, trained, stale, job = churn_score_table()
+        if scores is None:
+            return training_pending(job, customers=[])
         
-        # Filter high risk
-        high_risk = licenses[licenses['Churn_Risk'] == 'High'].copy()
-        
-        # Group by customer
-        # Removing Days_since_last_quantity_purchased from aggregation
-        customer_risk = high_risk.groupby('Customer_ID').agg({
-            'Contract_Value': 'sum',
-            'Number_of_quantities_purchased': 'count' # Using a simple count for grouping reference
-        }).reset_index()
-        
-        # Merge with customer names
-        customer_risk = customer_risk.merge(customers[['Customer_ID', 'Company_Name']], on='Customer_ID')
-        customer_risk = customer_risk.sort_values('Contract_Value', ascending=False).head(10)
+        min_prob = request.args.get('min_prob', type=float)
+        top = scores.top(k=request.args.get('k', 10, type=int),
+                         segment=request.args.get('segment'),
+                         vendor=request.args.get('vendor'),
+                         min_prob=min_prob)
         
         customer_list = []
-        for _, row in customer_risk.iterrows():
+        for row in top.itertuples(index=False):
             customer_list.append({
-                'name': row['Company_Name'],
-                'churn_prob': 0.75 + np.random.random() * 0.2,  # Simulated probability
-                'contract_value': float(row['Contract_Value']),
-                # Removed: 'days_since_purchase' key
+                'customer_id': row.Customer_ID,
+                'name': row.Company_Name,
+                'segment': row.Segment,
+                'churn_prob': round(float(row.churn_prob), 4),
+                'contract_value': float(row.contract_value),
+                'value_at_risk': round(float(row.value_at_risk), 2),
+                'licenses': int(row.licenses)
             })
         
-        return jsonify({'customers': customer_list})
+        return jsonify({
+            'customers': customer_list,
+            'model': {'version': trained.info['version'], 'stale': stale}
+        })
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -1989,178 +2485,135 @@ def retention_strategies():
     except Exception as e:
         return jsonify({'error': str(e)})
 
+def segment_report(snapshot, segments, names):
+    """Segment statistics and each segment's top 10 companies from cached assignments"""
+    licenses = snapshot.derived('license_facts', build_license_facts)
+    
+    # Aggregates at full precision (missing values included), with each customer's segment
+    features = snapshot.derived('feature_store', build_feature_store)
+    customer_features = features.customer_frame(SEGMENT_AGGREGATES, exact=True).reset_index()
+    customer_features['Segment'] = customer_features['Customer_ID'].astype(object).map(segments.labels)
+    
+    # Segment names were chosen from the centroids when the model was fitted
+    segment_names = list(names)
+    customer_features['Segment_Name'] = customer_features['Segment'].map(dict(enumerate(segment_names)))
+    
+    # Customer names come with the fact rows
+    company_names = license_facts.first_values(licenses, 'Customer_ID', 'Company_Name')
+    customer_features['Company_Name'] = customer_features['Customer_ID'].astype(object).map(company_names)
+    
+    # Calculate segment statistics
+    segment_stats = customer_features.groupby('Segment_Name').agg({
+        'Customer_ID': 'count',
+        'Contract_Value': 'mean',
+        'Number_of_quantities_purchased': 'mean',
+        'Satisfaction_Score': 'mean',
+        'Number_of_quantities_activated': 'mean'
+    }).reset_index()
+    
+    # Calculate activation rates
+    segment_stats['activation_rate'] = (
+        segment_stats['Number_of_quantities_activated'] /
+        segment_stats['Number_of_quantities_purchased'] * 100
+    ).fillna(0)
+    
+    # Determine churn risk
+    churn_risk_map = {
+        'Premium': 'Low',
+        'Growth': 'Low',
+        'Standard': 'Medium',
+        'Core': 'Medium',
+        'Basic': 'Medium',
+        'Entry': 'Medium',
+        'At-Risk': 'High'
+    }
+    segment_stats['Churn_Risk'] = segment_stats['Segment_Name'].map(churn_risk_map).fillna('Medium')
+    
+    # Recommendations
+    recommendations_map = {
+        'Premium': 'Upsell premium features, offer white-glove support',
+        'Growth': 'Expand seats and cross-sell adjacent products',
+        'Standard': 'Encourage feature adoption, provide training',
+        'Core': 'Review usage regularly, promote underused features',
+        'Basic': 'Offer discount for annual plans, simplify onboarding',
+        'Entry': 'Guide onboarding to first value, offer starter bundles',
+        'At-Risk': 'Immediate intervention, understand pain points'
+    }
+    segment_stats['Recommendation'] = segment_stats['Segment_Name'].map(recommendations_map).fillna(
+        'Encourage feature adoption, provide training')
+    
+    # Prepare normalized characteristics for radar chart
+    characteristics = []
+    for _, row in segment_stats.iterrows():
+        chars = [
+            row['Contract_Value'] / segment_stats['Contract_Value'].max() * 100,
+            row['Number_of_quantities_purchased'] / segment_stats['Number_of_quantities_purchased'].max() * 100,
+            row['Satisfaction_Score'] / 10 * 100,
+            row['activation_rate']
+        ]
+        characteristics.append(chars)
+    
+    # Get top 10 companies per segment
+    segment_companies = {}
+    for seg_name in segment_names:
+        seg_customers = customer_features[customer_features['Segment_Name'] == seg_name].nlargest(10, 'Contract_Value')
+        segment_companies[seg_name] = [
+            {
+                'company': row['Company_Name'],
+                'value': float(row['Contract_Value']),
+                'satisfaction': float(row['Satisfaction_Score'])
+            }
+            for _, row in seg_customers.iterrows()
+        ]
+    
+    return {
+        'segments': segment_stats['Segment_Name'].tolist(),
+        'counts': segment_stats['Customer_ID'].tolist(),
+        'avg_revenues': segment_stats['Contract_Value'].round(2).tolist(),
+        'churn_risks': segment_stats['Churn_Risk'].tolist(),
+        'recommendations': segment_stats['Recommendation'].tolist(),
+        'characteristics': characteristics,
+        'segment_companies': segment_companies
+    }
+
 @app.route('/api/customer-segments')
 def customer_segments():
-    """Perform customer segmentation using K-Means clustering"""
+    """Get the customer segments, assigned incrementally from the K-Means segmentation model"""
     try:
-        licenses = data['licenses']
-        customers = data['customers']
-        
-        # Aggregate customer-level features
-        customer_features = licenses.groupby('Customer_ID').agg({
-            'Contract_Value': 'sum',
-            'Number_of_quantities_purchased': 'sum',
-            'Number_of_quantities_activated': 'sum',
-            'Satisfaction_Score': 'mean',
-            'Support_Tickets': 'sum',
-            'Frequency_of_Product_Purchase': 'mean'
-        }).reset_index()
-        
-        # Prepare features for clustering
-        feature_cols = [
-            'Contract_Value', 'Number_of_quantities_purchased',
-            'Number_of_quantities_activated', 'Satisfaction_Score',
-            'Support_Tickets', 'Frequency_of_Product_Purchase'
-        ]
-        
-        X = customer_features[feature_cols].fillna(0)
-        
-        # Standardize features
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        # Apply K-Means
-        kmeans = KMeans(n_clusters=4, random_state=42)
-        customer_features['Segment'] = kmeans.fit_predict(X_scaled)
-        
-        # Define segment names
-        segment_names = ['Premium', 'Standard', 'Basic', 'At-Risk']
-        customer_features['Segment_Name'] = customer_features['Segment'].map(
-            {i: segment_names[i] for i in range(4)}
-        )
-        
-        # Merge with customer names
-        customer_features = customer_features.merge(
-            customers[['Customer_ID', 'Company_Name']], 
-            on='Customer_ID', 
-            how='left'
-        )
-        
-        # Calculate segment statistics
-        segment_stats = customer_features.groupby('Segment_Name').agg({
-            'Customer_ID': 'count',
-            'Contract_Value': 'mean',
-            'Number_of_quantities_purchased': 'mean',
-            'Satisfaction_Score': 'mean',
-            'Number_of_quantities_activated': 'mean'
-        }).reset_index()
-        
-        # Calculate activation rates
-        segment_stats['activation_rate'] = (
-            segment_stats['Number_of_quantities_activated'] /
-            segment_stats['Number_of_quantities_purchased'] * 100
-        ).fillna(0)
-        
-        # Determine churn risk
-        churn_risk_map = {
-            'Premium': 'Low',
-            'Standard': 'Medium',
-            'Basic': 'Medium',
-            'At-Risk': 'High'
-        }
-        segment_stats['Churn_Risk'] = segment_stats['Segment_Name'].map(churn_risk_map)
-        
-        # Recommendations
-        recommendations_map = {
-            'Premium': 'Upsell premium features, offer white-glove support',
-            'Standard': 'Encourage feature adoption, provide training',
-            'Basic': 'Offer discount for annual plans, simplify onboarding',
-            'At-Risk': 'Immediate intervention, understand pain points'
-        }
-        segment_stats['Recommendation'] = segment_stats['Segment_Name'].map(recommendations_map)
-        
-        # Prepare normalized characteristics for radar chart
-        characteristics = []
-        for _, row in segment_stats.iterrows():
-            chars = [
-                row['Contract_Value'] / segment_stats['Contract_Value'].max() * 100,
-                row['Number_of_quantities_purchased'] / segment_stats['Number_of_quantities_purchased'].max() * 100,
-                row['Satisfaction_Score'] / 10 * 100,
-                row['activation_rate']
-            ]
-            characteristics.append(chars)
-        
-        # Get top 10 companies per segment
-        segment_companies = {}
-        for seg_name in segment_names:
-            seg_customers = customer_features[customer_features['Segment_Name'] == seg_name].nlargest(10, 'Contract_Value')
-            segment_companies[seg_name] = [
-                {
-                    'company': row['Company_Name'],
-                    'value': float(row['Contract_Value']),
-                    'satisfaction': float(row['Satisfaction_Score'])
-                }
-                for _, row in seg_customers.iterrows()
-            ]
-        
-        return jsonify({
-            'segments': segment_stats['Segment_Name'].tolist(),
-            'counts': segment_stats['Customer_ID'].tolist(),
-            'avg_revenues': segment_stats['Contract_Value'].round(2).tolist(),
-            'churn_risks': segment_stats['Churn_Risk'].tolist(),
-            'recommendations': segment_stats['Recommendation'].tolist(),
-            'characteristics': characteristics,
-            'segment_companies': segment_companies
-        })
+        segments, trained, stale, job = customer_segmentation()
+        if segments is None:
+            return training_pending(job)
+        
+        snapshot = current_snapshot()
+        report = snapshot.derived(f'segment_report:{trained.fingerprint}',
+                                  lambda snapshot: segment_report(snapshot, segments, trained.info['names']))
+        return jsonify(dict(report, model=dict(
+            model_status(trained, stale),
+            n_clusters=trained.info['n_clusters'],
+            silhouette=round(trained.info['silhouette'], 4),
+            k_scores=trained.info['k_scores'],
+            drift=round(segments.drift, 4),
+            refitting=job is not None and not job.finished)))
     except Exception as e:
         return jsonify({'error': str(e)})
 
 @app.route('/api/driver-analysis')
 def driver_analysis():
-    """Perform driver analysis using logistic regression"""
+    """Get renewal drivers: standardised logistic regression coefficients with bootstrap intervals"""
     try:
-        licenses = data['licenses'].copy()
-        
-        # Create a more robust renewal indicator
-        # Use Renewal_Status field if available, otherwise use Churn_Risk
-        if 'Renewal_Status' in licenses.columns:
-            licenses['Renewed'] = (licenses['Renewal_Status'] == 'Active').astype(int)
-        else:
-            # If no renewal status, use inverse of high churn risk
-            licenses['Renewed'] = (licenses['Churn_Risk'] != 'High').astype(int)
-        
-        # Select driver features
-        driver_cols = [
-            'Number_of_quantities_activated',
-            'Percentage_of_quantities_deployed',
-            'Satisfaction_Score',
-            'Support_Tickets',
-            'Feature_Utilization',
-            'Days_since_last_quantity_purchased',
-            'Frequency_of_Product_Purchase'
-        ]
-        
-        # Prepare data - remove any rows with all NaN values
-        X = licenses[driver_cols].fillna(0)
-        y = licenses['Renewed']
-        
-        # Remove rows where y is NaN
-        valid_idx = ~y.isna()
-        X = X[valid_idx]
-        y = y[valid_idx]
-        
-        if len(X) < 10:
-            return jsonify({'error': 'Insufficient data', 'drivers': [], 'coefficients': []})
-        
-        # Train logistic regression
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-        
-        model = LogisticRegression(max_iter=1000, random_state=42)
-        model.fit(X_train, y_train)
-        
-        # Get coefficients
-        coefficients = model.coef_[0]
-        
-        # Sort by absolute impact
-        driver_importance = sorted(
-            zip(driver_cols, coefficients),
-            key=lambda x: abs(x[1]),
-            reverse=True
-        )
+        trained, stale, job = completed_model('drivers')
+        if trained is None:
+            return training_pending(job, drivers=[], coefficients=[])
         
+        info = trained.info
         return jsonify({
-            'drivers': [d[0].replace('_', ' ').title() for d in driver_importance],
-            'coefficients': [float(d[1]) for d in driver_importance]
+            'drivers': [d.replace('_', ' ').title() for d in info['drivers']],
+            'coefficients': info['coefficients'],
+            'ci_lower': info['ci_lower'],
+            'ci_upper': info['ci_upper'],
+            'confidence': info['confidence'],
+            'bootstrap': info['bootstrap'],
+            'model': model_status(trained, stale)
         })
     except Exception as e:
         print(f"Driver analysis error: {e}")
@@ -2175,7 +2628,7 @@ def survival_analysis():
         licenses = data['licenses']
         
         # Calculate customer lifetime (days from first to last purchase)
-        customer_lifetime = licenses.groupby('Customer_ID').agg({
+        customer_lifetime = licenses.groupby('Customer_ID', observed=True).agg({
             'Days_since_first_quantity_purchased': 'max',
             'Contract_Value': 'sum'
         }).reset_index()
@@ -2210,9 +2663,9 @@ def survival_analysis():
                 hazard_rate.append(0)
         
         # Calculate metrics
-        avg_lifetime = customer_lifetime['Lifetime_Days'].mean()
-        median_lifetime = customer_lifetime['Lifetime_Days'].median()
-        avg_ltv = customer_lifetime['Total_Value'].mean()
+        avg_lifetime = float(customer_lifetime['Lifetime_Days'].mean())
+        median_lifetime = float(customer_lifetime['Lifetime_Days'].median())
+        avg_ltv = float(customer_lifetime['Total_Value'].mean())
         
         # 6-month retention
         retention_6mo = len(customer_lifetime[customer_lifetime['Lifetime_Days'] >= 180]) / len(customer_lifetime)
@@ -2230,32 +2683,24 @@ def survival_analysis():
         return jsonify({'error': str(e)})
 
 
-@app.route('/api/purchase-activation-trends/<customer_id>')
-def purchase_activation_trends(customer_id):
-    """Get purchase count and activation rate trends over time"""
+def purchase_activation_panel(customer_id):
+    """Purchase count and activation rate per month for one customer (or all)"""
     try:
-        licenses = data['licenses'].copy()
-        
-        if customer_id != 'all':
-            licenses = licenses[licenses['Customer_ID'] == customer_id]
-            
-        licenses = licenses.dropna(subset=['License_Start_Date'])
+        # Group data by month of license start date
+        cells = license_cube().rollup('Month', customer_id)
         
-        if len(licenses) == 0:
-            return jsonify({
+        if len(cells) == 0:
+            return {
                 'months': ['No Data'], 
                 'purchases': [0], 
                 'activation_rate': [0]
-            })
-            
-        # Group data by month of license start date
-        licenses['YearMonth'] = licenses['License_Start_Date'].dt.to_period('M').astype(str)
+            }
         
-        monthly_trends = licenses.groupby('YearMonth').agg(
-            purchases=('License_ID', 'count'),
-            purchased_qty=('Number_of_quantities_purchased', 'sum'),
-            activated_qty=('Number_of_quantities_activated', 'sum')
-        ).reset_index()
+        monthly_trends = pd.DataFrame({
+            'purchases': cells['license_ids'].astype(int),
+            'purchased_qty': cells['Number_of_quantities_purchased_sum'],
+            'activated_qty': cells['Number_of_quantities_activated_sum']
+        })
         
         # Calculate Activation Rate
         monthly_trends['activation_rate'] = (
@@ -2263,32 +2708,36 @@ def purchase_activation_trends(customer_id):
         ).fillna(0).round(1)
         
         # Limit to the last 12 months and format labels
-        monthly_trends = monthly_trends.sort_values('YearMonth').tail(12)
-        monthly_trends['MonthLabel'] = pd.to_datetime(monthly_trends['YearMonth']).dt.strftime('%b %Y')
+        monthly_trends = monthly_trends.sort_index().tail(12)
+        month_labels = pd.to_datetime(monthly_trends.index).strftime('%b %Y')
         
-        return jsonify({
-            'months': monthly_trends['MonthLabel'].tolist(),
+        return {
+            'months': month_labels.tolist(),
             'purchases': monthly_trends['purchases'].tolist(),
             'activation_rate': monthly_trends['activation_rate'].tolist()
-        })
+        }
         
     except Exception as e:
+        g.skip_response_cache = True
         print(f"Purchase/Activation trends error: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({
+        return {
             'months': ['Jan 2024', 'Feb 2024', 'Mar 2024'],
             'purchases': [10, 15, 12],
             'activation_rate': [75.0, 80.0, 72.5]
-        })
+        }
+
+@app.route('/api/purchase-activation-trends/<customer_id>')
+def purchase_activation_trends(customer_id):
+    """Get purchase count and activation rate trends over time"""
+    return jsonify(purchase_activation_panel(customer_id))
 
 @app.route('/api/customer-churn-details/<customer_id>')
 def customer_churn_details(customer_id):
     """Get detailed churn analysis for a specific customer"""
     try:
-        licenses = data['licenses']
         customers = data['customers']
-        products = data['products']
         
         # Get customer info
         customer_info = customers[customers['Customer_ID'] == customer_id]
@@ -2298,16 +2747,13 @@ def customer_churn_details(customer_id):
         customer_info = customer_info.iloc[0]
         
         # Get all licenses for this customer
-        customer_licenses = licenses[licenses['Customer_ID'] == customer_id].copy()
+        customer_licenses = entity_facts('Customer_ID', customer_id)
         
         if len(customer_licenses) == 0:
             return jsonify({'error': 'No licenses found for this customer'})
         
-        # Merge with products
-        customer_licenses = customer_licenses.merge(
-            products[['Product_ID', 'Product_Name', 'Product_Category']], 
-            on='Product_ID'
-        )
+        # Only licenses with a known product (product columns come from the fact table)
+        customer_licenses = license_facts.catalogued(customer_licenses)
         
         # Calculate aggregated metrics
         total_licenses = len(customer_licenses)
@@ -2316,12 +2762,13 @@ def customer_churn_details(customer_id):
         total_support_tickets = int(customer_licenses['Support_Tickets'].sum())
         
         # Calculate activation rate
-        total_purchased = customer_licenses['Number_of_quantities_purchased'].sum()
-        total_activated = customer_licenses['Number_of_quantities_activated'].sum()
+        total_purchased = float(customer_licenses['Number_of_quantities_purchased'].sum())
+        total_activated = float(customer_licenses['Number_of_quantities_activated'].sum())
         activation_rate = (total_activated / total_purchased * 100) if total_purchased > 0 else 0
         
-        # Get churn risk distribution
-        churn_risk_counts = customer_licenses['Churn_Risk'].value_counts().to_dict()
+        # Get churn risk distribution (categorical counts include unseen levels)
+        churn_risk_counts = customer_licenses['Churn_Risk'].value_counts()
+        churn_risk_counts = churn_risk_counts[churn_risk_counts > 0].to_dict()
         
         # Calculate risk factors (This section is retained for the Risk Factors card)
         risk_factors = []
@@ -2387,7 +2834,7 @@ def customer_churn_details(customer_id):
                 'contract_value': float(lic['Contract_Value']),
                 'risk_reason': risk_reason, # <-- MODIFIED KEY
                 'satisfaction': float(lic['Satisfaction_Score']),
-                'activation_rate': float((lic['Number_of_quantities_activated'] / lic['Number_of_quantities_purchased'] * 100) if lic['Number_of_quantities_purchased'] > 0 else 0)
+                'activation_rate': (float(lic['Number_of_quantities_activated']) / float(lic['Number_of_quantities_purchased']) * 100) if lic['Number_of_quantities_purchased'] > 0 else 0.0
             })
         
         # Sort by contract value
@@ -2441,45 +2888,42 @@ def all_customers():
     except Exception as e:
         return jsonify({'error': str(e)})
 
-@app.route('/api/customer-metrics/<customer_id>')
-def customer_metrics(customer_id):
-    """Get detailed metrics for a specific customer or all customers"""
+def metrics_panel(customer_id):
+    """Headline metrics for one customer (or all)"""
     try:
-        licenses = data['licenses']
+        # Sums and counts over the customer's cube cells (the whole cube for 'all')
+        totals = license_cube().totals(customer_id)
         
-        if customer_id != 'all':
-            licenses = licenses[licenses['Customer_ID'] == customer_id]
-        
-        if len(licenses) == 0:
-            return jsonify({'error': 'No data found'})
+        if totals['licenses'] == 0:
+            return {'error': 'No data found'}
         
         # Calculate metrics
-        total_purchased = licenses['Number_of_quantities_purchased'].sum()
-        total_activated = licenses['Number_of_quantities_activated'].sum()
+        total_purchased = float(totals['Number_of_quantities_purchased_sum'])
+        total_activated = float(totals['Number_of_quantities_activated_sum'])
         activation_rate = (total_activated / total_purchased * 100) if total_purchased > 0 else 0
         
         # Usage rate (average feature utilization)
-        usage_rate = float(licenses['Feature_Utilization'].mean())
+        usage_rate = float(metrics_cube.mean(totals, 'Feature_Utilization'))
         
         # Purchase frequency
-        avg_purchase_frequency = float(licenses['Frequency_of_Product_Purchase'].mean())
+        avg_purchase_frequency = float(metrics_cube.mean(totals, 'Frequency_of_Product_Purchase'))
         
         # Renewal rate (inverse of high churn risk)
-        total_licenses = len(licenses)
-        high_churn = len(licenses[licenses['Churn_Risk'] == 'High'])
+        total_licenses = int(totals['licenses'])
+        high_churn = int(totals['high_churn'])
         renewal_rate = ((total_licenses - high_churn) / total_licenses * 100) if total_licenses > 0 else 0
         
         # Deployment rate
-        avg_deployment = float(licenses['Percentage_of_quantities_deployed'].mean())
+        avg_deployment = float(metrics_cube.mean(totals, 'Percentage_of_quantities_deployed'))
         
         # Satisfaction
-        avg_satisfaction = float(licenses['Satisfaction_Score'].mean())
+        avg_satisfaction = float(metrics_cube.mean(totals, 'Satisfaction_Score'))
         
         # Support tickets per license
-        avg_support = float(licenses['Support_Tickets'].mean())
+        avg_support = float(metrics_cube.mean(totals, 'Support_Tickets'))
         
         # Restore all metrics for downstream JS functions (like loadMetricsCharts)
-        return jsonify({
+        return {
             'activation_rate': round(activation_rate, 1),
             'usage_rate': round(usage_rate, 1),
             'purchase_frequency': round(avg_purchase_frequency, 1),
@@ -2488,74 +2932,82 @@ def customer_metrics(customer_id):
             'satisfaction_score': round(avg_satisfaction, 1),
             'support_tickets': round(avg_support, 1),
             'total_licenses': total_licenses,
-            'total_value': float(licenses['Contract_Value'].sum())
-        })
+            'total_value': float(totals['Contract_Value_sum'])
+        }
     except Exception as e:
-        return jsonify({'error': str(e)})
-    
-@app.route('/api/revenue-by-category/<customer_id>')
-def revenue_by_category_customer(customer_id):
-    """Get revenue by product category for specific customer or all"""
+        g.skip_response_cache = True
+        return {'error': str(e)}
+
+@app.route('/api/customer-metrics/<customer_id>')
+def customer_metrics(customer_id):
+    """Get detailed metrics for a specific customer or all customers"""
+    return jsonify(metrics_panel(customer_id))
+
+
+def revenue_panel(customer_id):
+    """Revenue by product category for one customer (or all)"""
     try:
-        licenses = data['licenses']
+        # Roll the customer's cube cells up by category (licenses without a category drop out)
+        category_revenue = license_cube().rollup('Product_Category', customer_id)['Contract_Value_sum']
+        category_revenue = category_revenue.sort_values(ascending=False).head(10)
         
-        if customer_id != 'all':
-            licenses = licenses[licenses['Customer_ID'] == customer_id]
-        
-        # Merge licenses with products
-        merged = licenses.merge(data['products'], on='Product_ID')
-        
-        # Group by category
-        category_revenue = merged.groupby('Product_Category')['Contract_Value'].sum().sort_values(ascending=False).head(10)
-        
-        return jsonify({
+        return {
             'categories': category_revenue.index.tolist(),
             'revenues': category_revenue.values.tolist()
-        })
+        }
     except Exception as e:
-        return jsonify({'error': str(e)})
+        g.skip_response_cache = True
+        return {'error': str(e)}
 
-@app.route('/api/activation-by-product/<customer_id>')
-def activation_by_product_customer(customer_id):
-    """Get activation rate by product for specific customer or all"""
+@app.route('/api/revenue-by-category/<customer_id>')
+def revenue_by_category_customer(customer_id):
+    """Get revenue by product category for specific customer or all"""
+    return jsonify(revenue_panel(customer_id))
+
+
+def activation_panel(customer_id):
+    """Activation rate by product for one customer (or all)"""
     try:
-        licenses = data['licenses']
-        products = data['products']
-        
-        if customer_id != 'all':
-            licenses = licenses[licenses['Customer_ID'] == customer_id]
+        # Roll the customer's cube cells up by product
+        cells = license_cube().rollup('Product_ID', customer_id)
+        product_stats = pd.DataFrame({
+            'Product_ID': cells.index,
+            'Number_of_quantities_purchased': cells['Number_of_quantities_purchased_sum'].to_numpy(),
+            'Number_of_quantities_activated': cells['Number_of_quantities_activated_sum'].to_numpy()
+        })
         
-        # Calculate activation rate per product
-        product_stats = licenses.groupby('Product_ID').agg({
-            'Number_of_quantities_purchased': 'sum',
-            'Number_of_quantities_activated': 'sum'
-        }).reset_index()
+        # Only products in the catalogue have a name
+        product_stats['Product_Name'] = product_stats['Product_ID'].map(catalogue_names())
+        product_stats = product_stats.dropna(subset=['Product_Name'])
         
         product_stats['activation_rate'] = (
             product_stats['Number_of_quantities_activated'] / 
             product_stats['Number_of_quantities_purchased'] * 100
         ).fillna(0)
         
-        # Merge with product names
-        product_stats = product_stats.merge(products[['Product_ID', 'Product_Name']], on='Product_ID')
         product_stats = product_stats.sort_values('activation_rate', ascending=False).head(10)
         
         # Truncate names
         product_names = [name[:20] + '...' if len(name) > 20 else name for name in product_stats['Product_Name']]
         
-        return jsonify({
+        return {
             'products': product_names,
             'rates': product_stats['activation_rate'].round(1).tolist()
-        })
+        }
     except Exception as e:
-        return jsonify({'error': str(e)})
+        g.skip_response_cache = True
+        return {'error': str(e)}
 
-@app.route('/api/usage-trends/<customer_id>')
-def usage_trends(customer_id):
-    """Get usage trends over time"""
+@app.route('/api/activation-by-product/<customer_id>')
+def activation_by_product_customer(customer_id):
+    """Get activation rate by product for specific customer or all"""
+    return jsonify(activation_panel(customer_id))
+
+
+def usage_trends_panel(customer_id, licenses):
+    """Usage per month for the licenses of one customer (or all)"""
     try:
         usage_history = data['usage_history'].copy()
-        licenses = data['licenses'].copy()
         
         print(f"Total usage records: {len(usage_history)}")
         print(f"Usage columns: {usage_history.columns.tolist()}")
@@ -2584,12 +3036,10 @@ def usage_trends(customer_id):
             
             # Use license Last_Login as proxy
             if 'Last_Login' in licenses.columns:
+                licenses = licenses.copy()
                 licenses['Last_Login'] = pd.to_datetime(licenses['Last_Login'], errors='coerce')
                 licenses = licenses.dropna(subset=['Last_Login'])
                 
-                if customer_id != 'all':
-                    licenses = licenses[licenses['Customer_ID'] == customer_id]
-                
                 if len(licenses) > 0:
                     licenses['YearMonth'] = licenses['Last_Login'].dt.strftime('%Y-%m')
                     monthly_data = licenses.groupby('YearMonth').size().reset_index(name='count')
@@ -2598,38 +3048,38 @@ def usage_trends(customer_id):
                     monthly_data['MonthLabel'] = pd.to_datetime(monthly_data['YearMonth']).dt.strftime('%b %Y')
                     monthly_data['usage'] = monthly_data['count'] * 150  # Simulate 150 min per license
                     
-                    return jsonify({
+                    return {
                         'months': monthly_data['MonthLabel'].tolist(),
                         'usage': monthly_data['usage'].tolist()
-                    })
+                    }
             
             # Return sample data
-            return jsonify({
+            return {
                 'months': ['Jan 2024', 'Feb 2024', 'Mar 2024', 'Apr 2024', 'May 2024', 'Jun 2024'],
                 'usage': [120, 145, 160, 155, 170, 165]
-            })
+            }
         
         # Filter by customer
         if customer_id != 'all':
-            customer_licenses = licenses[licenses['Customer_ID'] == customer_id]['License_ID'].unique()
+            customer_licenses = licenses['License_ID'].unique()
             usage_history = usage_history[usage_history['License_ID'].isin(customer_licenses)]
             print(f"Filtered to customer: {len(usage_history)} records")
         
         if len(usage_history) == 0:
-            return jsonify({
+            return {
                 'months': ['No Data'],
                 'usage': [0]
-            })
+            }
         
         # Convert date
         usage_history[date_col] = pd.to_datetime(usage_history[date_col], errors='coerce')
         usage_history = usage_history.dropna(subset=[date_col])
         
         if len(usage_history) == 0:
-            return jsonify({
+            return {
                 'months': ['No Data'],
                 'usage': [0]
-            })
+            }
         
         # Group by month
         usage_history['YearMonth'] = usage_history[date_col].dt.strftime('%Y-%m')
@@ -2638,34 +3088,39 @@ def usage_trends(customer_id):
         monthly_usage = monthly_usage.sort_values('YearMonth').tail(12)
         
         if len(monthly_usage) == 0:
-            return jsonify({
+            return {
                 'months': ['No Data'],
                 'usage': [0]
-            })
+            }
         
         monthly_usage['MonthLabel'] = pd.to_datetime(monthly_usage['YearMonth']).dt.strftime('%b %Y')
         
-        return jsonify({
+        return {
             'months': monthly_usage['MonthLabel'].tolist(),
             'usage': monthly_usage[duration_col].round(1).tolist()
-        })
+        }
         
     except Exception as e:
+        g.skip_response_cache = True
         print(f"Usage trends error: {e}")
         import traceback
         traceback.print_exc()
         
-        return jsonify({
+        return {
             'months': ['Jan 2024', 'Feb 2024', 'Mar 2024', 'Apr 2024', 'May 2024', 'Jun 2024'],
             'usage': [100, 120, 110, 130, 125, 140]
-        })
+        }
 
-@app.route('/api/renewal-trends/<customer_id>')
-def renewal_trends(customer_id):
-    """Get renewal trends over time"""
+@app.route('/api/usage-trends/<customer_id>')
+def usage_trends(customer_id):
+    """Get usage trends over time"""
+    return jsonify(usage_trends_panel(customer_id, licenses_for_customer(customer_id)))
+
+
+def renewal_trends_panel(customer_id, licenses):
+    """Renewals and renewal revenue per month for the licenses of one customer (or all)"""
     try:
         renewal_history = data['renewal_history'].copy()
-        licenses = data['licenses'].copy()
         
         print(f"Total renewal records: {len(renewal_history)}")
         print(f"Renewal columns: {renewal_history.columns.tolist()}")
@@ -2693,12 +3148,10 @@ def renewal_trends(customer_id):
             print("Using simulated renewal data from licenses")
             
             if 'License_Start_Date' in licenses.columns:
+                licenses = licenses.copy()
                 licenses['License_Start_Date'] = pd.to_datetime(licenses['License_Start_Date'], errors='coerce')
                 licenses = licenses.dropna(subset=['License_Start_Date'])
                 
-                if customer_id != 'all':
-                    licenses = licenses[licenses['Customer_ID'] == customer_id]
-                
                 if len(licenses) > 0:
                     licenses['YearMonth'] = licenses['License_Start_Date'].dt.strftime('%Y-%m')
                     monthly_data = licenses.groupby('YearMonth').agg({
@@ -2709,41 +3162,41 @@ def renewal_trends(customer_id):
                     
                     monthly_data['MonthLabel'] = pd.to_datetime(monthly_data['YearMonth']).dt.strftime('%b %Y')
                     
-                    return jsonify({
+                    return {
                         'months': monthly_data['MonthLabel'].tolist(),
                         'renewals': monthly_data['License_ID'].tolist(),
                         'revenue': monthly_data['Contract_Value'].round(2).tolist()
-                    })
+                    }
             
-            return jsonify({
+            return {
                 'months': ['Jan 2024', 'Feb 2024', 'Mar 2024', 'Apr 2024', 'May 2024', 'Jun 2024'],
                 'renewals': [5, 8, 6, 9, 7, 10],
                 'revenue': [50000, 80000, 60000, 90000, 70000, 100000]
-            })
+            }
         
         # Filter by customer
         if customer_id != 'all':
-            customer_licenses = licenses[licenses['Customer_ID'] == customer_id]['License_ID'].unique()
+            customer_licenses = licenses['License_ID'].unique()
             renewal_history = renewal_history[renewal_history['License_ID'].isin(customer_licenses)]
             print(f"Filtered to customer: {len(renewal_history)} records")
         
         if len(renewal_history) == 0:
-            return jsonify({
+            return {
                 'months': ['No Data'],
                 'renewals': [0],
                 'revenue': [0]
-            })
+            }
         
         # Convert date
         renewal_history[date_col] = pd.to_datetime(renewal_history[date_col], errors='coerce')
         renewal_history = renewal_history.dropna(subset=[date_col])
         
         if len(renewal_history) == 0:
-            return jsonify({
+            return {
                 'months': ['No Data'],
                 'renewals': [0],
                 'revenue': [0]
-            })
+            }
         
         # Group by month
         renewal_history['YearMonth'] = renewal_history[date_col].dt.strftime('%Y-%m')
@@ -2757,11 +3210,11 @@ def renewal_trends(customer_id):
         monthly_renewals = monthly_renewals.sort_values('YearMonth').tail(12)
         
         if len(monthly_renewals) == 0:
-            return jsonify({
+            return {
                 'months': ['No Data'],
                 'renewals': [0],
                 'revenue': [0]
-            })
+            }
         
         monthly_renewals['MonthLabel'] = pd.to_datetime(monthly_renewals['YearMonth']).dt.strftime('%b %Y')
         
@@ -2772,22 +3225,67 @@ def renewal_trends(customer_id):
             # Estimate revenue from license count if revenue column doesn't exist
             revenue_data = (monthly_renewals['License_ID'] * 10000).tolist()
         
-        return jsonify({
+        return {
             'months': monthly_renewals['MonthLabel'].tolist(),
             'renewals': monthly_renewals['License_ID'].tolist(),
             'revenue': revenue_data
-        })
+        }
         
     except Exception as e:
+        g.skip_response_cache = True
         print(f"Renewal trends error: {e}")
         import traceback
         traceback.print_exc()
         
-        return jsonify({
+        return {
             'months': ['Jan 2024', 'Feb 2024', 'Mar 2024', 'Apr 2024', 'May 2024', 'Jun 2024'],
             'renewals': [4, 6, 5, 7, 6, 8],
             'revenue': [40000, 60000, 50000, 70000, 60000, 80000]
-        })
+        }
+
+@app.route('/api/renewal-trends/<customer_id>')
+def renewal_trends(customer_id):
+    """Get renewal trends over time"""
+    return jsonify(renewal_trends_panel(customer_id, licenses_for_customer(customer_id)))
+
+# Panels of the customer overview, as {field: panel(customer_id) -> dict}; panels in
+# LICENSE_PANELS read the customer's licenses too, as panel(customer_id, licenses)
+# A panel that fails sets g.skip_response_cache, so neither its route nor the dashboard
+# caches the failure (or the sample data standing in for it)
+DASHBOARD_PANELS = {
+    'metrics': metrics_panel,
+    'revenue_by_category': revenue_panel,
+    'activation_by_product': activation_panel,
+    'usage_trends': usage_trends_panel,
+    'renewal_trends': renewal_trends_panel,
+    'purchase_activation_trends': purchase_activation_panel
+}
+LICENSE_PANELS = {'usage_trends', 'renewal_trends'}
+
+@app.route('/api/dashboard/<customer_id>')
+def customer_dashboard(customer_id):
+    """Get every overview panel for a customer (or all) in one response; ?fields=a,b selects panels"""
+    try:
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+        unknown = [f for f in fields if f not in DASHBOARD_PANELS]
+        if unknown:
+            return jsonify({'error': f"Unknown field(s): {', '.join(unknown)}",
+                            'fields': list(DASHBOARD_PANELS)}), 400
+
+        # Slice the customer's licenses once, only if a requested panel reads them, and share it
+        fields = fields or list(DASHBOARD_PANELS)
+        licenses = None
+        if LICENSE_PANELS.intersection(fields):
+            licenses = licenses_for_customer(customer_id)
+        result = {'customer_id': customer_id, 'version': current_snapshot().version}
+        for field in fields:
+            if field in LICENSE_PANELS:
+                result[field] = DASHBOARD_PANELS[field](customer_id, licenses)
+            else:
+                result[field] = DASHBOARD_PANELS[field](customer_id)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)})
 
 @app.route('/api/debug-data/<customer_id>')
 def debug_data(customer_id):
@@ -2795,7 +3293,6 @@ def debug_data(customer_id):
     try:
         usage_history = data['usage_history'].copy()
         renewal_history = data['renewal_history'].copy()
-        licenses = data['licenses'].copy()
         
         result = {
             'total_usage_records': len(usage_history),
@@ -2807,7 +3304,7 @@ def debug_data(customer_id):
         }
         
         if customer_id != 'all':
-            customer_licenses = licenses[licenses['Customer_ID'] == customer_id]['License_ID'].unique()
+            customer_licenses = entity_licenses('Customer_ID', customer_id)['License_ID'].unique()
             result['customer_license_count'] = len(customer_licenses)
             result['customer_usage_records'] = len(usage_history[usage_history['License_ID'].isin(customer_licenses)])
             result['customer_renewal_records'] = len(renewal_history[renewal_history['License_ID'].isin(customer_licenses)])
@@ -2830,5 +3327,13 @@ def check_columns():
         return jsonify({'error': str(e)})
 
 if __name__ == '__main__':
-    load_data()
+    # With DATA_PLANE_DIR set this process is the loader: it exports snapshots for
+    # server workers (e.g. gunicorn -w 4 app8:app) and, with --loader, serves nothing itself
+    if DATA_PLANE_DIR:
+        start_loader()
+    else:
+        load_data()
+    store.start_watcher(DATASET_POLL_SECONDS)
+    if '--loader' in sys.argv:
+        threading.Event().wait()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""Customer baskets as per-product bitsets over customers.
+
+``Baskets.from_pairs`` builds them straight from the customer and product
+columns of the purchases: both are factorized to integer codes, duplicate
+purchases dropped, and every product keeps the sorted codes of the customers
+who bought it - a sparse (CSC) customers x products matrix of ``nnz``
+entries; no dense customers x products frame is ever built.
+
+``bitsets(items)`` turns the customer lists of chosen products into bitsets,
+one uint64 word per 64 customers, so the number of customers buying all of a
+set of products is the popcount of the AND of their bitsets. Miners only ask
+for the bitsets of products frequent enough to matter, so memory follows the
+frequent products, not customers x products.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Set bits of every 16-bit value; a uint64 word is counted as four uint16 values
+_POPCOUNT = np.zeros(1 << 16, dtype=np.uint8)
+for _bit in range(16):
+    _POPCOUNT += ((np.arange(1 << 16) >> _bit) & 1).astype(np.uint8)
+
+
+def popcount(words):
+    """Set bits per row of uint64 words (summed over the last axis)"""
+    return _POPCOUNT[np.ascontiguousarray(words).view(np.uint16)].sum(axis=-1, dtype=np.int64)
+
+
+def min_count(support, transactions):
+    """Smallest count whose support (count / transactions) is at least `support`"""
+    count = max(int(np.ceil(support * transactions)), 0)
+    while count > 0 and (count - 1) / transactions >= support:
+        count -= 1
+    while count / transactions < support:
+        count += 1
+    return count
+
+
+class Baskets:
+    """Which customers bought which products, stored per product"""
+
+    def __init__(self, items, indptr, customers, transactions):
+        # Product of each item code (codes follow the products' sort order)
+        self.items = items
+        # Customer codes of item i's buyers: customers[indptr[i]:indptr[i + 1]], ascending
+        self.indptr = indptr
+        self.customers = customers
+        self.transactions = transactions
+        self.counts = np.diff(indptr)
+        self.words = -(-transactions // 64)
+
+    @classmethod
+    def from_pairs(cls, customers, products, min_items=2):
+        """Baskets of the customers buying at least `min_items` distinct products.
+
+        `customers` and `products` are aligned columns (categorical or not);
+        purchases missing either are skipped.
+        """
+        customer_codes, _ = pd.factorize(customers)
+        item_codes, items = pd.factorize(products, sort=True)
+        known = (customer_codes >= 0) & (item_codes >= 0)
+        width = max(len(items), 1)
+        pairs = np.unique(customer_codes[known].astype(np.int64) * width + item_codes[known])
+        customer, item = np.divmod(pairs, width)
+        kept = np.bincount(customer) >= min_items if len(customer) else np.zeros(0, dtype=bool)
+        mask = kept[customer]
+        customer, item = (np.cumsum(kept) - 1)[customer[mask]], item[mask]
+        # Stable on item, so each item's customers stay ascending
+        order = np.argsort(item, kind='stable')
+        indptr = np.r_[0, np.cumsum(np.bincount(item, minlength=len(items)))]
+        return cls(np.asarray(items, dtype=object), indptr, customer[order], int(kept.sum()))
+
+    def __len__(self):
+        return self.transactions
+
+    def memory(self):
+        """Bytes held (the customer lists; bitsets are built per request)"""
+        return self.indptr.nbytes + self.customers.nbytes + self.counts.nbytes + self.items.nbytes
+
+    def matrix(self):
+        """Sparse customers x items purchase matrix (1 where the customer bought the item)"""
+        return sparse.csc_matrix((np.ones(len(self.customers), dtype=np.int64), self.customers, self.indptr),
+                                 shape=(self.transactions, len(self.items)))
+
+    def frequent(self, count):
+        """Codes of the items bought by at least `count` customers"""
+        return np.flatnonzero(self.counts >= count)
+
+    def bitsets(self, items):
+        """uint64 items x words: bit c of row i is set when customer c bought items[i]"""
+        items = np.asarray(items, dtype=np.int64)
+        bits = np.zeros((len(items), self.words), dtype=np.uint64)
+        if len(items) == 0:
+            return bits
+        lengths = self.counts[items]
+        rows = np.repeat(np.arange(len(items)), lengths)
+        starts = self.indptr[items]
+        # Buyers of every chosen item, item after item
+        taken = self.customers[np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+                               + np.arange(lengths.sum())]
+        # (row, word) pairs arrive sorted, so one OR-reduce per word sets all of its bits
+        flat = rows * self.words + taken // 64
+        values = np.left_shift(np.uint64(1), (taken % 64).astype(np.uint64))
+        if len(flat):
+            starts = np.flatnonzero(np.r_[True, flat[1:] != flat[:-1]])
+            bits.ravel()[flat[starts]] = np.bitwise_or.reduceat(values, starts)
+        return bits
@@ -0,0 +1,146 @@
+"""Association rule mining benchmark: dense apriori retry loop vs one cached bitset lattice.
+
+Grows the purchases to `scale` times the dataset's customers (each customer
+is cloned under new IDs, every clone dropping a random fifth of its
+purchases so supports shift a little) and, with --products, its products too
+(clone k buys the copies k % products of the catalogue). At every scale it
+reports the memory of a dense customers x products one-hot frame against the
+``baskets.Baskets`` customer lists, and times
+
+* retry    - the previous approach: a dense TransactionEncoder frame, apriori
+             from the highest support in ASSOCIATION_RULE_PARAMS down until
+             more than `min_itemsets` itemsets are found, then
+             association_rules on them; a query at other thresholds has to do
+             this again (skipped when the dense frame passes --dense-limit MB)
+* lattice  - baskets, their co-occurrence matrix and
+             ``model_training.mine_association_rules``: one Eclat pass over
+             the bitsets down to the query floor, kept per dataset version
+* query    - answering one threshold query from that lattice
+             (``ItemsetLattice.rules``), p50 over a grid of support,
+             confidence and lift thresholds
+* pairs    - the fallback's top pairs the previous way: pair counts in a
+             Python loop over every transaction, then a rescan of all
+             transactions per top pair for the item counts
+* XᵀX      - the same top pairs from the sparse co-occurrence product
+             (``model_training.co_occurrence_rules``), building it included
+
+Usage: python benchmarks/bench_association_rules.py [--scales 1 10 100] [--products] [--dense-limit 512]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, association_rules
+from mlxtend.preprocessing import TransactionEncoder
+
+import app8
+import baskets
+import co_occurrence
+import model_training
+
+
+def grow_purchases(purchases, scale, products=1, seed=0):
+    """Purchases of `scale` times the customers (and `products` times the products): perturbed clones"""
+    rng = np.random.default_rng(seed)
+    purchases = purchases.dropna().astype(str)
+    frames = [purchases]
+    for clone in range(1, scale):
+        frame = purchases[rng.random(len(purchases)) >= 0.2].copy()
+        frame['Customer_ID'] = frame['Customer_ID'] + f'-{clone}'
+        if clone % products:
+            frame['Product_ID'] = frame['Product_ID'] + f'-{clone % products}'
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def transactions_of(purchases):
+    return [list(set(t)) for t in purchases.groupby('Customer_ID')['Product_ID'].apply(list) if len(set(t)) > 1]
+
+
+def retry_loop(purchases, params):
+    """The previous miner: apriori at falling supports until enough itemsets, then rules"""
+    transactions = transactions_of(purchases)
+    encoder = TransactionEncoder()
+    encoded = pd.DataFrame(encoder.fit(transactions).transform(transactions), columns=encoder.columns_)
+    for support in params['supports']:
+        itemsets = apriori(encoded, min_support=support, use_colnames=True, max_len=params['max_len'])
+        if len(itemsets) > params['min_itemsets']:
+            break
+    rules = association_rules(itemsets, metric='confidence', min_threshold=params['min_confidence'])
+    return rules.sort_values('lift', ascending=False).head(params['top'])
+
+
+def pair_loop(purchases, top):
+    """The previous fallback: Python pair counts, then item counts by rescanning per pair"""
+    transactions = transactions_of(purchases)
+    co_counts = {}
+    for transaction in transactions:
+        for i, first in enumerate(transaction):
+            for second in transaction[i + 1:]:
+                key = tuple(sorted([first, second]))
+                co_counts[key] = co_counts.get(key, 0) + 1
+    pairs = sorted(co_counts.items(), key=lambda x: x[1], reverse=True)[:top]
+    return [(first, second, count, sum(1 for t in transactions if first in t),
+             sum(1 for t in transactions if second in t)) for (first, second), count in pairs]
+
+
+def lattice_of(purchases, product_names, params):
+    basket_bits = baskets.Baskets.from_pairs(purchases['Customer_ID'], purchases['Product_ID'])
+    pairs = co_occurrence.CoOccurrence.from_baskets(basket_bits)
+    return model_training.mine_association_rules(basket_bits, pairs, product_names, params)
+
+
+def fallback(purchases, product_names, top):
+    basket_bits = baskets.Baskets.from_pairs(purchases['Customer_ID'], purchases['Product_ID'])
+    return model_training.co_occurrence_rules(co_occurrence.CoOccurrence.from_baskets(basket_bits),
+                                              product_names, top)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--products', action='store_true', help='grow the catalogue with the customers')
+    parser.add_argument('--dense-limit', type=int, default=512)
+    args = parser.parse_args()
+
+    app8.load_data()
+    licenses = app8.store.current().tables['licenses']
+    purchases = licenses[['Customer_ID', 'Product_ID']]
+    _, _, product_names, params = app8.association_training_set(app8.store.current())
+    queries = [(support, confidence, lift) for support in [0.005, 0.01, 0.02, 0.05]
+               for confidence in [0.01, 0.2, 0.5] for lift in [0, 1, 3]]
+
+    print(f"\n{'customers':>9} {'products':>8} {'dense (MB)':>10} {'baskets (MB)':>12} {'retry (ms)':>11} "
+          f"{'lattice (ms)':>13} {'itemsets':>9} {'rules':>7} {'query p50 (ms)':>15} {'pairs (ms)':>11} "
+          f"{'XᵀX (ms)':>9}")
+    for scale in args.scales:
+        grown = grow_purchases(purchases, scale, scale if args.products else 1)
+        basket_bits = baskets.Baskets.from_pairs(grown['Customer_ID'], grown['Product_ID'])
+        dense = basket_bits.transactions * len(basket_bits.items) / 2 ** 20
+        retry = '-'
+        if dense <= args.dense_limit:
+            retry = f"{timed(retry_loop, grown, params)[1] * 1000:.0f}"
+        (lattice, info), mine = timed(lattice_of, grown, product_names, params)
+        times = [timed(lattice.rules, *query, params['top'])[1] for query in queries]
+        loop = timed(pair_loop, grown, params['top_pairs'])[1]
+        product = timed(fallback, grown, product_names, params['top_pairs'])[1]
+        print(f"{basket_bits.transactions:>9} {len(basket_bits.items):>8} {dense:>10.1f} "
+              f"{basket_bits.memory() / 2 ** 20:>12.2f} {retry:>11} {mine * 1000:>13.0f} {len(lattice):>9} "
+              f"{len(lattice.rules()):>7} {np.median(times) * 1000:>15.2f} {loop * 1000:>11.0f} "
+              f"{product * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
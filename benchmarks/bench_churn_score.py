@@ -0,0 +1,104 @@
+"""Single-customer churn scoring benchmark at many customers.
+
+Grows the licenses table to `customers` customers (every customer of the
+dataset is cloned under new IDs with its licenses) and times scoring one
+random customer per request three ways:
+
+* rows     - slice the customer's license rows through the entity index and
+             run predict_proba on them (what scoring without a cache costs)
+* proba    - predict_proba on the customer's cached feature vector
+* explain  - the cached vector through ``churn_scores.ForestExplainer``
+             (what /api/churn-score does: probability plus contributions)
+
+and reports p50/p99 latencies, plus the one-off cost of building the
+``feature_store`` and of folding a batch of new license rows into it.
+
+Usage: python benchmarks/bench_churn_score.py [--customers 100000] [--requests 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+import app8
+import churn_scores
+import entity_index
+import feature_store
+import model_training
+
+
+def grow_licenses(licenses, customers):
+    """Licenses of `customers` customers: clones of the dataset's customers under new IDs"""
+    ids = licenses['Customer_ID'].astype(str)
+    clones = -(-customers // ids.nunique())
+    frames = []
+    for clone in range(clones):
+        frame = licenses.copy()
+        frame['Customer_ID'] = ids + f'-{clone}' if clone else ids
+        frames.append(frame)
+    grown = pd.concat(frames, ignore_index=True)
+    keep = grown['Customer_ID'].drop_duplicates().head(customers)
+    return grown[grown['Customer_ID'].isin(keep)].reset_index(drop=True)
+
+
+def percentiles(fn, ids):
+    times = []
+    for customer_id in ids:
+        start = time.perf_counter()
+        fn(customer_id)
+        times.append(time.perf_counter() - start)
+    return np.percentile(times, 50) * 1000, np.percentile(times, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    app8.load_data()
+    base = app8.store.current().tables['licenses']
+    X, y, params = app8.churn_training_set(app8.store.current())
+    model, _ = model_training.fit_churn_model(X, y, params)
+
+    licenses = entity_index.sort_by(grow_licenses(base, args.customers), 'Customer_ID')
+    index = entity_index.build_indexes(licenses, ['Customer_ID'])['Customer_ID']
+    start = time.perf_counter()
+    features = feature_store.FeatureStore.from_rows(licenses, app8.FEATURE_COLUMNS)
+    features.customer_matrix({name: 'weighted' for name in app8.CHURN_FEATURES})
+    build = time.perf_counter() - start
+    explainer = churn_scores.ForestExplainer(model, app8.CHURN_FEATURES)
+    batch = licenses.sample(100, random_state=0)
+    start = time.perf_counter()
+    features.copy().add(batch)
+    fold = time.perf_counter() - start
+
+    ids = np.random.default_rng(0).choice(list(features.customers), args.requests)
+    columns = app8.CHURN_FEATURES
+
+    def rows(customer_id):
+        found = index.rows(licenses, customer_id)
+        return model.predict_proba(found[columns].fillna(0))[:, 1].mean()
+
+    def proba(customer_id):
+        return model.predict_proba(pd.DataFrame([features.customer_vector(customer_id, columns)], columns=columns))[0, 1]
+
+    def explain(customer_id):
+        return explainer.explain(features.customer_vector(customer_id, columns))
+
+    print(f"\n{len(features.customers)} customers, {len(licenses)} licenses: feature store built in {build * 1000:.0f} ms, "
+          f"100 new license rows folded in in {fold * 1000:.1f} ms")
+    print(f"{'method':<8} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for name, fn in [('rows', rows), ('proba', proba), ('explain', explain)]:
+        p50, p99 = percentiles(fn, ids)
+        print(f"{name:<8} {p50:>9.2f} {p99:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Churn hyperparameter search, run offline.
+
+Runs the same successive-halving search as the churn-tuning job
+(``model_training.tune_churn_model`` with app8's CHURN_TUNING_PARAMS) on the
+dataset, in this process, and prints the rounds and the serving trade-off
+report: fit time, single-row and batch predict latency and forest size
+against held-out accuracy for the default forest and the finalists.
+
+Usage: python benchmarks/bench_churn_tuning.py [--jobs N] [--candidates N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app8
+import model_training
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=app8.CHURN_TUNING_JOBS)
+    parser.add_argument('--candidates', type=int, default=app8.CHURN_TUNING_PARAMS['candidates'])
+    args = parser.parse_args()
+
+    app8.load_data()
+    X, y, _ = app8.churn_training_set(app8.store.current())
+    params = dict(app8.CHURN_TUNING_PARAMS, candidates=args.candidates)
+    start = time.perf_counter()
+    _, info = model_training.tune_churn_model(X, y, params, args.jobs)
+    seconds = time.perf_counter() - start
+
+    print(f"\n{len(info['trials'])} trials in {info['rounds']} rounds on {args.jobs} processes, {seconds:.1f} s")
+    for round_ in range(info['rounds']):
+        trials = [t for t in info['trials'] if t['round'] == round_]
+        best = max(trials, key=lambda t: t['cv_accuracy'])
+        print(f"  round {round_}: {len(trials):>3} candidates on {trials[0]['samples']:>5} samples, "
+              f"best cv accuracy {best['cv_accuracy']:.4f}")
+    print(f"best {info['hyperparameters']}: cv {info['cv_accuracy']:.4f}, held-out {info['accuracy']:.4f} "
+          f"(default {info['default_accuracy']:.4f}) -> {'promote' if info['promote'] else 'keep default'}")
+
+    print(f"\n{'configuration':<12} {'accuracy':>8} {'fit (s)':>8} {'row (ms)':>9} {'1k rows (ms)':>13} "
+          f"{'nodes':>8}  pareto  hyperparameters")
+    for entry in info['report']:
+        print(f"{entry['name']:<12} {entry['accuracy']:>8.4f} {entry['fit_seconds']:>8.3f} "
+              f"{entry['predict_row_ms']:>9.2f} {entry['predict_1k_rows_ms']:>13.2f} {entry['nodes']:>8}  "
+              f"{'yes' if entry['pareto'] else '':<6}  {entry['hyperparameters']}")
+
+
+if __name__ == '__main__':
+    main()
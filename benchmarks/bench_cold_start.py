@@ -0,0 +1,103 @@
+"""Cold-start benchmark: CSV parsing vs the columnar snapshot cache.
+
+Builds scaled copies of ``software_monetization_dataset`` (licenses and
+renewal_history are replicated, dimension tables are copied as-is) and times
+loading every table the way ``app8.load_data`` does:
+
+* csv       - ``pd.read_csv`` + ``pd.to_datetime`` (the pre-snapshot path)
+* typed     - ``pd.read_csv`` + the dataset_schema typing pass, no cache
+* build     - first start with an empty cache (CSV parse + snapshot write)
+* snapshot  - warm start reading the Arrow snapshots
+
+Usage: python benchmarks/bench_cold_start.py [--scales 1 10 100] [--repeat 3]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+import dataset_schema
+import snapshot_cache
+from app8 import DATA_DIR, TABLES
+
+# Fact tables that grow with the business; everything else is copied unchanged
+SCALED_TABLES = ['licenses', 'renewal_history']
+
+
+def build_scaled_dataset(target_dir, scale):
+    """Write a copy of the dataset with the fact tables replicated `scale` times"""
+    os.makedirs(target_dir, exist_ok=True)
+    for name in TABLES:
+        src = os.path.join(ROOT, DATA_DIR, f'{name}.csv')
+        if not os.path.exists(src):
+            continue
+        dst = os.path.join(target_dir, f'{name}.csv')
+        if name in SCALED_TABLES and scale > 1:
+            df = pd.read_csv(src)
+            pd.concat([df] * scale, ignore_index=True).to_csv(dst, index=False)
+        else:
+            shutil.copyfile(src, dst)
+
+
+def legacy_csv_load(path, schema):
+    """The original load_data() path: untyped CSV plus date conversion"""
+    df = pd.read_csv(path)
+    for col in schema['dates']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def load_all(folder, loader):
+    for name in TABLES:
+        path = os.path.join(folder, f'{name}.csv')
+        if os.path.exists(path):
+            loader(path, dataset_schema.get_schema(name))
+
+
+def time_it(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'licenses':>10} {'csv (s)':>9} {'typed (s)':>10} {'build (s)':>10} "
+          f"{'snapshot (s)':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            folder = os.path.join(tmp, f'x{scale}')
+            build_scaled_dataset(folder, scale)
+            rows = sum(1 for _ in open(os.path.join(folder, 'licenses.csv'))) - 1
+
+            csv_time = time_it(lambda: load_all(folder, legacy_csv_load), args.repeat)
+            typed_time = time_it(lambda: load_all(folder, snapshot_cache.read_csv_typed), args.repeat)
+
+            def cold_build():
+                shutil.rmtree(os.path.join(folder, snapshot_cache.SNAPSHOT_DIRNAME), ignore_errors=True)
+                load_all(folder, snapshot_cache.load_table)
+            build_time = time_it(cold_build, 1)
+
+            warm_time = time_it(lambda: load_all(folder, snapshot_cache.load_table), args.repeat)
+            print(f"{scale:>5}x {rows:>10} {csv_time:>9.3f} {typed_time:>10.3f} {build_time:>10.3f} {warm_time:>13.3f} "
+                  f"{csv_time / warm_time:>7.1f}x")
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""Endpoint benchmark: per-request joins and groupbys vs precomputed structures.
+
+For every endpoint that used to join licenses with products (or customers)
+on each request, times the old per-request work against the same answer
+read from ``license_facts``; trend and metric panels that used to re-group
+license rows are timed against ``metrics_cube`` rollups, and high-risk
+customers against the batch ``churn_scores`` table. Both sides run on the
+loaded dataset, scaled the same way as ``bench_cold_start`` (licenses
+replicated `scale` times). The one-off cost of building the precomputed
+structures per dataset version is reported too.
+
+Usage: python benchmarks/bench_endpoints.py [--scales 1 10] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app8
+import churn_scores
+import license_facts
+import metrics_cube
+from bench_cold_start import build_scaled_dataset
+
+SUMS = {'Number_of_quantities_purchased': 'sum', 'Number_of_quantities_activated': 'sum'}
+
+
+def before_revenue_by_category(licenses, products, customers, customer_id, vendor_id):
+    merged = licenses.merge(products, on='Product_ID')
+    return merged.groupby('Product_Category', observed=True)['Contract_Value'].sum()
+
+
+def after_revenue_by_category(facts, customer_id, vendor_id):
+    return app8.license_totals().category_revenue_series()
+
+
+def before_revenue_by_category_customer(licenses, products, customers, customer_id, vendor_id):
+    merged = app8.entity_licenses('Customer_ID', customer_id).merge(products, on='Product_ID')
+    return merged.groupby('Product_Category', observed=True)['Contract_Value'].sum()
+
+
+def after_revenue_by_category_customer(facts, customer_id, vendor_id):
+    return app8.license_cube().rollup('Product_Category', customer_id)['Contract_Value_sum']
+
+
+def before_activation_by_product(licenses, products, customers, customer_id, vendor_id):
+    stats = licenses.groupby('Product_ID', observed=True).agg(SUMS).reset_index()
+    return stats.merge(products[['Product_ID', 'Product_Name']], on='Product_ID')
+
+
+def after_activation_by_product(facts, customer_id, vendor_id):
+    stats = app8.license_totals().product_activation_frame()
+    return stats.dropna(subset=['Product_Name'])
+
+
+def before_activation_by_product_customer(licenses, products, customers, customer_id, vendor_id):
+    rows = app8.entity_licenses('Customer_ID', customer_id)
+    stats = rows.groupby('Product_ID', observed=True).agg(SUMS).reset_index()
+    return stats.merge(products[['Product_ID', 'Product_Name']], on='Product_ID')
+
+
+def after_activation_by_product_customer(facts, customer_id, vendor_id):
+    stats = app8.license_cube().rollup('Product_ID', customer_id)
+    return stats.index.map(app8.catalogue_names())
+
+
+def before_customer_churn_details(licenses, products, customers, customer_id, vendor_id):
+    rows = app8.entity_licenses('Customer_ID', customer_id).copy()
+    return rows.merge(products[['Product_ID', 'Product_Name', 'Product_Category']], on='Product_ID')
+
+
+def after_customer_churn_details(facts, customer_id, vendor_id):
+    return license_facts.catalogued(app8.entity_facts('Customer_ID', customer_id))
+
+
+def before_vendor_recommendations(licenses, products, customers, customer_id, vendor_id):
+    vendor_products = products[products['Vendor_ID'] == vendor_id]['Product_ID'].values
+    vendor_customers = licenses[licenses['Product_ID'].isin(vendor_products)]['Customer_ID'].unique()
+    other = licenses[licenses['Customer_ID'].isin(vendor_customers) & ~licenses['Product_ID'].isin(vendor_products)]
+    other = other.merge(products[['Product_ID', 'Product_Name', 'Vendor_ID']], on='Product_ID')
+    return other.groupby('Product_ID', observed=True).agg({'Customer_ID': 'nunique', 'Product_Name': 'first'})
+
+
+def after_vendor_recommendations(facts, customer_id, vendor_id):
+    products = app8.data['products']
+    vendor_products = products[products['Vendor_ID'] == vendor_id]['Product_ID'].values
+    vendor_customers = facts[facts['Product_Vendor_ID'] == vendor_id]['Customer_ID'].unique()
+    other = facts[facts['Customer_ID'].isin(vendor_customers) & ~facts['Product_ID'].isin(vendor_products)]
+    other = license_facts.catalogued(other)
+    counts = other.groupby('Product_ID', observed=True).agg({'Customer_ID': 'nunique'}).reset_index()
+    counts['Product_Name'] = counts['Product_ID'].astype(object).map(
+        license_facts.first_values(other, 'Product_ID', 'Product_Name'))
+    return counts
+
+
+def before_high_risk_customers(licenses, products, customers, customer_id, vendor_id):
+    high_risk = licenses[licenses['Churn_Risk'] == 'High'].copy()
+    risk = high_risk.groupby('Customer_ID', observed=True).agg({'Contract_Value': 'sum'}).reset_index()
+    return risk.merge(customers[['Customer_ID', 'Company_Name']], on='Customer_ID')
+
+
+def after_high_risk_customers(facts, customer_id, vendor_id):
+    return app8.churn_score_table()[0].top(10)
+
+
+def after_high_risk_customers_vendor(facts, customer_id, vendor_id):
+    return app8.churn_score_table()[0].top(10, vendor=vendor_id, segment='Premium')
+
+
+def _monthly(rows):
+    rows = rows.dropna(subset=['License_Start_Date']).copy()
+    rows['YearMonth'] = rows['License_Start_Date'].dt.to_period('M').astype(str)
+    return rows.groupby('YearMonth').agg(
+        purchases=('License_ID', 'count'),
+        purchased_qty=('Number_of_quantities_purchased', 'sum'),
+        activated_qty=('Number_of_quantities_activated', 'sum'))
+
+
+def before_purchase_activation_trends(licenses, products, customers, customer_id, vendor_id):
+    return _monthly(licenses)
+
+
+def after_purchase_activation_trends(facts, customer_id, vendor_id):
+    return app8.license_cube().rollup('Month')
+
+
+def before_purchase_activation_trends_customer(licenses, products, customers, customer_id, vendor_id):
+    return _monthly(app8.entity_licenses('Customer_ID', customer_id))
+
+
+def after_purchase_activation_trends_customer(facts, customer_id, vendor_id):
+    return app8.license_cube().rollup('Month', customer_id)
+
+
+def before_customer_metrics(licenses, products, customers, customer_id, vendor_id):
+    return [licenses[c].mean() for c in metrics_cube.MEASURES] + [len(licenses[licenses['Churn_Risk'] == 'High'])]
+
+
+def after_customer_metrics(facts, customer_id, vendor_id):
+    totals = app8.license_cube().totals()
+    return [metrics_cube.mean(totals, c) for c in metrics_cube.MEASURES] + [totals['high_churn']]
+
+
+ENDPOINTS = [
+    ('revenue-by-category', before_revenue_by_category, after_revenue_by_category),
+    ('revenue-by-category/<id>', before_revenue_by_category_customer, after_revenue_by_category_customer),
+    ('activation-by-product', before_activation_by_product, after_activation_by_product),
+    ('activation-by-product/<id>', before_activation_by_product_customer, after_activation_by_product_customer),
+    ('customer-churn-details/<id>', before_customer_churn_details, after_customer_churn_details),
+    ('recommendations/vendor/<id>', before_vendor_recommendations, after_vendor_recommendations),
+    ('high-risk-customers', before_high_risk_customers, after_high_risk_customers),
+    ('high-risk-customers?vendor&segment', before_high_risk_customers, after_high_risk_customers_vendor),
+    ('purchase-activation-trends', before_purchase_activation_trends, after_purchase_activation_trends),
+    ('purchase-activation-trends/<id>', before_purchase_activation_trends_customer,
+     after_purchase_activation_trends_customer),
+    ('customer-metrics/all', before_customer_metrics, after_customer_metrics),
+]
+
+
+def time_it(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            folder = os.path.join(tmp, f'x{scale}')
+            build_scaled_dataset(folder, scale)
+            app8.store.data_dir = folder
+            app8.store.reload(force=True)
+            snapshot = app8.store.current()
+            tables = snapshot.tables
+            licenses, products, customers = tables['licenses'], tables['products'], tables['customers']
+            customer_id = licenses['Customer_ID'].iloc[0]
+            vendor_id = products['Vendor_ID'].iloc[0]
+
+            # Let the training jobs the reload started finish before timing anything
+            for job in app8.training_jobs.submit_all(snapshot):
+                job.wait()
+
+            build = time_it(lambda: license_facts.build_facts(licenses, products, customers), 3)
+            with app8.app.test_request_context():
+                facts = app8.license_fact_table()
+                cube_build = time_it(lambda: metrics_cube.MetricsCube(facts), 3)
+                trained, _ = app8.churn_models.latest(snapshot)
+                X = app8.model_features().license_frame(app8.CHURN_FEATURES)
+                score_build = time_it(lambda: churn_scores.ScoreTable(facts, trained.model, X), 3)
+                print(f"\n{scale}x: {len(licenses)} licenses, once per version: fact table {build * 1000:.1f} ms, "
+                      f"cube {cube_build * 1000:.1f} ms ({len(app8.license_cube())} cells), "
+                      f"churn scores {score_build * 1000:.1f} ms")
+                print(f"{'endpoint':<34} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+                app8.license_totals()
+                for name, before, after in ENDPOINTS:
+                    t_before = time_it(lambda: before(licenses, products, customers, customer_id, vendor_id), args.repeat)
+                    t_after = time_it(lambda: after(facts, customer_id, vendor_id), args.repeat)
+                    print(f"{name:<34} {t_before * 1000:>12.2f} {t_after * 1000:>11.2f} {t_before / t_after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
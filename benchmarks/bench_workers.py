@@ -0,0 +1,121 @@
+"""Worker memory benchmark: private per-worker dataset copies vs the shared data plane.
+
+Starts N worker processes (spawned, so nothing is inherited copy-on-write)
+that each import ``app8`` and get the dataset either
+
+* private - by loading the CSVs themselves (``store.reload``), or
+* shared  - by attaching to a ``data_plane`` generation exported once,
+
+then answer a few endpoints and scan every column so the whole dataset is
+resident. With all N workers alive, each reports from /proc/self/smaps_rollup:
+RSS, PSS (shared pages split between the processes mapping them) and PSS of
+anonymous (private heap) and file-backed (mapped) pages, plus how much its RSS
+grew from loading and serving the data. Linux only.
+
+Usage: python benchmarks/bench_workers.py [--scale 20] [--workers 1 4 16]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_cold_start import build_scaled_dataset
+
+ENDPOINTS = ['/api/overview', '/api/dashboard/all', '/api/dashboard/C00001',
+             '/api/customer-churn-details/C00001', '/api/recommendations/vendor/V0001']
+
+FIELDS = {'Rss': 'rss', 'Pss': 'pss', 'Pss_Anon': 'pss_anon', 'Pss_File': 'pss_file'}
+
+
+def memory():
+    """{rss, pss, pss_anon, pss_file} of this process in MB"""
+    usage = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in FIELDS:
+                usage[FIELDS[key]] = int(value.split()[0]) / 1024
+    return usage
+
+
+def worker(mode, folder, ready, done):
+    import io
+    import contextlib
+    import pandas as pd
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        import app8
+        before = memory()
+        if mode == 'private':
+            app8.store.data_dir = folder
+            app8.store.reload(force=True)
+        else:
+            app8.plane_follower.poll()
+        client = app8.app.test_client()
+        for url in ENDPOINTS:
+            client.get(url)
+        for frame in app8.store.current().tables.values():
+            for col in frame.columns:
+                values = frame[col]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    values = values.cat.codes
+                if values.dtype.kind in 'iufbM':
+                    values.to_numpy().view('u1').sum()
+    after = memory()
+    ready.put(dict(after, loaded=after['rss'] - before['rss']))
+    done.wait()
+
+
+def run(mode, workers, folder):
+    ctx = multiprocessing.get_context('spawn')
+    ready, done = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=worker, args=(mode, folder, ready, done)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    # PSS is read while every worker is alive, so shared pages are split N ways
+    reports = [ready.get() for _ in procs]
+    done.set()
+    for p in procs:
+        p.join()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, 'data')
+        plane = os.path.join(tmp, 'plane')
+        build_scaled_dataset(folder, args.scale)
+
+        # The loader: load once, export the first generation
+        import app8
+        import data_plane
+        app8.store.data_dir = folder
+        app8.store.reload(force=True)
+        data_plane.export(app8.store.current(), plane, app8.ingest.APPEND_TABLES)
+        rows = len(app8.store.current().tables['licenses'])
+        print(f"\n{args.scale}x dataset: {rows} licenses; per-worker averages in MB")
+        print(f"{'mode':<8} {'workers':>7} {'RSS':>8} {'PSS':>8} {'PSS anon':>9} {'PSS file':>9} "
+              f"{'data RSS':>9} {'total PSS':>10}")
+
+        for mode in ['private', 'shared']:
+            if mode == 'shared':
+                os.environ['DATA_PLANE_DIR'] = plane
+            else:
+                os.environ.pop('DATA_PLANE_DIR', None)
+            for n in args.workers:
+                reports = run(mode, n, folder)
+                avg = {k: sum(r[k] for r in reports) / n for k in reports[0]}
+                print(f"{mode:<8} {n:>7} {avg['rss']:>8.1f} {avg['pss']:>8.1f} {avg['pss_anon']:>9.1f} "
+                      f"{avg['pss_file']:>9.1f} {avg['loaded']:>9.1f} {avg['pss'] * n:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Item-item co-occurrence counts of customer baskets, as one sparse product.
+
+``CoOccurrence.from_baskets`` multiplies the customers x items purchase matrix
+of ``baskets.Baskets`` (X) by its transpose: entry (i, j) of XᵀX is the number
+of customers who bought both i and j, and its diagonal each item's own number
+of customers. Support, confidence and lift of every pair are then array
+arithmetic over the non-zero entries, with no pass over the transactions.
+
+The product costs the sum over customers of their basket size squared, and
+the result holds one entry per pair of items bought together at least once.
+It is built once per dataset version and kept with the snapshot, so rule
+mining and anything else reading pair counts share it.
+"""
+import numpy as np
+from scipy import sparse
+
+
+class CoOccurrence:
+    """Customers buying each pair of items, for every pair bought together"""
+
+    def __init__(self, counts, items, transactions):
+        # Symmetric items x items CSR counts; the diagonal holds each item's own count
+        self.counts = counts
+        self.items = items
+        self.transactions = transactions
+        self.item_counts = counts.diagonal()
+
+    @classmethod
+    def from_baskets(cls, baskets):
+        purchases = baskets.matrix()
+        counts = (purchases.T @ purchases).tocsr()
+        counts.sort_indices()
+        return cls(counts, baskets.items, baskets.transactions)
+
+    @property
+    def supports(self):
+        """Support of every item (share of customers buying it)"""
+        return self.item_counts / max(self.transactions, 1)
+
+    def pairs(self, items=None, min_count=1):
+        """(first, second, count) of the pairs first < second bought together at least `min_count` times.
+
+        With `items`, only pairs among those item codes, and first/second are
+        positions in `items`. Pairs come sorted by first, then second.
+        """
+        counts = self.counts if items is None else self.counts[items][:, items]
+        upper = sparse.triu(counts, k=1, format='csr')
+        upper.sort_indices()
+        upper = upper.tocoo()
+        keep = upper.data >= min_count
+        return upper.row[keep], upper.col[keep], upper.data[keep]
+
+    def rules(self, min_count=1):
+        """Every one-to-one rule (both directions of each pair) with its count, support, confidence and lift"""
+        first, second, count = self.pairs(min_count=min_count)
+        antecedent = np.r_[first, second]
+        consequent = np.r_[second, first]
+        count = np.r_[count, count]
+        confidence = count / self.item_counts[antecedent]
+        lift = confidence / self.supports[consequent]
+        return {
+            'antecedent': antecedent,
+            'consequent': consequent,
+            'count': count,
+            'support': count / self.transactions,
+            'confidence': confidence,
+            'lift': lift
+        }
@@ -0,0 +1,250 @@
+"""Shared, memory-mapped dataset for multi-worker deployments.
+
+Every server worker that loads the CSVs itself holds a private copy of every
+DataFrame. With a data plane, one loader process keeps loading (and ingesting)
+as usual and exports each published snapshot into a versioned directory under
+the plane root, then moves the ``CURRENT`` pointer to it. Workers memory-map
+those files read-only and build their frames on top of the mapping without
+copying, so the pages are shared by all workers through the OS page cache.
+
+Each table is one uncompressed Arrow IPC file, laid out so that reading back
+needs no conversion pass:
+
+* numeric columns keep NaN as a value (no validity bitmap);
+* bools are stored as uint8 and datetimes as int64 nanoseconds (NaT included)
+  and viewed back as bool / datetime64;
+* categoricals are stored as their pandas codes (-1 for missing) with the
+  categories as the Arrow dictionary.
+
+Python string objects cannot live in shared memory. String columns of the
+tables named in ``arrow_string_tables`` (the large, growing ones) are exposed
+as Arrow-backed ``string[pyarrow]`` arrays over the mapping instead, with
+``pd.NA`` for missing values; everywhere else object columns are materialised
+per worker, unchanged. Derived structures (entity indexes, fact table joins, the metrics
+cube) are still built per worker, but the fact table references the shared
+license columns instead of copying them.
+
+Generations number the exported versions monotonically across loader restarts;
+workers use the generation as their snapshot version, so every worker answers
+with the same version (and ETag) for the same data.
+"""
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - the data plane needs pyarrow
+    pa = None
+
+POINTER = 'CURRENT'
+MANIFEST = 'manifest.json'
+
+# Bump whenever the on-disk layout changes
+PLANE_FORMAT = 1
+
+# Generations kept on disk: the live one and the one workers may still be attaching to
+KEEP_GENERATIONS = 2
+
+
+def _write_atomic(path, text):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def read_pointer(root):
+    """The {'generation', 'dir'} the plane currently points at, or None before the first export"""
+    try:
+        with open(os.path.join(root, POINTER)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _encode(series, arrow_strings):
+    """Arrow array and pandas kind of one column"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = pa.array(series.cat.codes.to_numpy())
+        return pa.DictionaryArray.from_arrays(codes, pa.array(dtype.categories), safe=False), 'category'
+    if dtype.kind == 'b':
+        return pa.array(series.to_numpy().view(np.uint8)), 'bool'
+    if dtype.kind == 'M':
+        return pa.array(series.to_numpy().view(np.int64)), str(dtype)
+    if dtype.kind in 'iuf':
+        return pa.array(series.to_numpy(), from_pandas=False), 'numeric'
+    array = pa.array(series.to_numpy(dtype=object), from_pandas=True)
+    return array, 'string' if arrow_strings and pa.types.is_string(array.type) else 'object'
+
+
+def _decode(array, kind):
+    """Column values over the mapped buffers (copied only for object columns)"""
+    if kind == 'category':
+        codes = array.indices.to_numpy(zero_copy_only=True)
+        categories = pd.Index(array.dictionary.to_pandas())
+        return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+    if kind == 'string':
+        return pd.arrays.ArrowStringArray(pa.chunked_array([array]))
+    if kind == 'object':
+        # Missing strings come back as None, as from the snapshot cache's feather files
+        return array.to_numpy(zero_copy_only=False)
+    values = array.to_numpy(zero_copy_only=True)
+    if kind == 'bool':
+        return values.view(bool)
+    if kind == 'numeric':
+        return values
+    return values.view(kind)
+
+
+def write_table(frame, path, arrow_strings=False):
+    """Write a frame (with a default RangeIndex) as a mappable Arrow file"""
+    arrays, kinds = [], {}
+    for col in frame.columns:
+        array, kinds[col] = _encode(frame[col], arrow_strings)
+        arrays.append(array)
+    table = pa.Table.from_arrays(arrays, names=list(frame.columns),
+                                 metadata={'pandas_kinds': json.dumps(kinds)})
+    with ipc.new_file(path, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_table(path):
+    """Map an exported table read-only and build its frame without copying the columns"""
+    table = ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    kinds = json.loads(table.schema.metadata[b'pandas_kinds'])
+    columns = {}
+    for col in table.column_names:
+        column = table.column(col)
+        array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+        columns[col] = _decode(array, kinds[col])
+    # copy=False keeps one block per column, each a view of the mapping
+    return pd.DataFrame(columns, columns=table.column_names, copy=False)
+
+
+def export(snapshot, root, arrow_string_tables=()):
+    """Write a snapshot's tables as the next generation and point the plane at it"""
+    os.makedirs(root, exist_ok=True)
+    pointer = read_pointer(root)
+    generation = pointer['generation'] + 1 if pointer else 1
+    name = f'g{generation:06d}-{snapshot.fingerprint}'
+    staging = os.path.join(root, f'{name}.{os.getpid()}.tmp')
+    os.makedirs(staging)
+    try:
+        for table, frame in snapshot.tables.items():
+            write_table(frame, os.path.join(staging, f'{table}.arrow'), table in arrow_string_tables)
+        manifest = {
+            'format': PLANE_FORMAT,
+            'generation': generation,
+            'source_version': snapshot.version,
+            'sources': snapshot.sources,
+            'sizes': snapshot.sizes,
+            'tables': {table: len(frame) for table, frame in snapshot.tables.items()}
+        }
+        _write_atomic(os.path.join(staging, MANIFEST), json.dumps(manifest, indent=2))
+        os.rename(staging, os.path.join(root, name))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    _write_atomic(os.path.join(root, POINTER), json.dumps({'generation': generation, 'dir': name}))
+    _prune(root, generation)
+    return generation
+
+
+def _prune(root, generation):
+    """Remove old generations (files still mapped by a worker stay readable until it lets go)"""
+    for name in os.listdir(root):
+        if not name.startswith('g') or name.endswith('.tmp'):
+            continue
+        try:
+            old = int(name[1:].split('-')[0])
+        except ValueError:
+            continue
+        if old <= generation - KEEP_GENERATIONS:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def attach(root, pointer):
+    """Map every table of the generation `pointer` names; returns (tables, manifest)"""
+    folder = os.path.join(root, pointer['dir'])
+    with open(os.path.join(folder, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != PLANE_FORMAT:
+        raise ValueError(f"Unsupported data plane format {manifest.get('format')}")
+    tables = {table: read_table(os.path.join(folder, f'{table}.arrow')) for table in manifest['tables']}
+    return tables, manifest
+
+
+class Exporter:
+    """Snapshot listener of the loader process: exports every swapped-in snapshot"""
+
+    def __init__(self, root, arrow_string_tables=()):
+        self.root = root
+        self.arrow_string_tables = arrow_string_tables
+        self._lock = threading.Lock()
+
+    def __call__(self, old, new):
+        with self._lock:
+            generation = export(new, self.root, self.arrow_string_tables)
+        print(f"Dataset version {new.version} exported to the data plane as generation {generation}")
+
+
+class Follower:
+    """Keeps a worker's store on the plane's current generation"""
+
+    def __init__(self, store, root, index):
+        self.store = store
+        self.root = root
+        # index(tables) -> indexes over the attached (already sorted) tables
+        self._index = index
+        self._attached = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def generation(self):
+        return self._attached['generation'] if self._attached else None
+
+    def poll(self):
+        """Attach to a newer generation if the pointer moved; returns True if the store changed"""
+        with self._lock:
+            pointer = read_pointer(self.root)
+            if pointer is None or pointer == self._attached:
+                return False
+            try:
+                tables, manifest = attach(self.root, pointer)
+            except (OSError, ValueError) as e:
+                # Pruned or half-written under us: the next poll sees the newer pointer
+                print(f"Could not attach data plane generation {pointer.get('dir')}: {e}")
+                return False
+            self.store.publish(tables, self._index(tables), manifest['sources'], manifest['sizes'],
+                               version=manifest['generation'])
+            self._attached = pointer
+            return True
+
+    def start(self, interval=1.0):
+        """Attach now and keep following the pointer in the background"""
+        with self._lock:
+            if self._thread is not None:
+                return self._thread
+            self._thread = threading.Thread(target=self._follow, args=(interval,),
+                                            name='data-plane-follower', daemon=True)
+        self.poll()
+        self._thread.start()
+        return self._thread
+
+    def _follow(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Data plane follower error: {e}")
+
+    def stop(self):
+        self._stop.set()
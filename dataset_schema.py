@@ -0,0 +1,142 @@
+"""Column schemas for the software monetization dataset.
+
+The schemas drive how each CSV is typed when it is loaded (and therefore how it
+is stored in the columnar snapshot cache):
+
+* ``category`` - IDs and low-cardinality enums, stored as pandas categoricals
+* ``int32``    - whole-number counters; columns holding NaN fall back to float32
+* ``float32``  - ratios, scores and fractional counters
+* ``dates``    - parsed with ``pd.to_datetime(errors='coerce')``
+
+Money columns (``Contract_Value``, revenues, budgets) are deliberately left as
+64-bit so dashboard totals keep full precision. Columns that are not listed
+keep the dtype ``pd.read_csv`` infers, and listed columns missing from a file
+are ignored.
+"""
+import numpy as np
+import pandas as pd
+
+SCHEMAS = {
+    'licenses': {
+        'category': [
+            'Customer_ID', 'Vendor_ID', 'Product_ID',
+            'Direction_Trend_purchased_quantities', 'Direction_Trend_activated_quantities',
+            'Direction_Trend_deployed_quantities', 'Deployment_Type', 'Variants',
+            'Renewal_Status', 'Payment_Status', 'Churn_Risk', 'Usage_Frequency',
+            'Custom_Configuration'
+        ],
+        'int32': [
+            'Number_of_quantities_purchased', 'Number_of_quantities_activated',
+            'Days_since_last_quantity_purchased', 'Days_since_last_quantity_activated',
+            'Days_since_first_quantity_purchased', 'Days_since_first_activation',
+            'Frequency_of_Product_Purchase', 'Recency_of_product_purchase',
+            'Subscription_period_derived', 'Support_Tickets', 'Integration_Count',
+            'Training_Sessions', 'Upgrade_History', 'Downgrade_History',
+            'Relative_number_of_products_purchased_from_catalogue'
+        ],
+        'float32': [
+            'Percentage_of_quantities_deployed', 'Avg_gap_in_quantity_purchase',
+            'Avg_gap_in_quantity_activated', 'Avg_gap_Purchase_to_Activation',
+            'Satisfaction_Score', 'Feature_Utilization', 'Relative_purchases_qty',
+            'Relative_activation_qty', 'Relative_activation_percentage',
+            'Relative_Activated_Variant_percentage', 'Relative_variant_activation_quantity'
+        ],
+        'dates': ['License_Start_Date', 'License_End_Date', 'Last_Login']
+    },
+    'customers': {
+        'category': ['Industry_Type', 'Company_Size', 'State', 'Country', 'Segment'],
+        'int32': ['Employee_Count', 'Years_in_Business'],
+        'float32': [],
+        'dates': []
+    },
+    'products': {
+        'category': [
+            'Vendor_ID', 'Product_Category', 'License_Type', 'Currency', 'Maturity',
+            'Support_Level', 'Documentation_Quality', 'Integration_Complexity'
+        ],
+        'int32': ['Base_Price', 'Product_Features'],
+        'float32': [],
+        'dates': []
+    },
+    'vendors': {
+        'category': [
+            'Industry', 'Country', 'Company_Size', 'Market_Focus', 'Support_Model',
+            'Deployment_Model', 'Certification'
+        ],
+        'int32': ['Founded_Year', 'Employee_Count', 'Total_Products', 'Total_Customers', 'Total_Licenses'],
+        'float32': [],
+        'dates': []
+    },
+    'usage_history': {
+        'category': ['License_ID', 'Customer_ID', 'Product_ID'],
+        'int32': [],
+        'float32': [],
+        'dates': ['Usage_Date']
+    },
+    'renewal_history': {
+        'category': ['License_ID', 'Customer_ID', 'Product_ID', 'Renewal_Type', 'Renewal_Status'],
+        'int32': ['Renewal_Duration', 'Discount_Applied', 'Negotiation_Days', 'Cross_sell_Products'],
+        'float32': [],
+        'dates': ['Renewal_Date']
+    }
+}
+
+EMPTY_SCHEMA = {'category': [], 'int32': [], 'float32': [], 'dates': []}
+
+
+def get_schema(table):
+    """Return the schema for a table (an empty schema for unknown tables)"""
+    return SCHEMAS.get(table, EMPTY_SCHEMA)
+
+
+def _to_counter(series):
+    """Downcast a whole-number column to int32, or float32 when it holds NaN"""
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().any():
+        return values.astype(np.float32)
+    return values.astype(np.int32)
+
+
+def apply_schema(df, schema):
+    """Convert the columns of a freshly parsed frame to their compact dtypes (in place)"""
+    for col in schema.get('dates', []):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in schema.get('category', []):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in schema.get('int32', []):
+        if col in df.columns:
+            df[col] = _to_counter(df[col])
+    for col in schema.get('float32', []):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+    return df
+
+
+def memory_report(tables):
+    """Per-table memory footprint, in the spirit of app.py's basic_data_overview"""
+    rows = []
+    for name, df in tables.items():
+        rows.append({
+            'Dataset': name,
+            'Rows': df.shape[0],
+            'Columns': df.shape[1],
+            'Memory_Usage_MB': round(df.memory_usage(deep=True).sum() / (1024**2), 3),
+            'Categorical_Columns': df.select_dtypes(include=['category']).shape[1],
+            'Numeric_Columns': df.select_dtypes(include=[np.number]).shape[1]
+        })
+    report = pd.DataFrame(rows, columns=['Dataset', 'Rows', 'Columns', 'Memory_Usage_MB',
+                                         'Categorical_Columns', 'Numeric_Columns'])
+    return report
+
+
+def print_memory_report(tables):
+    report = memory_report(tables)
+    if len(report) == 0:
+        return report
+    total = report['Memory_Usage_MB'].sum()
+    print("Dataset memory usage:")
+    print(report.to_string(index=False))
+    print(f"Total: {total:.3f} MB")
+    return report
@@ -0,0 +1,215 @@
+"""Versioned, atomically swapped dataset snapshots.
+
+A ``Snapshot`` is one complete, immutable load of the dataset: its tables, the
+entity indexes over them and a monotonically increasing ``version``. The
+``DatasetStore`` owns the live snapshot. Reloads build a brand new snapshot off
+the request path and publish it with a single reference swap, so a request that
+pinned the old snapshot finishes on it and nobody ever observes a half-loaded
+set of tables.
+
+Anything derived from the data (aggregates, models, response caches) should be
+stored with ``Snapshot.derived`` or keyed on ``Snapshot.version``; it is then
+dropped together with the snapshot it was computed from.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime
+
+import snapshot_cache
+
+
+class Snapshot:
+    """One fully loaded version of the dataset"""
+
+    def __init__(self, version, tables, indexes=None, sources=None, sizes=None, derived=None):
+        self.version = version
+        self.tables = tables
+        self.indexes = indexes or {}
+        # {table name: sha256 of the CSV it was loaded from}
+        self.sources = sources or {}
+        # {table name: bytes of the CSV that went into this snapshot}
+        self.sizes = sizes or {}
+        self.loaded_at = datetime.now()
+        self.fingerprint = hashlib.sha256(
+            ''.join(f'{k}:{v};' for k, v in sorted(self.sources.items())).encode()
+        ).hexdigest()[:16]
+        # Derived structures carried over (e.g. incrementally updated) from the previous snapshot
+        self._derived = dict(derived or {})
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name, build):
+        """Return the structure `name` computed from this snapshot, building it at most once"""
+        if name in self._derived:
+            return self._derived[name]
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._derived:
+                self._derived[name] = build(self)
+        return self._derived[name]
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'loaded_at': self.loaded_at.isoformat(timespec='seconds'),
+            'tables': {name: len(df) for name, df in self.tables.items()}
+        }
+
+
+class TablesView(Mapping):
+    """Read-only ``data[...]`` view onto the tables of the snapshot returned by `get_snapshot`"""
+
+    def __init__(self, get_snapshot):
+        self._get_snapshot = get_snapshot
+
+    def __getitem__(self, name):
+        return self._get_snapshot().tables[name]
+
+    def __iter__(self):
+        return iter(self._get_snapshot().tables)
+
+    def __len__(self):
+        return len(self._get_snapshot().tables)
+
+
+class DatasetStore:
+    """Holds the live snapshot and rebuilds it when the source CSVs change"""
+
+    def __init__(self, data_dir, tables, build):
+        self.data_dir = data_dir
+        self.table_names = list(tables)
+        # build(paths) -> (tables, indexes); paths maps table name -> CSV path
+        self._build = build
+        self._current = Snapshot(0, {})
+        self._swap_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._listeners = []
+        # appender() -> bool: ingests pure appends in place of a reload, False if it cannot
+        self._appender = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def current(self):
+        """The live snapshot (a single reference read, safe without locking)"""
+        return self._current
+
+    def csv_paths(self):
+        return {name: os.path.join(self.data_dir, f'{name}.csv') for name in self.table_names}
+
+    def source_signature(self):
+        """Cheap (size, mtime) signature of the source CSVs, used by the watcher"""
+        signature = []
+        for name, path in sorted(self.csv_paths().items()):
+            try:
+                stat = os.stat(path)
+                signature.append((name, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append((name, None, None))
+        return tuple(signature)
+
+    def source_hashes(self):
+        hashes = {}
+        for name, path in self.csv_paths().items():
+            if os.path.exists(path):
+                hashes[name] = snapshot_cache.current_hash(path)
+        return hashes
+
+    def source_sizes(self):
+        return {name: size for name, size, _ in self.source_signature() if size is not None}
+
+    def on_swap(self, callback):
+        """Register callback(old_snapshot, new_snapshot), called after every swap"""
+        self._listeners.append(callback)
+
+    def set_appender(self, appender):
+        """Let the watcher try appender() before falling back to a full reload"""
+        self._appender = appender
+
+    def reload(self, force=False):
+        """Build a complete new snapshot and swap it in; returns True if the version moved"""
+        with self._reload_lock:
+            current = self._current
+            sizes = self.source_sizes()
+            sources = self.source_hashes()
+            if not force and current.version > 0 and sources == current.sources:
+                return False
+
+            start = time.perf_counter()
+            tables, indexes = self._build(self.csv_paths())
+            missing = [name for name in current.tables if name not in tables]
+            if missing:
+                print(f"Dataset reload rejected, could not load: {', '.join(missing)}")
+                return False
+
+            snapshot = self._swap(current, Snapshot(current.version + 1, tables, indexes, sources, sizes))
+            print(f"Dataset version {snapshot.version} ({snapshot.fingerprint}) loaded "
+                  f"in {time.perf_counter() - start:.2f}s")
+
+        self._notify(current, snapshot)
+        return True
+
+    def publish(self, tables, indexes, sources, sizes, derived=None, version=None):
+        """Swap in a snapshot built outside reload() (e.g. by appending rows); returns it.
+
+        `version` defaults to the next version; a data plane follower passes the
+        generation it attached to instead.
+        """
+        with self._reload_lock:
+            current = self._current
+            version = current.version + 1 if version is None else version
+            snapshot = self._swap(current, Snapshot(version, tables, indexes, sources, sizes, derived))
+        self._notify(current, snapshot)
+        return snapshot
+
+    def _swap(self, current, snapshot):
+        with self._swap_lock:
+            self._current = snapshot
+        return snapshot
+
+    def _notify(self, old, new):
+        for callback in self._listeners:
+            try:
+                callback(old, new)
+            except Exception as e:
+                print(f"Snapshot listener error: {e}")
+
+    def start_watcher(self, interval=5.0):
+        """Poll the source CSVs and reload once a change has settled for one interval"""
+        if self._watcher is not None:
+            return self._watcher
+
+        def watch():
+            last_seen = self.source_signature()
+            pending = None
+            while not self._stop.wait(interval):
+                signature = self.source_signature()
+                if signature == last_seen:
+                    pending = None
+                    continue
+                if signature != pending:
+                    # Still being written (or just changed): wait for it to settle
+                    pending = signature
+                    continue
+                try:
+                    if self._appender is None or not self._appender():
+                        self.reload()
+                except Exception as e:
+                    print(f"Dataset reload failed: {e}")
+                last_seen = signature
+                pending = None
+
+        self._watcher = threading.Thread(target=watch, name='dataset-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watcher(self):
+        self._stop.set()
@@ -4,13 +4,15 @@ import numpy as np
 import json
 from datetime import datetime, timedelta
 import os
-from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.dummy import DummyClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 from mlxtend.frequent_patterns import apriori, association_rules
+import feature_store
+import rule_index
+import segmentation
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -20,6 +22,16 @@ app = Flask(__name__)
 data = {}
 models = {}
 
+# Customer summary columns the segmentation clusters on
+SEGMENT_FEATURES = ['total_purchased', 'total_contract_value', 'total_activated']
+
+# Drift (relative increase of the distance to the centroids) past which the segmentation is refitted
+SEGMENT_DRIFT_THRESHOLD = 0.25
+
+# Entitlement and activation columns kept in the customer feature stores
+ENTITLEMENT_FEATURES = ['purchase_quantity', 'contract_value', 'purchase_date']
+ACTIVATION_FEATURES = ['quantity', 'activation_date']
+
 
 def _coerce_id_to_series_dtype(value, series):
     """Coerce a string path parameter to the dtype of a pandas Series (id column)."""
@@ -69,28 +81,42 @@ def prepare_analytics_data():
     
     # Prepare product recommendation data
     prepare_recommendation_data()
+    
+    # Segment customers once; the endpoint serves the cached segments
+    prepare_segmentation()
 
 def create_customer_summary():
     """Create comprehensive customer summary for segmentation"""
-    # Merge customer data with entitlements and activations
-    customer_entitlements = data['entitlements'].groupby('customer_id').agg({
-        'purchase_quantity': 'sum',
-        'contract_value': 'sum',
-        'purchase_date': ['min', 'max']
-    }).reset_index()
+    # Per-customer aggregates of entitlements and activations, computed once in the feature stores
+    entitlements = feature_store.FeatureStore.from_rows(
+        data['entitlements'], ENTITLEMENT_FEATURES, key='customer_id', weight=None)
+    activations = feature_store.FeatureStore.from_rows(
+        data['activations'].merge(data['entitlements'][['entitlement_id', 'customer_id']], on='entitlement_id'),
+        ACTIVATION_FEATURES, key='customer_id', weight=None)
+    models['entitlement_features'] = entitlements
+    models['activation_features'] = activations
+    
+    customer_entitlements = pd.concat([
+        entitlements.customer_frame({'purchase_quantity': 'sum', 'contract_value': 'sum', 'purchase_date': 'min'},
+                                    exact=True),
+        entitlements.customer_frame({'purchase_date': 'max'}, exact=True)
+    ], axis=1).reset_index()
     
     customer_entitlements.columns = ['customer_id', 'total_purchased', 'total_contract_value', 'first_purchase', 'last_purchase']
     
-    customer_activations = data['activations'].merge(
-        data['entitlements'][['entitlement_id', 'customer_id']], 
-        on='entitlement_id'
-    ).groupby('customer_id').agg({
-        'quantity': 'sum',
-        'activation_date': ['min', 'max']
-    }).reset_index()
+    customer_activations = pd.concat([
+        activations.customer_frame({'quantity': 'sum', 'activation_date': 'min'}, exact=True),
+        activations.customer_frame({'activation_date': 'max'}, exact=True)
+    ], axis=1).reset_index()
     
     customer_activations.columns = ['customer_id', 'total_activated', 'first_activation', 'last_activation']
     
+    # The stores keep dates as days since the epoch
+    for frame, columns in [(customer_entitlements, ['first_purchase', 'last_purchase']),
+                           (customer_activations, ['first_activation', 'last_activation'])]:
+        for col in columns:
+            frame[col] = pd.to_datetime(frame[col], unit='D')
+    
     # Merge with customer data
     customer_summary = data['customers'].merge(customer_entitlements, on='customer_id', how='left')
     customer_summary = customer_summary.merge(customer_activations, on='customer_id', how='left')
@@ -146,6 +172,56 @@ def prepare_churn_data():
     models['churn_model'] = model
     models['churn_features'] = churn_features
     models['churn_data'] = churn_data
+    # Scaled feature rows by customer, so predictions need no lookup scan or refilling
+    models['churn_X'] = X_scaled
+    models['churn_rows'] = {customer_id: i for i, customer_id in enumerate(churn_data['customer_id'])}
+
+def prepare_segmentation():
+    """Segment customers, updating the cached segmentation incrementally when the summary changed"""
+    features = data['customer_summary'].set_index('customer_id')[SEGMENT_FEATURES]
+    segments = models.get('segmentation')
+    if segments is not None:
+        segments = segments.update(features)
+    if segments is None or segments.drift > SEGMENT_DRIFT_THRESHOLD:
+        segments = segmentation.Segmentation.fit(features, n_clusters=4, random_state=42)
+    models['segmentation'] = segments
+    models['segments'] = describe_segments(data['customer_summary'], segments)
+
+def describe_segments(customer_summary, segments):
+    """Size and characteristics of every segment, from the cached assignments"""
+    clusters = segments.labels.reindex(customer_summary['customer_id'].astype(object)).to_numpy()
+    
+    # Analyze clusters
+    result = []
+    for i in range(segments.n_clusters):
+        cluster_data = customer_summary[clusters == i]
+        
+        if len(cluster_data) > 0:
+            avg_purchase = cluster_data['total_purchased'].mean()
+            avg_value = cluster_data['total_contract_value'].mean()
+            avg_activated = cluster_data['total_activated'].mean()
+            
+            # Determine segment type
+            if avg_value > 50000 and avg_purchase > 100:
+                segment_name = "Premium"
+                characteristics = f"High-value customers (${avg_value:,.0f} avg contract, {avg_purchase:.0f} avg purchases)"
+            elif avg_value > 20000:
+                segment_name = "Enterprise"
+                characteristics = f"Medium-value customers (${avg_value:,.0f} avg contract, {avg_purchase:.0f} avg purchases)"
+            elif avg_activated > 50:
+                segment_name = "Active"
+                characteristics = f"High-usage customers ({avg_activated:.0f} avg activations)"
+            else:
+                segment_name = "Standard"
+                characteristics = f"Standard customers (${avg_value:,.0f} avg contract)"
+            
+            result.append({
+                'name': segment_name,
+                'count': len(cluster_data),
+                'characteristics': characteristics
+            })
+    
+    return result
 
 def prepare_recommendation_data():
     """Prepare data for product recommendations"""
@@ -175,6 +251,14 @@ def prepare_recommendation_data():
     else:
         models['association_rules'] = pd.DataFrame()
     
+    # Rules by antecedent product, and each customer's products, so a recommendation
+    # only touches the rules reachable from what the customer owns
+    if not models['association_rules'].empty:
+        catalogue = data['products'].drop_duplicates('product_id')
+        models['rule_index'] = rule_index.RuleIndex(models['association_rules'],
+                                                    dict(zip(catalogue['product_id'], catalogue['name'])))
+    models['customer_products'] = data['entitlements'].groupby('customer_id')['product_id'].unique().to_dict()
+    
     # Create customer-product matrix for collaborative filtering
     customer_product_matrix = data['entitlements'].pivot_table(
         index='customer_id', 
@@ -887,39 +971,21 @@ def get_customers():
 def product_recommendations(customer_id):
     """Get product recommendations for a customer using Apriori algorithm"""
     try:
-        if 'association_rules' in models and not models['association_rules'].empty:
+        if 'rule_index' in models:
             # Get customer's current products
             typed_customer_id = _coerce_id_to_series_dtype(customer_id, data['entitlements']['customer_id'])
-            customer_products = set(
-                data['entitlements'][
-                    data['entitlements']['customer_id'] == typed_customer_id
-                ]['product_id'].unique().tolist()
-            )
+            customer_products = models['customer_products'].get(typed_customer_id, [])
             
-            # Find recommendations based on association rules
+            # Top 5 products not owned yet, each by its most confident rule from an owned product
+            index = models['rule_index']
             recommendations = []
-            recommended_set = set()
-            for _, rule in models['association_rules'].iterrows():
-                antecedents = list(rule['antecedents'])
-                consequents = list(rule['consequents'])
-                
-                # Check if customer has antecedent products
-                if any(prod in customer_products for prod in antecedents):
-                    for consequent in consequents:
-                        if consequent not in customer_products and consequent not in recommended_set:
-                            match = data['products'][data['products']['product_id'] == consequent]
-                            if not match.empty:
-                                product_name = match['name'].iloc[0]
-                                recommendations.append({
-                                    'product_name': product_name,
-                                    'confidence': float(rule['confidence']),
-                                    'support': float(rule['support'])
-                                })
-                                recommended_set.add(consequent)
-            
-            # Sort by confidence and return top 5
-            recommendations.sort(key=lambda x: x['confidence'], reverse=True)
-            return jsonify({'recommendations': recommendations[:5]})
+            for product, confidence, support, _ in index.recommend(customer_products, 5):
+                recommendations.append({
+                    'product_name': index.name(product),
+                    'confidence': float(confidence),
+                    'support': float(support)
+                })
+            return jsonify({'recommendations': recommendations})
         else:
             # Fallback: recommend top popular products not yet owned
             # Compute popularity by total purchase quantity
@@ -950,17 +1016,13 @@ def churn_prediction(customer_id):
     """Predict churn for a customer and provide driver analysis"""
     try:
         typed_customer_id = _coerce_id_to_series_dtype(customer_id, data['customer_summary']['customer_id'])
-        customer_data = data['customer_summary'][
-            data['customer_summary']['customer_id'] == typed_customer_id
-        ]
+        row = models['churn_rows'].get(typed_customer_id)
         
-        if customer_data.empty:
+        if row is None:
             return jsonify({'error': 'Customer not found'})
         
-        # Prepare features for prediction
-        features_df = customer_data[models['churn_features']].replace([np.inf, -np.inf], np.nan).fillna(0)
-        features = features_df.values
-        features_scaled = models['churn_scaler'].transform(features)
+        # Features were filled and scaled once when the model was trained
+        features_scaled = models['churn_X'][row:row + 1]
         
         # Predict churn probability, robust to class ordering and single-class models
         proba = models['churn_model'].predict_proba(features_scaled)
@@ -1021,56 +1083,11 @@ def churn_prediction(customer_id):
 
 @app.route('/api/customer-segmentation')
 def customer_segmentation():
-    """Perform customer segmentation using clustering"""
+    """Get the customer segments (clustered when the data was loaded)"""
     try:
-        # Prepare features for clustering
-        features = ['total_purchased', 'total_contract_value', 'total_activated']
-        X = data['customer_summary'][features].fillna(0)
-        
-        # Scale features
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        # Perform K-means clustering with a safe number of clusters
-        num_samples = len(X_scaled)
-        n_clusters = max(1, min(4, num_samples))
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(X_scaled)
-        
-        # Add cluster labels to customer data
-        data['customer_summary']['cluster'] = clusters
-        
-        # Analyze clusters
-        segments = []
-        for i in range(n_clusters):
-            cluster_data = data['customer_summary'][data['customer_summary']['cluster'] == i]
-            
-            if len(cluster_data) > 0:
-                avg_purchase = cluster_data['total_purchased'].mean()
-                avg_value = cluster_data['total_contract_value'].mean()
-                avg_activated = cluster_data['total_activated'].mean()
-                
-                # Determine segment type
-                if avg_value > 50000 and avg_purchase > 100:
-                    segment_name = "Premium"
-                    characteristics = f"High-value customers (${avg_value:,.0f} avg contract, {avg_purchase:.0f} avg purchases)"
-                elif avg_value > 20000:
-                    segment_name = "Enterprise"
-                    characteristics = f"Medium-value customers (${avg_value:,.0f} avg contract, {avg_purchase:.0f} avg purchases)"
-                elif avg_activated > 50:
-                    segment_name = "Active"
-                    characteristics = f"High-usage customers ({avg_activated:.0f} avg activations)"
-                else:
-                    segment_name = "Standard"
-                    characteristics = f"Standard customers (${avg_value:,.0f} avg contract)"
-                
-                segments.append({
-                    'name': segment_name,
-                    'count': len(cluster_data),
-                    'characteristics': characteristics
-                })
-        
-        return jsonify({'segments': segments})
+        if 'segments' not in models:
+            prepare_segmentation()
+        return jsonify({'segments': models['segments']})
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -0,0 +1,73 @@
+"""Entity -> row lookups for the dashboard frames.
+
+The per-customer endpoints used to run ``licenses[licenses['Customer_ID'] == id]``,
+a full boolean scan per request. An ``EntityIndex`` is built once per load from
+the categorical codes of a key column: every entity maps to a contiguous run
+of positions, so fetching its rows costs O(k) for k matching rows.
+
+The frame is physically sorted by its primary key (``sort_by``), which makes
+the primary index a plain ``iloc`` slice; secondary keys keep a permutation
+array and gather their positions from it.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _codes(series):
+    """Integer codes (-1 for missing) and the matching categories of a key column"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Index(uniques)
+
+
+def sort_by(frame, column):
+    """Return `frame` stably sorted by `column` (missing keys last) with a fresh RangeIndex"""
+    codes, _ = _codes(frame[column])
+    codes = np.where(codes < 0, np.iinfo(np.int64).max, codes)
+    order = np.argsort(codes, kind='stable')
+    return frame.take(order).reset_index(drop=True)
+
+
+class EntityIndex:
+    """Row positions of each value of one key column"""
+
+    def __init__(self, frame, column):
+        self.column = column
+        codes, self.categories = _codes(frame[column])
+        valid = codes >= 0
+        order = np.argsort(np.where(valid, codes, len(self.categories)), kind='stable')
+        counts = np.bincount(codes[valid], minlength=len(self.categories))
+        self.starts = np.zeros(len(self.categories) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.starts[1:])
+        # When the frame is already sorted by this key, positions are plain slices
+        self.order = None if np.array_equal(order, np.arange(len(order))) else order
+
+    def __contains__(self, key):
+        return self.categories.get_indexer([key])[0] >= 0
+
+    def __len__(self):
+        return len(self.categories)
+
+    def positions(self, key):
+        """Row positions for `key` (a slice when the frame is sorted by this key)"""
+        code = self.categories.get_indexer([key])[0]
+        if code < 0:
+            return slice(0, 0)
+        start, stop = self.starts[code], self.starts[code + 1]
+        if self.order is None:
+            return slice(start, stop)
+        return self.order[start:stop]
+
+    def rows(self, frame, key):
+        """The rows of `frame` whose key column equals `key`"""
+        return frame.iloc[self.positions(key)]
+
+    def count(self, key):
+        code = self.categories.get_indexer([key])[0]
+        return 0 if code < 0 else int(self.starts[code + 1] - self.starts[code])
+
+
+def build_indexes(frame, columns):
+    """Build an EntityIndex for every key column present in `frame`"""
+    return {col: EntityIndex(frame, col) for col in columns if col in frame.columns}
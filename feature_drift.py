@@ -0,0 +1,84 @@
+"""Feature drift between the data a model was trained on and the live snapshot.
+
+``FeatureHistograms`` keeps one fixed-bin histogram per feature. The bin edges
+come from the quantiles of the training data (``from_matrix``) and are frozen
+from then on, so histograms of other data under the same edges
+(``with_edges``) compare bin for bin, and they are mergeable: a batch of new
+rows is counted and added (``add``) without looking at the rows counted
+before, and two histograms merge by adding their counts.
+
+``psi`` is the population stability index of every feature against a
+reference histogram, sum((p - q) * ln(p / q)) over the bins. The usual
+reading is below 0.1 for no shift, 0.1-0.25 for a moderate one and above 0.25
+for a major one. Histograms go to and from JSON (``to_dict``/``from_dict``)
+so the training histogram can be stored with the model.
+"""
+import numpy as np
+
+# Floor for empty bins' shares, so ln(p / q) stays finite
+_EPSILON = 1e-4
+
+
+class FeatureHistograms:
+    """Row counts per feature bin, under frozen bin edges"""
+
+    def __init__(self, columns, edges, counts=None):
+        self.columns = list(columns)
+        # Inner edges per feature; bin i holds edges[i - 1] <= x < edges[i]
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        self.counts = counts if counts is not None else [np.zeros(len(e) + 1) for e in self.edges]
+
+    @classmethod
+    def from_matrix(cls, matrix, columns, bins=10):
+        """Histograms of `matrix` (rows x columns) with edges at its quantiles"""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+        edges = [np.unique(np.quantile(matrix[:, i], quantiles)) if len(matrix) else np.empty(0)
+                 for i in range(len(columns))]
+        return cls(columns, edges).add(matrix)
+
+    def with_edges(self, matrix):
+        """Histograms of another `matrix` (same columns) under these edges"""
+        return FeatureHistograms(self.columns, self.edges).add(matrix)
+
+    def copy(self):
+        return FeatureHistograms(self.columns, self.edges, [c.copy() for c in self.counts])
+
+    @property
+    def rows(self):
+        return int(self.counts[0].sum()) if self.counts else 0
+
+    def add(self, matrix):
+        """Count a batch of rows (rows x columns) into the histograms"""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        for i, edges in enumerate(self.edges):
+            bins = np.searchsorted(edges, matrix[:, i], side='right')
+            self.counts[i] += np.bincount(bins, minlength=len(edges) + 1)
+        return self
+
+    def merge(self, other):
+        """Histograms of both row sets (same edges)"""
+        return FeatureHistograms(self.columns, self.edges, [a + b for a, b in zip(self.counts, other.counts)])
+
+    def psi(self, reference):
+        """{feature: population stability index of these rows against `reference`}"""
+        scores = {}
+        for column, counts, expected in zip(self.columns, self.counts, reference.counts):
+            if counts.sum() == 0 or expected.sum() == 0:
+                scores[column] = 0.0
+                continue
+            p = np.maximum(counts / counts.sum(), _EPSILON)
+            q = np.maximum(expected / expected.sum(), _EPSILON)
+            scores[column] = float(np.sum((p - q) * np.log(p / q)))
+        return scores
+
+    def to_dict(self):
+        return {
+            'columns': self.columns,
+            'edges': [e.tolist() for e in self.edges],
+            'counts': [c.tolist() for c in self.counts]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['columns'], data['edges'], [np.asarray(c, dtype=np.float64) for c in data['counts']])
@@ -0,0 +1,228 @@
+"""Model features shared by every model and endpoint, computed once per dataset version.
+
+``FeatureStore`` holds the numeric columns the models use at two levels:
+
+* license level - one float32 matrix, row for row with the license table it
+  was built from, missing values as 0 (what every model used to get from
+  ``licenses[features].fillna(0)``);
+* customer level - aggregates of those columns per customer: ``sum`` and
+  ``mean`` (missing values skipped, as in pandas), ``min``/``max``, and
+  ``weighted`` (the mean weighted by the weight column, missing values as 0,
+  falling back to the plain mean when a customer has no weight).
+
+``columns`` is the column registry ({name: position}); views pick columns by
+name, so callers never rebuild frames or fill missing values themselves.
+Datetime columns are stored as days since the Unix epoch.
+
+Customer aggregates are derived from additive state (sums, non-missing counts,
+running minima/maxima), and each aggregate is materialised as a float32 matrix
+on first use. ``add`` folds a batch of new license rows in: it appends their
+license rows and recomputes the materialised aggregates of only the customers
+the batch touches. When the license rows are sorted by customer (as the
+dashboard keeps them, ``entity_index.sort_by``) they stay sorted: customers get
+rows in order of first appearance, which is the order of their categorical
+codes, so a stable sort on it matches the re-sorted table.
+"""
+import numpy as np
+import pandas as pd
+
+AGGREGATES = ['sum', 'mean', 'min', 'max', 'weighted']
+
+EPOCH = pd.Timestamp(0)
+
+
+def _numeric(series):
+    """A column as float64 (NaN for missing), datetimes as days since the epoch"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return ((series - EPOCH) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _values(rows, columns):
+    """rows x columns as float64, NaN for missing"""
+    if not columns:
+        return np.zeros((len(rows), 0))
+    return np.column_stack([_numeric(rows[name]) for name in columns])
+
+
+def license_rows(rows, columns):
+    """float32 rows x `columns` exactly as a store keeps license rows (missing values as 0)"""
+    values = _values(rows, columns)
+    return np.where(np.isnan(values), 0.0, values).astype(np.float32)
+
+
+class FeatureStore:
+    """License-level feature matrix and per-customer aggregates, maintained incrementally"""
+
+    def __init__(self, columns, key='Customer_ID', weight='Contract_Value'):
+        self.columns = {name: i for i, name in enumerate(columns)}
+        self.key = key
+        self.weight = weight
+        width = len(self.columns)
+        # License level, and the customer row of every license (-1 without a customer)
+        self.matrix = np.zeros((0, width), dtype=np.float32)
+        self._owner = np.zeros(0, dtype=np.int64)
+        self._sorted = True
+        # {customer ID: row of the customer arrays below}
+        self.customers = {}
+        self._sum = np.zeros((0, width))
+        self._present = np.zeros((0, width))
+        self._weighted = np.zeros((0, width))
+        self._min = np.zeros((0, width))
+        self._max = np.zeros((0, width))
+        self._weight = np.zeros(0)
+        self._count = np.zeros(0)
+        # {aggregate: float32 customers x columns}, missing values as 0
+        self._views = {}
+
+    @classmethod
+    def from_rows(cls, rows, columns, key='Customer_ID', weight='Contract_Value'):
+        return cls(columns, key, weight).add(rows)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def copy(self):
+        # The license matrix is replaced, never written to, so copies share it
+        other = FeatureStore(list(self.columns), self.key, self.weight)
+        other.matrix = self.matrix
+        other._owner = self._owner
+        other._sorted = self._sorted
+        other.customers = dict(self.customers)
+        for name in ['_sum', '_present', '_weighted', '_min', '_max', '_weight', '_count']:
+            setattr(other, name, getattr(self, name).copy())
+        other._views = {how: view.copy() for how, view in self._views.items()}
+        return other
+
+    def add(self, rows):
+        """Fold a batch of license rows into the license matrix and their customers' aggregates"""
+        if len(rows) == 0:
+            return self
+        keys = rows[self.key].astype(object)
+        known = keys.notna().to_numpy()
+        codes, uniques = pd.factorize(keys[known])
+        self._grow([customer for customer in uniques if customer not in self.customers])
+        owner = np.full(len(rows), -1, dtype=np.int64)
+        owner[known] = np.array([self.customers[customer] for customer in uniques], dtype=np.int64)[codes]
+
+        values = _values(rows, list(self.columns))
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        self._append(filled.astype(np.float32), owner)
+
+        customers, values, present, filled = owner[known], values[known], present[known], filled[known]
+        if len(customers) == 0:
+            return self
+        # Reduce the batch per customer, then update every touched customer once
+        order = np.argsort(customers, kind='stable')
+        grouped = customers[order]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        touched = grouped[starts]
+        if self.weight is not None:
+            weight = _numeric(rows[self.weight])[known]
+            weight = np.where(np.isnan(weight) | (weight < 0), 0.0, weight)
+            self._weighted[touched] += np.add.reduceat((filled * weight[:, None])[order], starts)
+            self._weight[touched] += np.add.reduceat(weight[order], starts)
+        self._sum[touched] += np.add.reduceat(filled[order], starts)
+        self._present[touched] += np.add.reduceat(present[order].astype(np.float64), starts)
+        self._count[touched] += np.diff(np.r_[starts, len(grouped)])
+        # fmin/fmax skip NaN, so customers start at NaN and take their first value
+        self._min[touched] = np.fmin(self._min[touched], np.fmin.reduceat(values[order], starts))
+        self._max[touched] = np.fmax(self._max[touched], np.fmax.reduceat(values[order], starts))
+
+        for how, view in self._views.items():
+            view[touched] = self._aggregate(how, touched, fill=0.0).astype(np.float32)
+        return self
+
+    def _grow(self, new):
+        """Give new customers fresh (empty) rows at the end"""
+        if not new:
+            return
+        start = len(self.customers)
+        self.customers.update((customer, start + i) for i, customer in enumerate(new))
+        width = len(self.columns)
+        for name in ['_sum', '_present', '_weighted']:
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros((len(new), width))]))
+        for name in ['_min', '_max']:
+            setattr(self, name, np.concatenate([getattr(self, name), np.full((len(new), width), np.nan)]))
+        self._weight = np.concatenate([self._weight, np.zeros(len(new))])
+        self._count = np.concatenate([self._count, np.zeros(len(new))])
+        for how, view in self._views.items():
+            self._views[how] = np.concatenate([view, np.zeros((len(new), width), dtype=np.float32)])
+
+    def _append(self, block, owner):
+        """Append license rows, keeping them sorted by customer if they were"""
+        matrix = np.concatenate([self.matrix, block])
+        owners = np.concatenate([self._owner, owner])
+        # Rows without a customer sort last
+        keys = np.where(owners < 0, np.iinfo(np.int64).max, owners)
+        if self._sorted:
+            if len(self.matrix) == 0:
+                # The first batch tells whether the rows are kept sorted by customer
+                self._sorted = bool(np.all(np.diff(keys) >= 0))
+            elif np.any(np.diff(keys) < 0):
+                order = np.argsort(keys, kind='stable')
+                matrix, owners = matrix[order], owners[order]
+        self.matrix, self._owner = matrix, owners
+
+    def _aggregate(self, how, rows=slice(None), fill=None):
+        """One aggregate of every column for the given customer rows, as float64"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if how == 'sum':
+                result = self._sum[rows].copy()
+            elif how == 'mean':
+                result = self._sum[rows] / self._present[rows]
+            elif how == 'min':
+                result = self._min[rows].copy()
+            elif how == 'max':
+                result = self._max[rows].copy()
+            elif how == 'weighted':
+                weight = self._weight[rows][:, None]
+                plain = self._sum[rows] / self._count[rows][:, None]
+                result = np.where(weight > 0, self._weighted[rows] / np.where(weight > 0, weight, 1), plain)
+            else:
+                raise ValueError(f"Unknown aggregate '{how}' (expected one of {', '.join(AGGREGATES)})")
+        if fill is not None:
+            result[np.isnan(result)] = fill
+        return result
+
+    def _view(self, how):
+        if how not in self._views:
+            self._views[how] = self._aggregate(how, fill=0.0).astype(np.float32)
+        return self._views[how]
+
+    def _positions(self, columns):
+        return [self.columns[name] for name in columns]
+
+    def license_matrix(self, columns):
+        """float32 license rows x `columns`, missing values as 0"""
+        return self.matrix[:, self._positions(columns)]
+
+    def license_frame(self, columns):
+        return pd.DataFrame(self.license_matrix(columns), columns=list(columns))
+
+    def customer_matrix(self, aggregates):
+        """float32 customers x {column: aggregate}, missing values as 0"""
+        result = np.empty((len(self.customers), len(aggregates)), dtype=np.float32)
+        for i, (name, how) in enumerate(aggregates.items()):
+            result[:, i] = self._view(how)[:, self.columns[name]]
+        return result
+
+    def customer_frame(self, aggregates, exact=False):
+        """Customer aggregates indexed by customer ID.
+
+        With `exact` they are float64 with missing aggregates left as NaN, as
+        a groupby would give them (for reporting money figures).
+        """
+        index = pd.Index(list(self.customers), dtype=object, name=self.key)
+        if not exact:
+            return pd.DataFrame(self.customer_matrix(aggregates), index=index, columns=list(aggregates))
+        return pd.DataFrame({name: self._aggregate(how)[:, self.columns[name]] for name, how in aggregates.items()},
+                            index=index)
+
+    def customer_vector(self, customer_id, columns, how='weighted'):
+        """One customer's aggregate of `columns` (float32), or None for a customer without licenses"""
+        row = self.customers.get(customer_id)
+        if row is None:
+            return None
+        return self._view(how)[row, self._positions(columns)]
@@ -0,0 +1,307 @@
+"""Incremental ingestion of new license and renewal rows.
+
+Rows arrive two ways:
+
+* file-tail mode - the dataset watcher notices that ``licenses.csv`` or
+  ``renewal_history.csv`` only grew, and ``Ingestor.poll`` parses just the
+  appended bytes instead of re-reading the whole file;
+* HTTP - ``Ingestor.append`` validates posted rows, appends them to the CSV
+  (so they survive restarts and reloads) and then runs the same tail step
+  (data plane workers only append and leave the tail step to the loader).
+
+Either way the new rows are validated against the table's columns and
+``dataset_schema`` types, appended to the in-memory frames of a new snapshot,
+and handed to an ``on_rows`` hook that rolls them into running aggregates
+instead of recomputing those from scratch.
+"""
+import hashlib
+import io
+import os
+import threading
+
+import pandas as pd
+
+import dataset_schema
+
+# Tables that accept appended rows
+APPEND_TABLES = ['licenses', 'renewal_history']
+
+# Columns every appended row must fill in
+REQUIRED_COLUMNS = {
+    'licenses': ['Customer_ID', 'Product_ID'],
+    'renewal_history': ['Renewal_ID', 'License_ID', 'Customer_ID', 'Renewal_Date']
+}
+
+_BOOL_VALUES = {'true': True, 'false': False, '1': True, '0': False}
+
+# Bytes before the consumed offset remembered to detect rewritten (not appended) files
+_MARK_BYTES = 256
+
+
+class ValidationError(ValueError):
+    """Raised when appended rows do not match the table schema"""
+
+    def __init__(self, errors):
+        super().__init__(errors[0] if len(errors) == 1 else f"{len(errors)} validation errors")
+        self.errors = errors
+
+
+def _blank(value):
+    return value is None or value == '' or (isinstance(value, float) and pd.isna(value))
+
+
+def validate_rows(table, rows, like):
+    """Check raw rows (dicts) against the live frame's columns and types, returning them as a frame"""
+    if table not in APPEND_TABLES:
+        raise ValidationError([f"Table '{table}' does not accept appended rows"])
+    if not isinstance(rows, list) or not rows or not all(isinstance(r, dict) for r in rows):
+        raise ValidationError(['Expected a non-empty list of row objects'])
+
+    errors = []
+    columns = list(like.columns)
+    known = set(columns)
+    for i, row in enumerate(rows):
+        unknown = sorted(set(row) - known)
+        if unknown:
+            errors.append(f"row {i}: unknown column(s) {', '.join(unknown)}")
+        for col in REQUIRED_COLUMNS[table]:
+            if _blank(row.get(col)):
+                errors.append(f"row {i}: missing {col}")
+    if errors:
+        raise ValidationError(errors)
+
+    raw = pd.DataFrame(rows, columns=columns)
+    errors.extend(_type_errors(raw, like, dataset_schema.get_schema(table)))
+    if errors:
+        raise ValidationError(errors)
+    return raw
+
+
+def _kind(col, like, schema):
+    """dtype kind new values of `col` must parse as ('M', 'b', 'n' or 'O' for free text)"""
+    dtype = like[col].dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if col in schema.get('dates', []) or dtype.kind == 'M':
+        return 'M'
+    if dtype.kind == 'b':
+        return 'b'
+    if col in schema.get('int32', []) + schema.get('float32', []) or dtype.kind in 'iuf':
+        return 'n'
+    return 'O'
+
+
+def _parse(values, kind):
+    """Parse raw values as `kind`; unparseable values become NaN/NaT/None"""
+    if kind == 'M':
+        # Rows may come from different writers, so don't infer one format from the first row
+        return pd.to_datetime(values, errors='coerce', format='mixed')
+    if kind == 'b':
+        return values.map(lambda v: _BOOL_VALUES.get(str(v).lower()))
+    if kind == 'n':
+        return pd.to_numeric(values, errors='coerce')
+    return values
+
+
+def _type_errors(raw, like, schema):
+    """Report values that would silently turn into NaN/NaT (or a wrong bool) when typed"""
+    errors = []
+    for col in raw.columns:
+        kind = _kind(col, like, schema)
+        if kind == 'O':
+            continue
+        values = raw[col]
+        parsed = _parse(values, kind)
+        if kind == 'b' and not isinstance(like[col].dtype, pd.CategoricalDtype):
+            # Plain bool columns cannot hold missing values
+            bad = parsed.isna()
+        else:
+            bad = ~values.map(_blank).astype(bool) & parsed.isna()
+        for i in values.index[bad]:
+            errors.append(f"row {i}: invalid {col} value {values[i]!r}")
+    return errors
+
+
+def type_rows(table, raw, like):
+    """Type validated rows with the table schema and align dtypes with the live frame"""
+    schema = dataset_schema.get_schema(table)
+    typed = raw.copy()
+    for col in like.columns:
+        kind = _kind(col, like, schema)
+        if kind == 'b' and not isinstance(like[col].dtype, pd.CategoricalDtype):
+            typed[col] = _parse(typed[col], kind).astype(bool)
+        elif kind != 'O':
+            typed[col] = _parse(typed[col], kind)
+    typed = dataset_schema.apply_schema(typed, schema)
+    for col in like.columns:
+        dtype = like[col].dtype
+        if dtype.kind in 'iu' and typed[col].dtype != dtype and not typed[col].isna().any():
+            # Integer columns widen to float only when the new rows carry NaN
+            typed[col] = typed[col].astype(dtype)
+    return typed[list(like.columns)]
+
+
+def append_frame(frame, rows):
+    """Concatenate new rows onto a frame, widening categoricals instead of dropping to object"""
+    rows = rows.reset_index(drop=True)
+    columns = {}
+    for col in frame.columns:
+        left, right = frame[col], rows[col]
+        if isinstance(left.dtype, pd.CategoricalDtype):
+            # Extend the live categories (keeping existing codes) with any new values
+            categories = left.cat.categories
+            new = pd.Index(right.dropna().unique())
+            new = new[~new.isin(categories)]
+            dtype = pd.CategoricalDtype(categories.append(new) if len(new) else categories)
+            left = left if dtype == left.dtype else left.cat.set_categories(dtype.categories)
+            columns[col] = pd.concat([left, right.astype(object).astype(dtype)], ignore_index=True)
+        else:
+            combined = pd.concat([left, right], ignore_index=True)
+            if left.dtype.kind in 'iuf' and left.dtype.itemsize == 4 and combined.dtype == 'float64':
+                # Keep compact 32-bit columns compact (int32 + NaN becomes float32)
+                combined = combined.astype('float32')
+            columns[col] = combined
+    return pd.DataFrame(columns, columns=frame.columns)
+
+
+class Ingestor:
+    """Appends new rows to the live snapshot, from file tails or HTTP"""
+
+    def __init__(self, store, reindex, on_rows=None):
+        self.store = store
+        # reindex(tables) -> (tables, indexes): re-sorts and indexes the grown tables
+        self._reindex = reindex
+        # on_rows(snapshot, table, rows) -> {derived name: value} carried to the new snapshot
+        self._on_rows = on_rows
+        self._lock = threading.Lock()
+        # {table: {'offset': bytes consumed, 'mark': bytes just before offset}}
+        self._tails = {}
+        store.on_swap(self._on_swap)
+
+    def _on_swap(self, old, new):
+        # Tail from exactly what the new snapshot has read
+        self._tails = {}
+        for table in APPEND_TABLES:
+            size = new.sizes.get(table)
+            if size is not None:
+                self._tails[table] = {'offset': size, 'mark': self._mark(table, size)}
+
+    def _path(self, table):
+        return self.store.csv_paths()[table]
+
+    def _mark(self, table, offset):
+        try:
+            with open(self._path(table), 'rb') as f:
+                f.seek(max(0, offset - _MARK_BYTES))
+                return f.read(min(offset, _MARK_BYTES))
+        except OSError:
+            return None
+
+    def _appended_tables(self):
+        """Tables whose CSV only grew since the last read, or None if any changed otherwise"""
+        grown = []
+        signature = dict((name, size) for name, size, _ in self.store.source_signature())
+        current = self.store.current()
+        for name, size in signature.items():
+            tail = self._tails.get(name)
+            known = tail['offset'] if tail else current.sizes.get(name)
+            if size == known:
+                continue
+            if (tail is None or size is None or size < tail['offset']
+                    or self._mark(name, tail['offset']) != tail['mark']
+                    or not tail['mark'].endswith(b'\n')):
+                return None
+            grown.append(name)
+        return grown
+
+    def poll(self, store=None):
+        """Ingest appended CSV bytes; returns False when a full reload is needed instead"""
+        with self._lock:
+            grown = self._appended_tables()
+            if grown is None:
+                return False
+            try:
+                batches = self._read_tails(grown)
+                if batches:
+                    self._publish(batches)
+            except ValidationError as e:
+                print(f"Appended rows rejected ({'; '.join(e.errors[:5])}), falling back to a full reload")
+                return False
+            except Exception as e:
+                print(f"Ingesting appended rows failed ({e}), falling back to a full reload")
+                return False
+            return True
+
+    def append(self, table, rows, publish=True):
+        """Validate posted rows, persist them to the table's CSV and ingest them.
+
+        With publish=False the rows are only written; whoever tails the CSV (the
+        data plane loader) ingests them, and None is returned.
+        """
+        with self._lock:
+            current = self.store.current()
+            if table not in current.tables:
+                raise ValidationError([f"Table '{table}' is not loaded"])
+            path = self._path(table)
+            raw = validate_rows(table, rows, current.tables[table])
+            if table not in self._tails or self._appended_tables() is None:
+                raise ValidationError([f"{os.path.basename(path)} changed on disk; retry after the reload"])
+            # Fail on typing problems before anything is written to the CSV
+            append_frame(current.tables[table].head(0), type_rows(table, raw, current.tables[table]))
+
+            with open(path, 'ab') as f:
+                f.write(raw.to_csv(header=False, index=False).encode())
+            if not publish:
+                return None
+
+            return self._publish(self._read_tails(self._appended_tables()))
+
+    def _read_tails(self, tables):
+        batches = {}
+        for table in tables:
+            rows, consumed = self._read_tail(table)
+            if consumed:
+                batches[table] = (rows, consumed)
+        return batches
+
+    def _read_tail(self, table):
+        """Parse the complete lines appended since the last offset"""
+        path = self._path(table)
+        offset = self._tails[table]['offset']
+        with open(path, 'rb') as f:
+            header = f.readline()
+            f.seek(offset)
+            chunk = f.read()
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return None, 0
+        raw = pd.read_csv(io.BytesIO(header + chunk[:end]), dtype=str)
+        return raw, end
+
+    def _publish(self, batches):
+        current = self.store.current()
+        tables = dict(current.tables)
+        sources = dict(current.sources)
+        sizes = dict(current.sizes)
+        seeded = {}
+        for table, (raw, consumed) in batches.items():
+            raw = validate_rows(table, raw.to_dict('records'), tables[table])
+            typed = type_rows(table, raw, tables[table])
+            if self._on_rows is not None:
+                seeded.update(self._on_rows(current, table, typed))
+            tables[table] = append_frame(tables[table], typed)
+
+            offset = self._tails[table]['offset'] + consumed
+            self._tails[table] = {'offset': offset, 'mark': self._mark(table, offset)}
+            sizes[table] = offset
+            # Chain the content key so every appended state gets its own fingerprint
+            appended = hashlib.sha256(raw.to_csv(index=False).encode()).hexdigest()
+            sources[table] = hashlib.sha256(f'{sources.get(table)}+{appended}'.encode()).hexdigest()
+
+        indexes = current.indexes
+        if 'licenses' in batches:
+            tables, indexes = self._reindex(tables)
+        snapshot = self.store.publish(tables, indexes, sources, sizes, seeded)
+        print(f"Ingested {', '.join(f'{len(b[0])} {t}' for t, b in batches.items())} row(s) "
+              f"as dataset version {snapshot.version}")
+        return snapshot
@@ -0,0 +1,85 @@
+"""Item-item cosine similarity, kept as each product's top-N neighbours.
+
+``ItemNeighbours.from_co_occurrence`` reads the similarities off the
+co-occurrence counts of ``co_occurrence.CoOccurrence`` (XᵀX of the customers x
+products purchase matrix): the cosine of products i and j is
+c_ij / sqrt(c_ii * c_jj), the customers buying both over the geometric mean
+of their buyers, so popular products do not crowd out everything else. Only
+the `top_n` most similar products of each product are kept, as flat CSR
+arrays (one slice per product, most similar first).
+
+``recommend(owned, k)`` adds up the neighbour lists of the owned products, so
+a lookup costs the owned products times `top_n`, not a pass over purchases.
+"""
+import numpy as np
+from scipy import sparse
+
+
+class ItemNeighbours:
+    """Most similar products of every product, by cosine over their customers"""
+
+    def __init__(self, items, indptr, neighbours, similarity, counts):
+        # Product of each item code
+        self.items = items
+        self.codes = {item: code for code, item in enumerate(items)}
+        # Neighbours of item i: neighbours[indptr[i]:indptr[i + 1]], most similar first
+        self.indptr = indptr
+        self.neighbours = neighbours
+        self.similarity = similarity
+        # Customers buying both the item and each neighbour
+        self.counts = counts
+
+    @classmethod
+    def from_co_occurrence(cls, pairs, top_n):
+        """Top `top_n` neighbours of every item of `pairs` (a ``co_occurrence.CoOccurrence``)"""
+        counts = sparse.coo_matrix(pairs.counts)
+        off_diagonal = counts.row != counts.col
+        row, col, count = counts.row[off_diagonal], counts.col[off_diagonal], counts.data[off_diagonal]
+        norms = np.sqrt(pairs.item_counts.astype(np.float64))
+        similarity = count / (norms[row] * norms[col])
+        # By item, most similar first (ties by neighbour code), then the first `top_n` of each item
+        order = np.lexsort((col, -similarity, row))
+        row, col, count, similarity = row[order], col[order], count[order], similarity[order]
+        starts = np.r_[0, np.cumsum(np.bincount(row, minlength=len(pairs.items)))]
+        keep = np.arange(len(row)) - starts[row] < top_n
+        indptr = np.r_[0, np.cumsum(np.bincount(row[keep], minlength=len(pairs.items)))]
+        return cls(pairs.items, indptr, col[keep].astype(np.int64), similarity[keep], count[keep].astype(np.int64))
+
+    def __len__(self):
+        return len(self.neighbours)
+
+    def memory(self):
+        """Bytes of the neighbour arrays"""
+        return self.indptr.nbytes + self.neighbours.nbytes + self.similarity.nbytes + self.counts.nbytes
+
+    def recommend(self, owned, k=5, known=None):
+        """Up to `k` (item, score, best owned item, its similarity, its co-purchases) for a customer owning `owned`.
+
+        The score of a product is its summed similarity to the owned
+        products; products the customer owns, or (with `known`) that are not
+        in `known`, are left out.
+        """
+        owned = {self.codes[item] for item in owned if item in self.codes}
+        codes = np.array(sorted(owned), dtype=np.int64)
+        if len(codes) == 0:
+            return []
+        lengths = self.indptr[codes + 1] - self.indptr[codes]
+        entries = np.repeat(self.indptr[codes] - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + np.arange(lengths.sum())
+        sources = np.repeat(codes, lengths)
+        candidates, slot = np.unique(self.neighbours[entries], return_inverse=True)
+        scores = np.bincount(slot, weights=self.similarity[entries], minlength=len(candidates))
+        # Most similar owned product of each candidate: the last entry of its slot once sorted by similarity
+        order = np.lexsort((self.similarity[entries], slot))
+        last = np.flatnonzero(np.r_[slot[order][1:] != slot[order][:-1], True])
+        best, best_source = entries[order][last], sources[order][last]
+        found = []
+        for position in np.lexsort((candidates, -scores)):
+            item = self.items[candidates[position]]
+            if candidates[position] in owned or (known is not None and item not in known):
+                continue
+            entry = best[position]
+            found.append((item, float(scores[position]), self.items[best_source[position]],
+                          float(self.similarity[entry]), int(self.counts[entry])))
+            if len(found) == k:
+                break
+        return found
@@ -0,0 +1,163 @@
+"""Frequent itemsets mined once, queried at any support/confidence/lift threshold.
+
+``ItemsetLattice.mine`` runs Eclat once over ``baskets.Baskets`` at a support
+floor and keeps every frequent itemset with its support. Frequent pairs are
+read from the baskets' co-occurrence counts (``co_occurrence.CoOccurrence``);
+Eclat grows them depth first from the per-product customer bitsets: an
+itemset's bitset is the AND of its prefix's bitset and the new product's, and
+its count the popcount, so no transaction is rescanned and only frequent
+products get bitsets. Each step only ANDs the words where the prefix has
+customers, so rare products cost their number of buyers, not the number of
+customers.
+
+Frequent itemsets are closed under subsets, so the itemsets (and association
+rules) at any support at or above the floor are a filter of the lattice, not
+another mining pass. Every rule the lattice allows (each itemset split into
+antecedent and consequent) is derived at mining time and kept as arrays, so
+``rules`` answers a threshold query with a few boolean masks and a sort.
+
+``frequent_count`` gives the number of frequent single items and pairs at a
+support, which is enough to pick the floor a query needs before mining.
+"""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from baskets import min_count, popcount
+
+
+def frequent_count(baskets, pairs, support, limit=None):
+    """Frequent single items + frequent pairs of `baskets` at `support` (`pairs` their
+    ``co_occurrence.CoOccurrence``).
+
+    With `limit`, pairs are only counted while the single items are at most
+    `limit` (enough to tell whether the total passes it).
+    """
+    needed = min_count(support, baskets.transactions)
+    items = baskets.frequent(needed)
+    if limit is not None and len(items) > limit:
+        return len(items)
+    return len(items) + len(pairs.pairs(items, needed)[0])
+
+
+def eclat(baskets, pairs, min_support, max_len=None):
+    """{itemset (ascending item codes): count} of every itemset with support >= min_support.
+
+    Pairs are read from the co-occurrence counts (`pairs`); bitsets are only
+    ANDed to grow frequent pairs into larger itemsets.
+    """
+    needed = min_count(min_support, baskets.transactions)
+    items = baskets.frequent(needed)
+    found = {(int(item),): int(baskets.counts[item]) for item in items}
+    if max_len is not None and max_len < 2:
+        return found
+    first, second, counts = pairs.pairs(items, needed)
+    found.update(((int(items[i]), int(items[j])), int(count)) for i, j, count in zip(first, second, counts))
+    if (max_len is not None and max_len < 3) or len(first) == 0:
+        return found
+    bits = baskets.bitsets(items)
+    # Pairs come sorted by first item, then second
+    starts = np.flatnonzero(np.r_[True, first[1:] != first[:-1]])
+    for start, end in zip(starts, np.r_[starts[1:], len(first)]):
+        i, extensions = first[start], second[start:end]
+        words = np.flatnonzero(bits[i])
+        _extend((int(items[i]),), items[extensions], bits[i, words] & bits[np.ix_(extensions, words)],
+                needed, max_len, found)
+    return found
+
+
+def _extend(prefix, items, bits, needed, max_len, found):
+    """Add the frequent extensions of prefix + (items[j],) by the items after j.
+
+    bits[j] is the bitset of prefix + (items[j],), cut to the words where the
+    prefix has customers at all.
+    """
+    for j in range(len(items) - 1):
+        # Common customers can only sit in words where prefix + items[j] has some
+        words = np.flatnonzero(bits[j])
+        joined = bits[j, words] & bits[j + 1:, words]
+        counts = popcount(joined)
+        keep = np.flatnonzero(counts >= needed)
+        if len(keep) == 0:
+            continue
+        itemset = prefix + (int(items[j]),)
+        for k in keep:
+            found[itemset + (int(items[j + 1 + k]),)] = int(counts[k])
+        if max_len is None or len(itemset) + 1 < max_len:
+            _extend(itemset, items[j + 1 + keep], joined[keep], needed, max_len, found)
+
+
+class ItemsetLattice:
+    """Frequent itemsets at or above a support floor, and the rules between them"""
+
+    def __init__(self, supports, items, transactions, min_support, labels=None):
+        # {itemset (ascending item codes): support}
+        self.supports = supports
+        # Item of each item code
+        self.items = items
+        self.transactions = transactions
+        self.min_support = min_support
+        self.labels = labels or {}
+        self._support = np.array(list(supports.values()), dtype=np.float64)
+        self._build_rules()
+
+    @classmethod
+    def mine(cls, baskets, pairs, min_support, max_len=None, labels=None):
+        """Eclat over `baskets` (with `pairs`, their co-occurrence counts) at `min_support`"""
+        counts = eclat(baskets, pairs, min_support, max_len)
+        supports = {itemset: count / baskets.transactions for itemset, count in counts.items()}
+        return cls(supports, baskets.items, baskets.transactions, min_support, labels)
+
+    def __len__(self):
+        return len(self.supports)
+
+    def count(self, min_support):
+        """Number of frequent itemsets at `min_support` (not below the floor)"""
+        return int((self._support >= max(min_support, self.min_support)).sum())
+
+    def _build_rules(self):
+        antecedents, consequents, support, confidence, lift = [], [], [], [], []
+        for itemset, itemset_support in self.supports.items():
+            for size in range(1, len(itemset)):
+                for antecedent in combinations(itemset, size):
+                    consequent = tuple(item for item in itemset if item not in antecedent)
+                    rule_confidence = itemset_support / self.supports[antecedent]
+                    antecedents.append(tuple(self.items[list(antecedent)]))
+                    consequents.append(tuple(self.items[list(consequent)]))
+                    support.append(itemset_support)
+                    confidence.append(rule_confidence)
+                    lift.append(rule_confidence / self.supports[consequent])
+        self._antecedents = np.empty(len(antecedents), dtype=object)
+        self._antecedents[:] = antecedents
+        self._consequents = np.empty(len(consequents), dtype=object)
+        self._consequents[:] = consequents
+        self._rule_support = np.array(support, dtype=np.float64)
+        self._confidence = np.array(confidence, dtype=np.float64)
+        self._lift = np.array(lift, dtype=np.float64)
+
+    def rules(self, min_support=None, min_confidence=0.0, min_lift=0.0, top=None):
+        """Rules passing every threshold, strongest lift first (then confidence, support).
+
+        Supports below the floor raise ValueError: the lattice holds no
+        itemsets below it, so it cannot answer them.
+        """
+        min_support = self.min_support if min_support is None else min_support
+        if min_support < self.min_support:
+            raise ValueError(f'min_support {min_support} is below the mined floor {self.min_support}')
+        keep = ((self._rule_support >= min_support) & (self._confidence >= min_confidence)
+                & (self._lift >= min_lift))
+        found = np.flatnonzero(keep)
+        order = np.lexsort((-self._rule_support[found], -self._confidence[found], -self._lift[found]))
+        found = found[order[:top] if top is not None else order]
+        return pd.DataFrame({
+            'antecedents': self._antecedents[found],
+            'consequents': self._consequents[found],
+            'support': self._rule_support[found],
+            'confidence': self._confidence[found],
+            'lift': self._lift[found]
+        })
+
+    def label(self, items, width=35):
+        """Display label of an itemset: its items' labels, each cut to `width`"""
+        return ', '.join(self.labels.get(item, str(item))[:width] for item in items)
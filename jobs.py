@@ -0,0 +1,244 @@
+"""Background training jobs for the model-backed endpoints.
+
+Fitting a model inside a request blocks that worker thread for every other
+client. Instead each model kind is registered here with
+
+* ``prepare(snapshot)`` - cheap, run in this process: picks the training
+  inputs (frames, dicts) out of the snapshot, and
+* ``fit(*inputs)`` - the expensive part, a top-level function of
+  ``model_training`` run in a process pool (so fits are not bound by the
+  GIL of the serving process) and returning (model, info).
+
+Results land in the kind's ``ModelRegistry`` (and are handed to the kind's
+``on_trained(snapshot, trained)`` hook, if any, e.g. to promote a tuned model),
+with whatever the kind's ``reference(snapshot)`` hook returns about the
+training data (e.g. feature histograms to measure drift against) merged into
+their info; request handlers read completed models from there and never wait for a job. A job is identified per kind and
+dataset fingerprint: submitting the same kind for the same data again returns
+the queued, running or finished job instead of training twice, and a newer
+snapshot cancels the queued (not yet running) jobs of older ones.
+
+Job records live in the process that ran them; the models they produce are
+shared through the registry on disk.
+"""
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+# Job stages in order; progress is the fraction of them done
+STAGES = ['queued', 'preparing', 'fitting', 'saving', 'done']
+
+# Finished jobs kept for GET /api/jobs
+KEEP_JOBS = 200
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class Job:
+    """One training run of a model kind for one dataset snapshot"""
+
+    def __init__(self, kind, snapshot):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.version = snapshot.version
+        self.fingerprint = snapshot.fingerprint
+        # queued, running, done, failed or cancelled
+        self.status = 'queued'
+        self.stage = 'queued'
+        self.error = None
+        self.model = None
+        self.submitted_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self._started = None
+        self._seconds = None
+        self._finished = threading.Event()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def progress(self):
+        return STAGES.index(self.stage) / (len(STAGES) - 1)
+
+    def advance(self, stage):
+        if stage == 'preparing':
+            self.status = 'running'
+            self.started_at = _now()
+            self._started = time.perf_counter()
+        self.stage = stage
+
+    def finish(self, status, trained=None, error=None):
+        self.status = status
+        if status == 'done':
+            self.stage = 'done'
+        self.error = error
+        if trained is not None:
+            self.model = {key: trained.info[key] for key in ['version', 'fingerprint', 'trained_at', 'train_seconds']}
+        self.finished_at = _now()
+        if self._started is not None:
+            self._seconds = round(time.perf_counter() - self._started, 3)
+        self._finished.set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns whether it did"""
+        return self._finished.wait(timeout)
+
+    def describe(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': round(self.progress, 2),
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'seconds': self._seconds,
+            'error': self.error,
+            'model': self.model
+        }
+
+
+class JobQueue:
+    """Runs registered model fits on a process pool and tracks them as jobs"""
+
+    def __init__(self, workers=2):
+        # With no workers, fits run on the job's dispatch thread in this process
+        self.workers = workers
+        self._pool = None
+        self._dispatch = ThreadPoolExecutor(max(workers, 1), thread_name_prefix='training-job')
+        self._kinds = {}
+        self._eager = []
+        self._jobs = OrderedDict()
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def register(self, kind, registry, prepare, fit, eager=True, on_trained=None, reference=None):
+        """Add a model kind; eager kinds are trained for every snapshot swapped in"""
+        self._kinds[kind] = (registry, prepare, fit, on_trained, reference)
+        if eager:
+            self._eager.append(kind)
+
+    @property
+    def kinds(self):
+        return list(self._kinds)
+
+    @property
+    def eager(self):
+        return list(self._eager)
+
+    def registry(self, kind):
+        return self._kinds[kind][0]
+
+    def submit(self, kind, snapshot, retry=False):
+        """The job training `kind` on `snapshot`, starting one unless it exists.
+
+        A failed job is returned as is (so polling clients don't retrigger it)
+        unless `retry` is set.
+        """
+        registry = self._kinds[kind][0]
+        key = (kind, snapshot.fingerprint)
+        with self._lock:
+            job = self._by_key.get(key)
+            if job is not None and job.status != 'cancelled' and (job.status != 'failed' or not retry):
+                return job
+            job = Job(kind, snapshot)
+            self._remember(key, job)
+            trained = registry.get(snapshot)
+            if trained is not None:
+                # Trained before (this process or another one): nothing to run
+                job.finish('done', trained)
+                return job
+            # Queued runs for older data of this kind are superseded by this one
+            for other in self._jobs.values():
+                if other.kind == kind and other.status == 'queued' and other is not job:
+                    other.finish('cancelled')
+        self._dispatch.submit(self._run, job, snapshot)
+        return job
+
+    def submit_all(self, snapshot):
+        """Train every eager kind on `snapshot` (e.g. when it is swapped in)"""
+        if not snapshot.tables:
+            return []
+        return [self.submit(kind, snapshot) for kind in self._eager]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self, kind=None):
+        """Jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in reversed(jobs) if kind is None or job.kind == kind]
+
+    def _remember(self, key, job):
+        self._jobs[job.id] = job
+        self._by_key[key] = job
+        while len(self._jobs) > KEEP_JOBS:
+            old = self._jobs.popitem(last=False)[1]
+            if not old.finished:
+                # Never forget a live job; it is dropped once it finished
+                self._jobs[old.id] = old
+                self._jobs.move_to_end(old.id, last=False)
+                break
+            if self._by_key.get((old.kind, old.fingerprint)) is old:
+                del self._by_key[(old.kind, old.fingerprint)]
+
+    def _run(self, job, snapshot):
+        if job.finished:
+            return
+        registry, prepare, fit, on_trained, reference = self._kinds[job.kind]
+        try:
+            trained = registry.build(snapshot, lambda snapshot: self._fit(job, prepare, fit, reference, snapshot))
+            if trained is None:
+                job.finish('failed', error='Training was interrupted in another process')
+            else:
+                if on_trained is not None:
+                    on_trained(snapshot, trained)
+                job.finish('done', trained)
+        except Exception as e:
+            print(f"Training job {job.id} ({job.kind}, dataset version {job.version}) failed: {e}")
+            job.finish('failed', error=str(e))
+
+    def _fit(self, job, prepare, fit, reference, snapshot):
+        job.advance('preparing')
+        inputs = prepare(snapshot)
+        job.advance('fitting')
+        if self.workers <= 0:
+            result = fit(*inputs)
+        else:
+            try:
+                result = self._process_pool().submit(fit, *inputs).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory): start a fresh pool for the next job
+                with self._lock:
+                    self._pool = None
+                raise
+        job.advance('saving')
+        if reference is not None:
+            model, info = result
+            result = model, dict(info, **reference(snapshot))
+        return result
+
+    def _process_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers start clean instead of forking the server's threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def shutdown(self):
+        self._dispatch.shutdown(wait=False, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
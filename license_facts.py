@@ -0,0 +1,83 @@
+"""Denormalized license fact table.
+
+Several endpoints used to join ``licenses`` with ``products`` (and group by
+customer attributes) on every request. ``build_facts`` does those lookups once
+per dataset version: every license row gets its product's name, category and
+vendor and its customer's name, industry, segment and country.
+
+The fact table is a left join that keeps the row order of ``licenses``, so
+the licenses entity indexes address it directly. ``Has_Product`` marks the
+rows an inner join with ``products`` would have kept; filter on it (or use
+``catalogued``) wherever the old code merged.
+"""
+import pandas as pd
+
+# Dimension columns copied onto every license row, as {source column: fact column}
+PRODUCT_COLUMNS = {
+    'Product_Name': 'Product_Name',
+    'Product_Category': 'Product_Category',
+    # The license's own Vendor_ID disagrees with its product's vendor for a few rows
+    'Vendor_ID': 'Product_Vendor_ID'
+}
+CUSTOMER_COLUMNS = {
+    'Company_Name': 'Company_Name',
+    'Industry_Type': 'Industry_Type',
+    'Segment': 'Segment',
+    'Country': 'Country'
+}
+
+
+def _positions(keys, lookup):
+    """Position in `lookup` of every key (-1 where the key is missing)"""
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        # Look up each category once, then gather through the codes
+        codes = keys.cat.codes.to_numpy()
+        positions = lookup.get_indexer(keys.cat.categories).take(codes)
+        positions[codes < 0] = -1
+        return positions
+    return lookup.get_indexer(keys)
+
+
+def _join(keys, dim, key, columns):
+    """Left-join `columns` of `dim` onto `keys`; returns ({fact column: values}, matched mask)"""
+    dim = dim.drop_duplicates(key)
+    positions = _positions(keys, pd.Index(dim[key]))
+    out = {}
+    for source, target in columns.items():
+        if source not in dim.columns:
+            continue
+        values = dim[source]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            # Names repeat across many licenses; store them once as categories
+            values = values.astype('category')
+        out[target] = pd.Series(values.array.take(positions, allow_fill=True), index=keys.index)
+    return out, positions >= 0
+
+
+def build_facts(licenses, products, customers):
+    """Return `licenses` with its product and customer attributes, in the same row order"""
+    extras = {'Has_Product': pd.Series(False, index=licenses.index)}
+    if products is not None:
+        columns, found = _join(licenses['Product_ID'], products, 'Product_ID', PRODUCT_COLUMNS)
+        extras.update(columns)
+        extras['Has_Product'] = pd.Series(found, index=licenses.index)
+    if customers is not None:
+        columns, _ = _join(licenses['Customer_ID'], customers, 'Customer_ID', CUSTOMER_COLUMNS)
+        extras.update(columns)
+    # Add columns to a shallow copy: concat would consolidate (copy) the license
+    # columns whenever they are held as separate blocks, e.g. mapped from the data plane
+    facts = licenses.copy(deep=False)
+    for name, values in extras.items():
+        facts[name] = values
+    return facts
+
+
+def catalogued(facts):
+    """Rows whose product exists in the products table (inner-join semantics)"""
+    return facts[facts['Has_Product']]
+
+
+def first_values(frame, key, column):
+    """{key: `column` on the first row with that key}; cheaper than a groupby 'first' on categoricals"""
+    firsts = frame.drop_duplicates(key)
+    return dict(zip(firsts[key], firsts[column]))
@@ -0,0 +1,145 @@
+"""Pre-aggregated license metrics cube.
+
+Most dashboard panels are sums or means of a few license columns grouped by
+some subset of customer, product, product category and start month. The cube
+aggregates the license fact table once per dataset version into one cell per
+(Customer_ID, Product_ID, Product_Category, Month) combination. Each cell keeps
+only additive measures:
+
+* ``<measure>_sum``, ``<measure>_count`` (non-null rows) and ``<measure>_sumsq``
+  for every column in ``MEASURES``, so sums, means and variances roll up exactly;
+* a row count per predicate in ``COUNTS`` (licenses, licenses with an ID,
+  high churn risk licenses).
+
+Panels answer with ``rollup``, which re-aggregates cells instead of license
+rows. Cells are sorted by customer, so one customer's cells are a contiguous
+slice, and whole-cube rollups are memoised (the cube never changes).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ['Customer_ID', 'Product_ID', 'Product_Category', 'Month']
+
+# License columns kept as sum / count / sum of squares
+MEASURES = [
+    'Number_of_quantities_purchased', 'Number_of_quantities_activated', 'Contract_Value',
+    'Feature_Utilization', 'Frequency_of_Product_Purchase', 'Percentage_of_quantities_deployed',
+    'Satisfaction_Score', 'Support_Tickets'
+]
+
+# Row counts kept per cell, as {name: predicate(facts) -> bool mask}
+COUNTS = {
+    'licenses': lambda facts: np.ones(len(facts), dtype=bool),
+    'license_ids': lambda facts: facts['License_ID'].notna().to_numpy(),
+    'high_churn': lambda facts: (facts['Churn_Risk'] == 'High').to_numpy()
+}
+
+
+def _dimension(facts, name):
+    """Integer codes (-1 for missing) and labels of one cube dimension"""
+    if name == 'Month':
+        # Same labels as .dt.to_period('M').astype(str)
+        codes, uniques = pd.factorize(facts['License_Start_Date'].dt.to_period('M'), sort=True)
+        return codes, pd.Index(uniques.astype(str))
+    values = facts[name]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int64), values.cat.categories
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes, pd.Index(uniques)
+
+
+def _group(codes, sizes):
+    """Group rows by several code arrays (-1 allowed); returns (group codes per dim, inverse)"""
+    flat = np.ravel_multi_index([c + 1 for c in codes], [s + 1 for s in sizes])
+    uniques, inverse = np.unique(flat, return_inverse=True)
+    return [c - 1 for c in np.unravel_index(uniques, [s + 1 for s in sizes])], inverse
+
+
+class MetricsCube:
+    """Additive license measures per (customer, product, category, month) cell"""
+
+    def __init__(self, facts):
+        codes, self.labels = [], {}
+        for name in DIMENSIONS:
+            dim_codes, self.labels[name] = _dimension(facts, name)
+            codes.append(dim_codes)
+        sizes = [len(self.labels[name]) for name in DIMENSIONS]
+        cell_codes, inverse = _group(codes, sizes)
+        n = len(cell_codes[0])
+
+        cells = {name: c.astype(np.int32) for name, c in zip(DIMENSIONS, cell_codes)}
+        for measure in MEASURES:
+            values = facts[measure].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values)
+            values = np.where(valid, values, 0.0)
+            cells[f'{measure}_sum'] = np.bincount(inverse, weights=values, minlength=n)
+            cells[f'{measure}_count'] = np.bincount(inverse, weights=valid, minlength=n)
+            cells[f'{measure}_sumsq'] = np.bincount(inverse, weights=values * values, minlength=n)
+        for name, predicate in COUNTS.items():
+            cells[name] = np.bincount(inverse, weights=predicate(facts), minlength=n)
+        self.cells = pd.DataFrame(cells)
+
+        # Cells are sorted by customer code: code k owns cells[starts[k + 1]:starts[k + 2]]
+        # (starts[0]:starts[1] holds licenses without a customer)
+        self._starts = np.searchsorted(self.cells['Customer_ID'].to_numpy(),
+                                       np.arange(-1, len(self.labels['Customer_ID']) + 1))
+        self._rollups = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.cells)
+
+    def customer_cells(self, customer_id):
+        """The cells of one customer (all cells for 'all' or None)"""
+        if customer_id is None or customer_id == 'all':
+            return self.cells
+        code = self.labels['Customer_ID'].get_indexer([customer_id])[0]
+        if code < 0:
+            return self.cells.iloc[0:0]
+        return self.cells.iloc[self._starts[code + 1]:self._starts[code + 2]]
+
+    def rollup(self, by, customer_id=None):
+        """Re-aggregate cells by the dimensions `by` (missing keys dropped), indexed by their labels"""
+        by = [by] if isinstance(by, str) else list(by)
+        whole = customer_id is None or customer_id == 'all'
+        if whole and tuple(by) in self._rollups:
+            return self._rollups[tuple(by)]
+
+        cells = self.customer_cells(customer_id)
+        keep = np.ones(len(cells), dtype=bool)
+        for name in by:
+            keep &= cells[name].to_numpy() >= 0
+        cells = cells[keep]
+
+        codes = [cells[name].to_numpy().astype(np.int64) for name in by]
+        group_codes, inverse = _group(codes, [len(self.labels[name]) for name in by])
+        measures = [c for c in self.cells.columns if c not in DIMENSIONS]
+        out = {c: np.bincount(inverse, weights=cells[c].to_numpy(), minlength=len(group_codes[0]))
+               for c in measures}
+        index = [self.labels[name].take(c) for name, c in zip(by, group_codes)]
+        result = pd.DataFrame(out, index=pd.MultiIndex.from_arrays(index, names=by))
+        if len(by) == 1:
+            result.index = result.index.get_level_values(0)
+
+        if whole:
+            with self._lock:
+                self._rollups[tuple(by)] = result
+        return result
+
+    def totals(self, customer_id=None):
+        """Every measure summed over the cells of one customer (or the whole cube)"""
+        return self.customer_cells(customer_id).drop(columns=DIMENSIONS).sum()
+
+
+def mean(agg, measure):
+    """Mean of `measure` from rolled-up sums and counts (NaN where there were no values)"""
+    return agg[f'{measure}_sum'] / agg[f'{measure}_count']
+
+
+def variance(agg, measure):
+    """Sample variance of `measure` from rolled-up sums, sums of squares and counts"""
+    n = agg[f'{measure}_count']
+    total = agg[f'{measure}_sum']
+    return (agg[f'{measure}_sumsq'] - total * total / n) / (n - 1)
@@ -0,0 +1,273 @@
+"""On-disk registry of models trained once per dataset version.
+
+A model is identified by its name, the fingerprint of the dataset snapshot it
+was trained on and a hash of its training parameters. Each one is stored as a
+``joblib`` artifact plus an ``info.json`` with its metrics, so a restart (or
+another worker on the same data) loads it instead of training again.
+
+The registry does not decide when to train: ``jobs`` calls ``build`` from its
+workers, and request handlers only read completed models through ``latest``,
+which keeps answering with the previous model until the new one is stored.
+``store`` replaces a snapshot's model with one trained elsewhere (a tuned
+model being promoted).
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import joblib
+
+# Artifacts of older datasets kept per model (newest first by modification time)
+KEEP_ARTIFACTS = 5
+
+# A training lock not refreshed for this long is assumed to belong to a crashed process
+STALE_LOCK_SECONDS = 600
+
+# How often the owner of a training lock refreshes it while training
+LOCK_HEARTBEAT_SECONDS = 30
+
+
+def _lock_alive(path):
+    """Whether a training lock exists and is recent enough to belong to a running process"""
+    try:
+        return time.time() - os.path.getmtime(path) < STALE_LOCK_SECONDS
+    except OSError:
+        return False
+
+
+class _TrainingLock:
+    """A training lock file held by this process.
+
+    The file holds the owner's pid and a random token; a heartbeat thread
+    touches it while held, so long fits are not taken for crashed ones, and
+    release only removes the file while it still holds this token.
+    """
+
+    def __init__(self, path, token):
+        self.path = path
+        self.token = token
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self):
+        while not self._stop.wait(LOCK_HEARTBEAT_SECONDS):
+            if not self.owned():
+                return
+            try:
+                os.utime(self.path)
+            except OSError:
+                return
+
+    def owned(self):
+        try:
+            with open(self.path) as f:
+                return f.read() == self.token
+        except OSError:
+            return False
+
+    def release(self):
+        self._stop.set()
+        self._heartbeat.join()
+        if self.owned():
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class TrainedModel:
+    """A fitted model and its info (metrics, importances, provenance)"""
+
+    def __init__(self, model, info):
+        self.model = model
+        self.info = info
+
+    @property
+    def fingerprint(self):
+        return self.info['fingerprint']
+
+    @property
+    def id(self):
+        """This fit: unlike the fingerprint, it changes when a snapshot's model is replaced"""
+        return f"{self.info['fingerprint']}-{self.info['trained_at']}"
+
+
+class ModelRegistry:
+    """Trains, stores and serves one model per dataset fingerprint"""
+
+    def __init__(self, root, name, params=None):
+        self.root = root
+        self.name = name
+        self.params = params or {}
+        self._params_key = hashlib.sha256(json.dumps(self.params, sort_keys=True).encode()).hexdigest()[:8]
+        self._models = {}
+        self._latest = None
+        self._scanned = False
+        self._lock = threading.Lock()
+
+    def _folder(self, fingerprint):
+        return os.path.join(self.root, self.name, f'{fingerprint}-{self._params_key}')
+
+    def _load(self, fingerprint):
+        """The stored model for `fingerprint`, or None"""
+        folder = self._folder(fingerprint)
+        try:
+            with open(os.path.join(folder, 'info.json')) as f:
+                info = json.load(f)
+            model = joblib.load(os.path.join(folder, 'model.joblib'))
+        except (OSError, ValueError, EOFError):
+            return None
+        return TrainedModel(model, info)
+
+    def _save(self, trained):
+        folder = self._folder(trained.fingerprint)
+        staging = f'{folder}.{os.getpid()}.tmp'
+        os.makedirs(staging, exist_ok=True)
+        try:
+            joblib.dump(trained.model, os.path.join(staging, 'model.joblib'))
+            with open(os.path.join(staging, 'info.json'), 'w') as f:
+                json.dump(trained.info, f, indent=2)
+            shutil.rmtree(folder, ignore_errors=True)
+            os.rename(staging, folder)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._prune()
+
+    def _prune(self):
+        base = os.path.join(self.root, self.name)
+        folders = [os.path.join(base, d) for d in os.listdir(base) if not d.endswith('.tmp') and d != 'locks']
+        folders.sort(key=os.path.getmtime, reverse=True)
+        for folder in folders[KEEP_ARTIFACTS:]:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def get(self, snapshot):
+        """The model trained on exactly this snapshot (memory, then disk), or None"""
+        fingerprint = snapshot.fingerprint
+        if fingerprint in self._models:
+            return self._models[fingerprint]
+        trained = self._load(fingerprint)
+        if trained is not None:
+            self._remember(trained)
+        return trained
+
+    def _remember(self, trained):
+        with self._lock:
+            # Keep the newest model and the one just asked for; older ones reload from disk
+            newest = self._latest
+            if newest is None or trained.info['trained_at'] >= newest.info['trained_at']:
+                newest = trained
+            self._models = {trained.fingerprint: trained, newest.fingerprint: newest}
+            self._latest = newest
+
+    def _stored_newest(self):
+        """The newest model on disk with these parameters (by trained_at, then file time), or None"""
+        base = os.path.join(self.root, self.name)
+        newest, newest_key = None, None
+        try:
+            folders = os.listdir(base)
+        except OSError:
+            return None
+        for folder in folders:
+            if not folder.endswith(f'-{self._params_key}'):
+                continue
+            path = os.path.join(base, folder, 'info.json')
+            try:
+                with open(path) as f:
+                    info = json.load(f)
+                key = (info['trained_at'], os.path.getmtime(path))
+            except (OSError, ValueError, KeyError):
+                continue
+            if newest_key is None or key > newest_key:
+                newest, newest_key = info, key
+        return None if newest is None else self._load(newest['fingerprint'])
+
+    def latest(self, snapshot):
+        """The model for `snapshot` if trained, else the newest one available.
+
+        Returns (model, stale); model is None until a first one is stored. The
+        newest one is also looked up on disk once, so after a restart (or in a
+        new worker) a snapshot without its own model still gets the previous one.
+        """
+        trained = self.get(snapshot)
+        if trained is not None:
+            return trained, False
+        if self._latest is None and not self._scanned:
+            self._scanned = True
+            stored = self._stored_newest()
+            if stored is not None:
+                self._remember(stored)
+        latest = self._latest
+        return latest, latest is not None
+
+    def build(self, snapshot, train):
+        """Train and store the model for `snapshot` unless it exists; returns it (None if lost to a crash).
+
+        train(snapshot) -> (model, info dict of JSON-serialisable metrics). A
+        lock file per model makes concurrent builds across processes train once.
+        """
+        trained = self.get(snapshot)
+        if trained is not None:
+            return trained
+        lock = self._acquire(snapshot.fingerprint)
+        if lock is None:
+            # Another process is training this one: pick it up from disk when it is done
+            while _lock_alive(self._lock_path(snapshot.fingerprint)):
+                time.sleep(0.5)
+            return self.get(snapshot)
+        try:
+            start = time.perf_counter()
+            model, info = train(snapshot)
+            trained = self._record(snapshot, model, info, time.perf_counter() - start)
+            print(f"Trained {self.name} model for dataset version {snapshot.version} "
+                  f"in {trained.info['train_seconds']:.2f}s")
+            return trained
+        finally:
+            lock.release()
+
+    def store(self, snapshot, model, info, seconds):
+        """Store a model trained elsewhere as the one for `snapshot`, replacing any trained before"""
+        lock = self._acquire(snapshot.fingerprint)
+        while lock is None:
+            # Let a running build finish first, so it can't overwrite this model
+            time.sleep(0.5)
+            lock = self._acquire(snapshot.fingerprint)
+        try:
+            return self._record(snapshot, model, info, seconds)
+        finally:
+            lock.release()
+
+    def _record(self, snapshot, model, info, seconds):
+        info = dict(info, name=self.name, fingerprint=snapshot.fingerprint, version=snapshot.version,
+                    params=self.params, trained_at=datetime.now().isoformat(timespec='microseconds'),
+                    train_seconds=round(seconds, 3))
+        trained = TrainedModel(model, info)
+        self._save(trained)
+        self._remember(trained)
+        return trained
+
+    def _lock_path(self, fingerprint):
+        return os.path.join(self.root, self.name, 'locks', f'{fingerprint}-{self._params_key}.lock')
+
+    def _acquire(self, fingerprint):
+        """Create and hold this model's training lock, or return None if a live one exists"""
+        path = self._lock_path(fingerprint)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path) and not _lock_alive(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        token = f'{os.getpid()} {uuid.uuid4().hex}'
+        with os.fdopen(fd, 'w') as f:
+            f.write(token)
+        return _TrainingLock(path, token)
@@ -0,0 +1,302 @@
+"""Model fits run by training jobs.
+
+Every function here takes plain frames/arrays (no snapshot, no Flask state) and
+returns (model, info), so ``jobs`` can run it in a worker process: the
+arguments and the result are pickled across, and importing this module in the
+worker pulls in nothing but the ML libraries. ``info`` holds JSON-serialisable
+metrics stored next to the model in the registry.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingRandomSearchCV)
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from sklearn.model_selection import HalvingRandomSearchCV, train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+import itemset_lattice
+import segmentation
+
+
+def _churn_metrics(model, features, X_test, y_test):
+    """Held-out metrics and feature importances of a fitted churn forest"""
+    y_pred = model.predict(X_test)
+    feature_importance = sorted(zip(features, model.feature_importances_), key=lambda x: x[1], reverse=True)
+    return {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred, zero_division=0)),
+        'recall': float(recall_score(y_test, y_pred, zero_division=0)),
+        'f1_score': float(f1_score(y_test, y_pred, zero_division=0)),
+        'features': [f[0] for f in feature_importance],
+        'importances': [float(f[1]) for f in feature_importance]
+    }
+
+
+def fit_churn_model(X, y, params):
+    """Fit the churn random forest and score it on a held-out split.
+
+    params['hyperparameters'] (set once a tuning run was promoted) override
+    the default forest settings.
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=params['test_size'], random_state=params['random_state'])
+
+    hyperparameters = dict({'n_estimators': params['n_estimators']}, **params.get('hyperparameters', {}))
+    model = RandomForestClassifier(random_state=params['random_state'], **hyperparameters)
+    model.fit(X_train, y_train)
+
+    return model, dict(_churn_metrics(model, X.columns, X_test, y_test), rows=len(X),
+                       hyperparameters=hyperparameters)
+
+
+def _plain(params):
+    """Sampled parameters as JSON-serialisable values"""
+    return {key: value.item() if hasattr(value, 'item') else value for key, value in params.items()}
+
+
+def _serving_profile(name, hyperparameters, X_train, y_train, X_test, y_test, params):
+    """Fit time, predict latency, size and held-out accuracy of one forest configuration"""
+    model = RandomForestClassifier(random_state=params['random_state'], **hyperparameters)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    row = X_test.iloc[:1]
+    single = []
+    for _ in range(params['latency_repeats']):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.predict_proba(X_test)
+    batch = time.perf_counter() - start
+
+    return {
+        'name': name,
+        'hyperparameters': hyperparameters,
+        'accuracy': float(accuracy_score(y_test, model.predict(X_test))),
+        'fit_seconds': round(fit_seconds, 4),
+        'predict_row_ms': round(float(np.median(single)) * 1000, 3),
+        'predict_1k_rows_ms': round(batch / len(X_test) * 1000 * 1000, 3),
+        'nodes': int(sum(tree.tree_.node_count for tree in model.estimators_))
+    }
+
+
+def tune_churn_model(X, y, params, n_jobs=1):
+    """Search the churn forest's hyperparameters with successive halving.
+
+    params['candidates'] settings sampled from params['space'] are
+    cross-validated on the training split with a sample budget starting at
+    params['min_samples'] and growing params['factor']-fold per round,
+    keeping the best 1/params['factor'] each round; the cross-validation runs
+    on `n_jobs` processes. The winner, refitted on the whole training split,
+    is scored on the same held-out split as fit_churn_model, so
+    info['promote'] says whether it beats the default forest.
+
+    info['trials'] has every candidate of every round. info['report']
+    refits the default forest and the best params['report'] candidates one
+    at a time and compares fit time, predict latency and size with held-out
+    accuracy; 'pareto' marks the configurations no other one beats on both
+    accuracy and single-row latency.
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=params['test_size'], random_state=params['random_state'])
+
+    search = HalvingRandomSearchCV(
+        RandomForestClassifier(n_estimators=params['n_estimators'], random_state=params['random_state']),
+        params['space'], n_candidates=params['candidates'], factor=params['factor'],
+        min_resources=params['min_samples'], cv=params['cv'], scoring='accuracy',
+        random_state=params['random_state'], n_jobs=n_jobs)
+    search.fit(X_train, y_train)
+
+    results = search.cv_results_
+    trials = [{
+        'round': int(results['iter'][i]),
+        'samples': int(results['n_resources'][i]),
+        'hyperparameters': _plain(results['params'][i]),
+        'cv_accuracy': float(results['mean_test_score'][i]),
+        'cv_std': float(results['std_test_score'][i]),
+        'fit_seconds': float(results['mean_fit_time'][i]),
+        'score_seconds': float(results['mean_score_time'][i])
+    } for i in range(len(results['params']))]
+
+    # Candidates that got furthest first, best cross-validated accuracy within a round
+    finalists = []
+    for trial in sorted(trials, key=lambda t: (-t['round'], -t['cv_accuracy'])):
+        if trial['hyperparameters'] not in finalists:
+            finalists.append(trial['hyperparameters'])
+    configurations = [('default', {'n_estimators': params['n_estimators']})]
+    configurations += [(f'finalist {i + 1}', dict({'n_estimators': params['n_estimators']}, **hyperparameters))
+                       for i, hyperparameters in enumerate(finalists[:params['report']])]
+    report = [_serving_profile(name, hyperparameters, X_train, y_train, X_test, y_test, params)
+              for name, hyperparameters in configurations]
+    for entry in report:
+        entry['pareto'] = not any(
+            other['accuracy'] >= entry['accuracy'] and other['predict_row_ms'] <= entry['predict_row_ms']
+            and (other['accuracy'] > entry['accuracy'] or other['predict_row_ms'] < entry['predict_row_ms'])
+            for other in report)
+
+    model = search.best_estimator_
+    metrics = _churn_metrics(model, X.columns, X_test, y_test)
+    default_accuracy = report[0]['accuracy']
+    return model, dict(metrics, rows=len(X),
+                       hyperparameters=dict({'n_estimators': params['n_estimators']}, **_plain(search.best_params_)),
+                       cv_accuracy=float(search.best_score_),
+                       default_accuracy=default_accuracy,
+                       promote=metrics['accuracy'] > default_accuracy,
+                       rounds=int(search.n_iterations_),
+                       trials=trials,
+                       report=report)
+
+
+def _bootstrap_coefficients(X, y, seeds, params):
+    """Coefficients of the driver model refitted on one bootstrap resample per seed"""
+    coefficients = []
+    for seed in seeds:
+        rows = np.random.default_rng(seed).integers(0, len(X), len(X))
+        if len(np.unique(y[rows])) < 2:
+            continue
+        model = LogisticRegression(max_iter=params['max_iter'], random_state=params['random_state'])
+        model.fit(X[rows], y[rows])
+        coefficients.append(model.coef_[0])
+    return coefficients
+
+
+def fit_driver_model(X, y, params, n_jobs=1):
+    """Fit the renewal logistic regression on standardised features, with bootstrap intervals.
+
+    Coefficients are per standard deviation of each feature, so drivers can be
+    ranked against each other. params['bootstrap'] refits on resamples of the
+    training split, spread over `n_jobs` processes, give a percentile interval
+    at params['confidence'] for every coefficient.
+    """
+    if len(X) < 10:
+        raise ValueError('Insufficient data')
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=params['test_size'], random_state=params['random_state'])
+
+    model = make_pipeline(StandardScaler(), LogisticRegression(max_iter=params['max_iter'],
+                                                               random_state=params['random_state']))
+    model.fit(X_train, y_train)
+
+    # The resamples reuse the scaling of the point estimate, so intervals are on the same scale
+    scaled = model[0].transform(X_train)
+    labels = np.asarray(y_train)
+    seeds = params['random_state'] + 1 + np.arange(params['bootstrap'])
+    chunks = [chunk for chunk in np.array_split(seeds, max(n_jobs, 1)) if len(chunk)]
+    samples = Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_coefficients)(scaled, labels, chunk, params) for chunk in chunks)
+    samples = np.array([c for chunk in samples for c in chunk]).reshape(-1, X.shape[1])
+    tail = (1 - params['confidence']) / 2 * 100
+    lower, upper = (np.percentile(samples, [tail, 100 - tail], axis=0) if len(samples)
+                    else (np.full(X.shape[1], np.nan), np.full(X.shape[1], np.nan)))
+
+    drivers = sorted(zip(X.columns, model[-1].coef_[0], lower, upper), key=lambda x: abs(x[1]), reverse=True)
+    return model, {
+        'drivers': [d[0] for d in drivers],
+        'coefficients': [float(d[1]) for d in drivers],
+        'ci_lower': [float(d[2]) for d in drivers],
+        'ci_upper': [float(d[3]) for d in drivers],
+        'confidence': params['confidence'],
+        'bootstrap': len(samples),
+        'accuracy': float(model.score(X_test, y_test)),
+        'rows': len(X)
+    }
+
+
+def fit_segments(X, params, n_jobs=1):
+    """Fit the customer segmentation (standardised features + K-Means), choosing the number of segments.
+
+    Every k in params['k_range'] is fitted, spread over `n_jobs` processes,
+    and scored by inertia and by silhouette on params['silhouette_sample']
+    customers. The k with the best silhouette (the smallest on ties) is kept
+    and its segments are named from their centroids (value and risk columns
+    from params).
+    """
+    ks = [k for k in params['k_range'] if k <= len(X)] or [1]
+    fits = Parallel(n_jobs=n_jobs)(
+        delayed(segmentation.evaluate)(X, k, params['random_state'], params['n_init'], params['silhouette_sample'])
+        for k in ks)
+    best = max(range(len(ks)), key=lambda i: (fits[i][2], -ks[i]))
+    model = fits[best][0]
+
+    centers = pd.DataFrame(model[0].inverse_transform(model[-1].cluster_centers_), columns=X.columns)
+    return model, {
+        'inertia': fits[best][1],
+        'customers': len(X),
+        'n_clusters': ks[best],
+        'silhouette': fits[best][2],
+        'k_scores': [{'k': k, 'inertia': inertia, 'silhouette': silhouette}
+                     for k, (_, inertia, silhouette) in zip(ks, fits)],
+        'names': segmentation.name_segments(centers, params['value'], params['risk']),
+        'centroids': centers.round(4).to_dict('records')
+    }
+
+
+def mine_association_rules(basket_bits, pairs, product_names, params):
+    """Mine the product itemset lattice of the customers' baskets.
+
+    `basket_bits` are the ``baskets.Baskets`` of the customers buying at
+    least two products and `pairs` their ``co_occurrence.CoOccurrence``. The
+    model is an ``itemset_lattice.ItemsetLattice`` mined once (Eclat over the
+    purchase bitsets); the API filters its rules per request. The default
+    support (info['min_support']) is the highest of params['supports'] giving
+    more than params['min_itemsets'] itemsets. Exact counts of single items
+    and pairs bound that before mining, and the lattice is mined once at it,
+    or at params['query_support'] if lower, so queries down to that floor need
+    no mining. When no itemset is found, the most frequent product pairs are
+    kept as info['fallback_rules'].
+    """
+    info = {'transactions': basket_bits.transactions, 'min_support': None}
+
+    if basket_bits.transactions < 2:
+        return None, dict(info, message='Not enough customers buying multiple products')
+
+    print(f"Baskets: {basket_bits.transactions} customers x {len(basket_bits.items)} products, "
+          f"{len(basket_bits.customers)} purchases")
+
+    # Frequent items and pairs alone are a lower bound of the itemsets found at each support,
+    # so the first support where they suffice is low enough for the default
+    floor = params['supports'][-1]
+    for support in params['supports']:
+        found = itemset_lattice.frequent_count(basket_bits, pairs, support, params['min_itemsets'])
+        if found > params['min_itemsets']:
+            floor = support
+            break
+    floor = min(floor, params['query_support'])
+    lattice = itemset_lattice.ItemsetLattice.mine(basket_bits, pairs, floor, params['max_len'], product_names)
+    print(f"Support {floor}: {len(lattice)} itemsets")
+
+    enough = [support for support in params['supports'] if lattice.count(support) > params['min_itemsets']]
+    info.update(min_support=enough[0] if enough else floor, lattice_support=floor, itemsets=len(lattice))
+
+    if len(lattice) <= 1:
+        # No itemsets to build rules from: fall back to co-occurrence patterns
+        print("Eclat found no itemsets, creating manual co-occurrence patterns")
+        info['fallback_rules'] = co_occurrence_rules(pairs, product_names, params['top_pairs'])
+    return lattice, info
+
+
+def co_occurrence_rules(pairs, product_names, top):
+    """Rules from the most frequent product pairs, for when mining finds nothing"""
+    first, second, counts = pairs.pairs()
+    rules = pairs.rules()
+    # Each pair once, from its first item; most frequent first
+    order = np.argsort(-counts, kind='stable')[:top]
+
+    rules_list = []
+    for index in order:
+        prod1, prod2 = pairs.items[first[index]], pairs.items[second[index]]
+        rules_list.append({
+            'antecedent': product_names.get(prod1, str(prod1))[:40],
+            'consequent': product_names.get(prod2, str(prod2))[:40],
+            'confidence': float(rules['confidence'][index]),
+            'lift': float(rules['lift'][index]),
+            'support': int(counts[index])
+        })
+
+    return rules_list
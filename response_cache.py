@@ -0,0 +1,100 @@
+"""Dataset-versioned response cache for the JSON API.
+
+API responses only change when the dataset does, so a response is cached
+under (path, query args, dataset version). A new snapshot version makes every
+older entry unreachable; ``drop_older`` frees them right away instead of
+waiting for LRU eviction. The cache is bounded by entry count and by total
+body bytes, evicting least recently used entries first, and counts hits,
+misses and evictions so the bounds can be sized from real traffic.
+
+``clear`` is for answers changing within a dataset version (a model being
+replaced); it bumps ``generation``, which goes into the ETags, so clients
+revalidating an old answer don't get a 304.
+"""
+import threading
+from collections import OrderedDict
+
+
+class CachedResponse:
+    """The parts of a response needed to replay it"""
+
+    def __init__(self, body, status, mimetype):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+
+
+class ResponseCache:
+    """Bounded LRU of API responses keyed by (path, args, dataset version)"""
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+        self.generation = 0
+
+    @staticmethod
+    def key(path, args, version):
+        return (path, tuple(sorted(args.items(multi=True))), version)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def drop_older(self, version):
+        """Drop entries of dataset versions before `version` (not counted as evictions)"""
+        with self._lock:
+            for key in [k for k in self._entries if k[2] < version]:
+                self._bytes -= len(self._entries.pop(key).body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'not_modified': self.not_modified,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
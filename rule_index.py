@@ -0,0 +1,80 @@
+"""Association rules compiled for per-customer recommendation lookups.
+
+``RuleIndex`` turns a rules frame (``antecedents``, ``consequents``,
+``confidence``, ``support`` and ``lift`` columns, as mlxtend's
+``association_rules`` gives them) into an inverted index: for every item
+that appears in an antecedent, the (consequent, confidence, support, lift)
+entries of its rules, sorted by confidence, stored as flat arrays with one
+slice per item. Items are integer codes; ``names`` is the display name of
+each code, and with a name mapping, rules leading to items it does not
+know are left out (there would be nothing to show for them).
+
+``recommend(owned, k)`` merges the entry lists of the owned items with a heap
+and stops once it has `k` products the customer does not own, so a lookup
+touches only rules reachable from the owned items, not every rule.
+"""
+import heapq
+
+import numpy as np
+
+
+class RuleIndex:
+    """Rules by antecedent item, best confidence first"""
+
+    def __init__(self, rules, names=None):
+        items = {}
+        for itemset in list(rules['antecedents']) + list(rules['consequents']):
+            for item in itemset:
+                items.setdefault(item, len(items))
+        self.codes = items
+        self.items = np.array(list(items), dtype=object)
+        self.names = np.array([(names or {}).get(item) for item in self.items], dtype=object)
+
+        # One entry per (antecedent item, consequent item) of every rule
+        antecedent, consequent, rule = [], [], []
+        for position, (antecedents, consequents) in enumerate(zip(rules['antecedents'], rules['consequents'])):
+            for item in antecedents:
+                for other in consequents:
+                    if names is not None and other not in names:
+                        continue
+                    antecedent.append(items[item])
+                    consequent.append(items[other])
+                    rule.append(position)
+        antecedent = np.array(antecedent, dtype=np.int64)
+        rule = np.array(rule, dtype=np.int64)
+        confidence = rules['confidence'].to_numpy(dtype=np.float64)[rule]
+        order = np.lexsort((-confidence, antecedent))
+        self.indptr = np.r_[0, np.cumsum(np.bincount(antecedent, minlength=len(items)))]
+        self.consequent = np.array(consequent, dtype=np.int64)[order]
+        self.confidence = confidence[order]
+        self.support = rules['support'].to_numpy(dtype=np.float64)[rule][order]
+        self.lift = rules['lift'].to_numpy(dtype=np.float64)[rule][order]
+
+    def __len__(self):
+        return len(self.consequent)
+
+    def _entries(self, code):
+        for entry in range(self.indptr[code], self.indptr[code + 1]):
+            yield -self.confidence[entry], entry
+
+    def recommend(self, owned, k=5):
+        """Up to `k` (consequent item, confidence, support, lift) for a customer owning `owned`,
+        best confidence first, each product once (with its best rule)"""
+        owned = set(owned)
+        codes = [self.codes[item] for item in owned if item in self.codes]
+        found = []
+        seen = set()
+        for _, entry in heapq.merge(*[self._entries(code) for code in codes]):
+            item = self.items[self.consequent[entry]]
+            if item in owned or item in seen:
+                continue
+            seen.add(item)
+            found.append((item, self.confidence[entry], self.support[entry], self.lift[entry]))
+            if len(found) == k:
+                break
+        return found
+
+    def name(self, item):
+        """Display name of an item (None when the catalogue does not know it)"""
+        code = self.codes.get(item)
+        return None if code is None else self.names[code]
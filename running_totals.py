@@ -0,0 +1,101 @@
+"""Running license totals behind the overview, revenue and activation panels.
+
+``LicenseTotals`` keeps additive state only (sums, row counts, per-key sums
+and per-key row counts), so a batch of new license rows is folded in with
+``add`` in O(batch) without touching the rows already counted. Distinct
+customer/product counts are the number of keys with a non-zero row count.
+
+Batches are license fact rows (``license_facts.build_facts``), so product
+categories come along with the rows instead of from a join.
+"""
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+
+class LicenseTotals:
+    """Additive license aggregates, maintained incrementally"""
+
+    def __init__(self):
+        self.count = 0
+        self.purchased = 0.0
+        self.activated = 0.0
+        self.revenue = 0.0
+        self.high_churn = 0
+        self.customers = Counter()
+        self.products = Counter()
+        self.category_revenue = defaultdict(float)
+        self.product_purchased = defaultdict(float)
+        self.product_activated = defaultdict(float)
+        self.product_names = {}
+
+    @classmethod
+    def from_facts(cls, facts):
+        totals = cls()
+        totals.add(facts)
+        return totals
+
+    def copy(self):
+        other = LicenseTotals()
+        other.count = self.count
+        other.purchased = self.purchased
+        other.activated = self.activated
+        other.revenue = self.revenue
+        other.high_churn = self.high_churn
+        other.customers = Counter(self.customers)
+        other.products = Counter(self.products)
+        other.category_revenue = defaultdict(float, self.category_revenue)
+        other.product_purchased = defaultdict(float, self.product_purchased)
+        other.product_activated = defaultdict(float, self.product_activated)
+        other.product_names = dict(self.product_names)
+        return other
+
+    def add(self, licenses):
+        """Fold a batch of license fact rows into the totals"""
+        if len(licenses) == 0:
+            return self
+        self.count += len(licenses)
+        self.purchased += float(licenses['Number_of_quantities_purchased'].sum())
+        self.activated += float(licenses['Number_of_quantities_activated'].sum())
+        self.revenue += float(licenses['Contract_Value'].sum())
+        self.high_churn += int((licenses['Churn_Risk'] == 'High').sum())
+
+        _add_counts(self.customers, licenses['Customer_ID'])
+        _add_counts(self.products, licenses['Product_ID'])
+
+        per_product = licenses.groupby('Product_ID', observed=True).agg({
+            'Number_of_quantities_purchased': 'sum',
+            'Number_of_quantities_activated': 'sum'
+        })
+        for product_id, purchased, activated in zip(per_product.index,
+                                                    per_product['Number_of_quantities_purchased'],
+                                                    per_product['Number_of_quantities_activated']):
+            self.product_purchased[product_id] += float(purchased)
+            self.product_activated[product_id] += float(activated)
+
+        # Only licenses whose product is known, as licenses.merge(products) used to count
+        catalogued = licenses[licenses['Has_Product']]
+        for category, value in catalogued.groupby('Product_Category', observed=True)['Contract_Value'].sum().items():
+            self.category_revenue[category] += float(value)
+        firsts = catalogued.drop_duplicates('Product_ID')
+        self.product_names.update(zip(firsts['Product_ID'], firsts['Product_Name']))
+        return self
+
+    def category_revenue_series(self):
+        return pd.Series(self.category_revenue, dtype='float64')
+
+    def product_activation_frame(self):
+        """Per-product purchased/activated sums and names (NaN if not catalogued) keyed by Product_ID"""
+        frame = pd.DataFrame({
+            'Number_of_quantities_purchased': pd.Series(self.product_purchased, dtype='float64'),
+            'Number_of_quantities_activated': pd.Series(self.product_activated, dtype='float64')
+        })
+        frame['Product_Name'] = pd.Series(self.product_names, dtype=object)
+        frame.index.name = 'Product_ID'
+        return frame.sort_index().reset_index()
+
+
+def _add_counts(counter, keys):
+    for key, n in keys.value_counts().items():
+        if n > 0:
+            counter[key] += int(n)
@@ -0,0 +1,196 @@
+"""Customer segmentation with cached, incrementally maintained assignments.
+
+A full fit (StandardScaler + K-Means) gives the scaler state and the
+centroids. ``Segmentation`` keeps them together with every customer's
+assignment and the per-segment counts, so serving segment statistics needs no
+clustering at all.
+
+When the customer aggregates change (new customers, appended licenses),
+``update`` only looks at the customers that are new or whose aggregates
+changed: they are taken out of their old centroid, assigned to the nearest one
+under the fitted scaler and folded into it as a running mean (the per-centroid
+learning rate of mini-batch K-Means); every other assignment stays as it is.
+``drift`` tells how far this has moved away from the full fit - the relative
+increase of the customers' mean squared distance to their centroid - so
+callers can refit fully once it passes a threshold.
+
+``evaluate`` fits one candidate number of segments and scores it (inertia, and
+silhouette on a sample of customers) so a full fit can pick k, and
+``name_segments`` names the segments of a fit from their centroids.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+
+def make_model(n_clusters=4, random_state=42, n_init=10):
+    """Unfitted segmentation model: standardised features + K-Means"""
+    return make_pipeline(StandardScaler(), KMeans(n_clusters=n_clusters, n_init=n_init, random_state=random_state))
+
+
+# Names of the segments other than At-Risk, by value rank (highest first), per number of such segments
+TIERS = {
+    1: ['Premium'],
+    2: ['Premium', 'Standard'],
+    3: ['Premium', 'Standard', 'Basic'],
+    4: ['Premium', 'Growth', 'Standard', 'Basic'],
+    5: ['Premium', 'Growth', 'Standard', 'Basic', 'Entry'],
+    6: ['Premium', 'Growth', 'Standard', 'Core', 'Basic', 'Entry']
+}
+
+
+def evaluate(features, n_clusters, random_state=42, n_init=10, sample=2000):
+    """Fit `n_clusters` segments; returns (model, inertia, silhouette on up to `sample` customers)"""
+    model = make_model(n_clusters, random_state, n_init)
+    labels = model.fit_predict(features)
+    silhouette = -1.0
+    if 1 < n_clusters < len(features):
+        silhouette = silhouette_score(model[0].transform(features), labels,
+                                      sample_size=min(sample, len(features)), random_state=random_state)
+    return model, float(model[-1].inertia_), float(silhouette)
+
+
+def name_segments(centers, value, risk):
+    """Segment names from centroids (a frame in feature units, one row per segment).
+
+    The centroid with the highest `value` is Premium. With three or more
+    segments, the one of the others with the lowest `risk` (e.g. satisfaction)
+    is At-Risk; the rest are named by their `value` rank from TIERS.
+    """
+    order = list(centers[value].sort_values(ascending=False, kind='stable').index)
+    names = {}
+    if len(order) >= 3:
+        at_risk = centers.loc[order[1:], risk].idxmin()
+        names[at_risk] = 'At-Risk'
+        order.remove(at_risk)
+    tiers = TIERS.get(len(order)) or [f'Tier {i + 1}' for i in range(len(order))]
+    names.update(zip(order, tiers))
+    return [names[i] for i in centers.index]
+
+
+def _nearest(X, centers):
+    """Index of the nearest centroid of every row"""
+    distances = ((X[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+
+def _as_matrix(features):
+    """Customer aggregates as a float frame indexed by plain (object) customer IDs"""
+    features = features.astype(np.float64).fillna(0)
+    features.index = pd.Index(features.index.astype(object), name=features.index.name)
+    return features
+
+
+class Segmentation:
+    """Scaler, centroids and cached assignments of one set of customer aggregates"""
+
+    def __init__(self, scaler, centers, counts, features, scaled, labels, baseline, source=None, changed=None):
+        self.scaler = scaler
+        self.centers = centers
+        self.counts = counts
+        # Customer aggregates (index: customer ID) and their scaled values, row for row
+        self.features = features
+        self._scaled = scaled
+        self.labels = pd.Series(labels, index=features.index)
+        self.baseline = baseline
+        # Fingerprint of the full fit the centroids started from
+        self.source = source
+        # Customers (re)assigned by the update that produced this segmentation
+        self.changed = len(features) if changed is None else changed
+        self.inertia = float(((scaled - centers[labels]) ** 2).sum(axis=1).mean()) if len(scaled) else 0.0
+
+    @classmethod
+    def from_model(cls, model, features, source=None):
+        """Assign every customer with a fitted Pipeline(StandardScaler, KMeans)"""
+        features = _as_matrix(features)
+        scaler = model[0]
+        centers = model[-1].cluster_centers_.astype(np.float64)
+        scaled = scaler.transform(features)
+        labels = _nearest(scaled, centers)
+        counts = np.bincount(labels, minlength=len(centers)).astype(np.float64)
+        inertia = ((scaled - centers[labels]) ** 2).sum(axis=1).mean() if len(scaled) else 0.0
+        return cls(scaler, centers, counts, features, scaled, labels, float(inertia), source)
+
+    @classmethod
+    def fit(cls, features, n_clusters=4, random_state=42, n_init=10, source=None):
+        """Full fit on customer aggregates (at most one cluster per customer)"""
+        n_clusters = max(1, min(n_clusters, len(features)))
+        model = make_model(n_clusters, random_state, n_init)
+        model.fit(_as_matrix(features))
+        return cls.from_model(model, features, source)
+
+    @property
+    def n_clusters(self):
+        return len(self.centers)
+
+    @property
+    def drift(self):
+        """Relative increase of the mean squared distance to the centroids since the full fit"""
+        if self.baseline <= 0:
+            return 0.0 if self.inertia <= 0 else float('inf')
+        return self.inertia / self.baseline - 1
+
+    def update(self, features):
+        """The segmentation of newer customer aggregates, reassigning only new or changed customers"""
+        features = _as_matrix(features)
+        previous = self.features.reindex(features.index)
+        changed = (previous.isna().any(axis=1).to_numpy()
+                   | (previous.to_numpy() != features.to_numpy()).any(axis=1))
+        removed = ~self.features.index.isin(features.index)
+        if not changed.any() and not removed.any():
+            return self
+
+        # Take customers that left or changed out of their centroid's running mean
+        leaving = removed | self.features.index.isin(features.index[changed])
+        counts = self.counts.copy()
+        sums = self.centers * counts[:, None]
+        old_labels = self.labels.to_numpy()[leaving]
+        np.subtract.at(sums, old_labels, self._scaled[leaving])
+        np.subtract.at(counts, old_labels, 1)
+        occupied = counts > 0
+        centers = self.centers.copy()
+        centers[occupied] = sums[occupied] / counts[occupied, None]
+
+        # ... and fold the new or changed ones into the nearest one
+        X = self.scaler.transform(features[changed])
+        new_labels = _nearest(X, centers)
+        np.add.at(sums, new_labels, X)
+        np.add.at(counts, new_labels, 1)
+        occupied = counts > 0
+        centers[occupied] = sums[occupied] / counts[occupied, None]
+
+        scaled = np.empty((len(features), self._scaled.shape[1]))
+        labels = np.empty(len(features), dtype=np.int64)
+        kept = self.features.index.get_indexer(features.index[~changed])
+        scaled[~changed] = self._scaled[kept]
+        labels[~changed] = self.labels.to_numpy()[kept]
+        scaled[changed] = X
+        labels[changed] = new_labels
+        return Segmentation(self.scaler, centers, counts, features, scaled, labels, self.baseline,
+                            self.source, int(changed.sum()))
+
+
+class SegmentationTracker:
+    """The newest segmentation, so the next dataset version only updates it"""
+
+    def __init__(self):
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def segment(self, model, source, features, version):
+        """Segmentation of `features` (dataset `version`) under the full fit `model` identified by `source`"""
+        with self._lock:
+            latest = self._latest
+        if latest is not None and latest[1].source == source and latest[0] < version:
+            segments = latest[1].update(features)
+        else:
+            segments = Segmentation.from_model(model, features, source)
+        with self._lock:
+            if self._latest is None or version >= self._latest[0]:
+                self._latest = (version, segments)
+        return segments
@@ -0,0 +1,133 @@
+"""Columnar snapshot cache for the dashboard CSV files.
+
+Every CSV is mirrored by an uncompressed Arrow IPC (Feather v2) file kept in a
+``.snapshots`` folder next to it. A small JSON manifest records the size, mtime
+and SHA-256 of the CSV the snapshot was built from, so a snapshot is only
+rebuilt when its source actually changes. Columns are typed with the table's
+``dataset_schema`` entry (dates, categoricals, downcast counters) before the
+snapshot is written, which means a warm start skips both the CSV parse and the
+typing pass.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+import dataset_schema
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - the cache degrades to plain CSV reads
+    feather = None
+
+SNAPSHOT_DIRNAME = '.snapshots'
+
+# Bump whenever the on-disk snapshot layout or typing changes
+CACHE_FORMAT = 2
+
+_HASH_CHUNK = 1 << 20
+
+
+def file_hash(path):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_paths(csv_path):
+    """Return the (snapshot, manifest) paths used for a CSV file"""
+    folder, filename = os.path.split(csv_path)
+    name = os.path.splitext(filename)[0]
+    snapshot_dir = os.path.join(folder, SNAPSHOT_DIRNAME)
+    return (os.path.join(snapshot_dir, f'{name}.feather'),
+            os.path.join(snapshot_dir, f'{name}.json'))
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    """Write a file through a temporary sibling so readers never see a partial file"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def source_state(csv_path, manifest=None):
+    """Return the size/mtime/hash key of a CSV, hashing only when size or mtime moved"""
+    stat = os.stat(csv_path)
+    state = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if manifest and manifest.get('size') == state['size'] and manifest.get('mtime_ns') == state['mtime_ns']:
+        state['sha256'] = manifest.get('sha256')
+    else:
+        state['sha256'] = file_hash(csv_path)
+    return state
+
+
+def current_hash(csv_path):
+    """SHA-256 of a CSV, reusing the manifest's hash while size and mtime are unchanged"""
+    _, manifest_path = snapshot_paths(csv_path)
+    return source_state(csv_path, _read_manifest(manifest_path))['sha256']
+
+
+def is_fresh(manifest, state, schema):
+    """Check whether a manifest still describes the current source file"""
+    if not manifest:
+        return False
+    return (manifest.get('format') == CACHE_FORMAT
+            and manifest.get('sha256') == state['sha256']
+            and manifest.get('schema') == schema)
+
+
+def read_csv_typed(csv_path, schema=None):
+    """Parse a CSV and apply its schema (the uncached path)"""
+    df = pd.read_csv(csv_path)
+    return dataset_schema.apply_schema(df, schema or dataset_schema.EMPTY_SCHEMA)
+
+
+def load_table(csv_path, schema=None):
+    """Load a CSV through its columnar snapshot, rebuilding the snapshot if the CSV changed"""
+    schema = schema or dataset_schema.EMPTY_SCHEMA
+    if feather is None:
+        return read_csv_typed(csv_path, schema)
+
+    snapshot_path, manifest_path = snapshot_paths(csv_path)
+    manifest = _read_manifest(manifest_path)
+    state = source_state(csv_path, manifest)
+
+    if is_fresh(manifest, state, schema) and os.path.exists(snapshot_path):
+        if manifest['size'] != state['size'] or manifest['mtime_ns'] != state['mtime_ns']:
+            # Same content under a new mtime (e.g. a re-copied file): just refresh the key
+            manifest.update(state)
+            _write_atomic(manifest_path, lambda p: _dump_json(manifest, p))
+        return feather.read_feather(snapshot_path)
+
+    df = read_csv_typed(csv_path, schema)
+    try:
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        _write_atomic(snapshot_path,
+                      lambda p: feather.write_feather(df, p, compression='uncompressed'))
+        manifest = dict(state, format=CACHE_FORMAT, schema=schema,
+                        rows=int(df.shape[0]), columns=int(df.shape[1]))
+        _write_atomic(manifest_path, lambda p: _dump_json(manifest, p))
+    except OSError as e:
+        print(f"Could not write snapshot for {csv_path}: {e}")
+    return df
+
+
+def _dump_json(obj, path):
+    with open(path, 'w') as f:
+        json.dump(obj, f, indent=2)